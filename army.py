@@ -3,6 +3,7 @@ from lerdon_libraries import *
 from db_lerdon_connect import *
 
 from economic import format_number
+from seasons import effective_stats
 
 
 PRIMARY_COLOR = get_color_from_hex('#2E7D32')
@@ -333,10 +334,15 @@ def load_unit_data(faction, conn):
         FROM units WHERE faction = ?
     """, (faction,))
     rows = cursor.fetchall()
+    # Атака, защита и стоимость — с коэффициентами текущего сезона
+    season = effective_stats(conn, faction)
 
     unit_data = {}
     for row in rows:
         unit_name, consumption, cost_money, cost_time, image_path, attack, defense, durability, unit_class = row
+        if unit_name in season:
+            attack, defense = season[unit_name]["attack"], season[unit_name]["defense"]
+            cost_money, cost_time = season[unit_name]["cost_money"], season[unit_name]["cost_time"]
         unit_data[unit_name] = {
             "cost": [cost_money, cost_time],
             "image": image_path,
@@ -371,6 +377,7 @@ def start_army_mode(faction, game_area, class_faction, conn):
     right_container = FloatLayout(size_hint=(1, 1))
 
     # Карусель
+    from kivy.uix.carousel import Carousel
     carousel = Carousel(
         direction='right',
         size_hint=(1, 1),
@@ -0,0 +1,96 @@
+"""
+Сила и потребление армий по фракциям и городам.
+
+Формула «(атака × коэффициент класса) + защита + живучесть, умноженное на
+количество» была написана четыре раза (ИИ, окно рейтинга армий в politic.py
+и две функции звёзд мощи в GameScreen), и каждая копия сканировала
+garrisons JOIN units целиком. Теперь сила хранится готовой в таблице
+army_strength(faction, city_id, strength) — по строке на фракцию юнитов
+в каждом городе — и пересчитывается триггерами:
+
+    - изменение гарнизона — только строки этого города;
+    - изменение юнита (восстановление бэкапа) — города, где он стоит;
+    - смена сезона (season_effects) — города, где стоят юниты фракции.
+
+Там же хранится потребление сырья (consumption × количество): это
+журнал потребления фракции для Faction.calculate_and_deduct_consumption
+и найма ИИ, которые раньше перебирали все гарнизоны всех фракций.
+
+Фракция строки — фракция юнита, а не владельца города, как и в прежних
+расчётах. Каждое срабатывание триггеров увеличивает счётчик version(conn),
+по которому читатели (звёзды мощи на карте) понимают, что пересчитывать
+нечего.
+
+Таблицу и триггеры создают шаги migrations.py (3 и 4); изменение
+формулы или триггеров — новый шаг миграции.
+"""
+import sqlite3
+
+
+def faction_strengths(conn):
+    """
+    Общая сила армий всех фракций (по всем городам, где стоят их юниты).
+    :return: Словарь {фракция: сила}.
+    """
+    try:
+        cursor = conn.execute("""
+            SELECT faction, SUM(strength) FROM army_strength
+            GROUP BY faction ORDER BY faction
+        """)
+        return {faction: strength for faction, strength in cursor.fetchall()}
+    except sqlite3.Error as e:
+        print(f"Ошибка при чтении силы армий: {e}")
+        return {}
+
+
+def faction_strength(conn, faction, own_cities_only=False):
+    """
+    Общая сила армии фракции.
+    :param own_cities_only: Учитывать только города, которыми фракция владеет.
+    """
+    query = "SELECT SUM(strength) FROM army_strength WHERE faction = ?"
+    params = (faction,)
+    if own_cities_only:
+        query += " AND city_id IN (SELECT name FROM cities WHERE faction = ?)"
+        params = (faction, faction)
+    try:
+        row = conn.execute(query, params).fetchone()
+        return row[0] or 0
+    except sqlite3.Error as e:
+        print(f"Ошибка при чтении силы армии фракции {faction}: {e}")
+        return 0
+
+
+def city_strength(conn, city_id, faction):
+    """Сила юнитов фракции в городе."""
+    try:
+        row = conn.execute(
+            "SELECT strength FROM army_strength WHERE faction = ? AND city_id = ?",
+            (faction, city_id),
+        ).fetchone()
+        return row[0] if row else 0
+    except sqlite3.Error as e:
+        print(f"Ошибка при чтении силы армии в городе {city_id}: {e}")
+        return 0
+
+
+def faction_consumption(conn, faction):
+    """Текущее потребление сырья армией фракции (по всем городам, где стоят её юниты)."""
+    try:
+        row = conn.execute(
+            "SELECT SUM(consumption) FROM army_strength WHERE faction = ?", (faction,)
+        ).fetchone()
+        return row[0] or 0
+    except sqlite3.Error as e:
+        print(f"Ошибка при чтении потребления армии фракции {faction}: {e}")
+        return 0
+
+
+def version(conn):
+    """Счётчик изменений таблицы army_strength; меняется при каждом изменении гарнизонов и юнитов."""
+    try:
+        row = conn.execute("SELECT version FROM army_strength_version").fetchone()
+        return row[0] if row else None
+    except sqlite3.Error as e:
+        print(f"Ошибка при чтении версии силы армий: {e}")
+        return None
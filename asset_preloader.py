@@ -0,0 +1,202 @@
+"""
+Предзагрузка картинок и видео за экраном загрузки.
+
+Раньше LoadingScreen показывал пять шагов, которые ничего не делали, а
+картинки декодировались синхронно при первом использовании: карта в
+MapWidget, иконки крепостей, портреты юнитов files/army/*, иконки
+ресурсов ResourceBox.ICON_MAP, фоны меню. Каждая такая загрузка —
+заметная заминка уже в игре. Теперь:
+
+    preloader = AssetPreloader(*required_assets(), on_progress=..., on_complete=...)
+    preloader.start()
+
+Фоновый поток декодирует картинки (ImageLoader.load, как kivy.loader) и
+дочитывает видео меню, чтобы файлы оказались в кэше ОС. Главный поток
+каждый кадр забирает готовые картинки и создаёт из них текстуры, пока не
+выйдет бюджет кадра FRAME_BUDGET, и сообщает реальный прогресс.
+Загруженные картинки кладутся в кэш Kivy kv.image (текстуры — в kv.texture) под
+относительным и полным путём, поэтому Image(source=...), Rectangle(source=...),
+CoreImage(path) и texture_cache.image_texture берут готовую текстуру.
+Картинки держатся и здесь, чтобы кэш Kivy не выбросил их по таймауту.
+Последние шаги на главном потоке (MAIN_THREAD_STEPS) заполняют кэш
+texture_cache и загружают поставщик видео Kivy.
+"""
+import glob
+import importlib
+import os
+import queue
+import threading
+import time
+
+import texture_cache
+
+MAP_IMAGE = "files/map/map.png"
+ARMY_DIR = "files/army"
+MENU_DIR = "files/menu"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+VIDEO_EXTENSIONS = (".mp4",)
+
+FRAME_BUDGET = 0.008  # секунд на создание текстур за кадр
+KEEP_SECONDS = 24 * 3600  # таймаут записей в кэше Kivy
+READ_CHUNK = 1 << 20
+
+# {путь: загруженная картинка} — держит текстуры, пока игра запущена
+_loaded = {}
+
+
+def _files(directory, extensions, recursive=False):
+    pattern = os.path.join(directory, "**", "*") if recursive else os.path.join(directory, "*")
+    return sorted(path.replace(os.sep, "/") for path in glob.glob(pattern, recursive=recursive)
+                  if path.lower().endswith(extensions))
+
+
+def required_assets():
+    """
+    Картинки и видео, которые нужны меню и первому ходу.
+    :return: (пути картинок, пути видео).
+    """
+    from game_process import ResourceBox
+
+    images = [MAP_IMAGE]
+    if not os.path.exists(texture_cache.ATLAS + ".atlas"):
+        images += texture_cache.ATLAS_IMAGES
+    images += _files(ARMY_DIR, IMAGE_EXTENSIONS, recursive=True)
+    images += ResourceBox.ICON_MAP.values()
+    images += _files(MENU_DIR, IMAGE_EXTENSIONS)
+    # Порядок сохраняется: сначала то, что нужно раньше
+    images = list(dict.fromkeys(images))
+    videos = _files(MENU_DIR, VIDEO_EXTENSIONS)
+    return images, videos
+
+
+def _register(path, filename, image):
+    """Кладёт картинку в кэш Kivy под путями, по которым её будут искать."""
+    from kivy.cache import Cache
+
+    for key in {path, filename}:
+        Cache.append('kv.image', f"{key}|0|0", image, timeout=KEEP_SECONDS)
+    _loaded[path] = image
+
+
+def _warm_texture_cache():
+    # Иконки крепостей и звезда: из атласа или из только что загруженных картинок
+    for path in texture_cache.ATLAS_IMAGES:
+        texture_cache.image_texture(path)
+
+
+def _warm_video_provider():
+    # Выбор поставщика видео (ffpyplayer/gstreamer) — тяжёлый импорт
+    importlib.import_module("kivy.core.video")
+
+
+# Шаги главного потока после картинок и видео
+MAIN_THREAD_STEPS = [_warm_texture_cache, _warm_video_provider]
+
+
+class AssetPreloader:
+    def __init__(self, images, videos=(), on_progress=None, on_complete=None, frame_budget=FRAME_BUDGET):
+        """
+        :param images: Пути картинок (относительно папки игры).
+        :param videos: Пути видео — их файлы дочитываются в кэш ОС.
+        :param on_progress: on_progress(готово, всего) на главном потоке.
+        :param on_complete: on_complete() после последнего шага.
+        :param frame_budget: Секунд на создание текстур за кадр.
+        """
+        self.images = [path for path in images if path not in _loaded]
+        self.videos = list(videos)
+        self.on_progress = on_progress
+        self.on_complete = on_complete
+        self.frame_budget = frame_budget
+        self.total = len(self.images) + len(self.videos) + len(MAIN_THREAD_STEPS)
+        self.done = 0
+        self.failed = []
+        self._ready = queue.Queue()
+        self._cancelled = threading.Event()
+        self._thread = None
+        self._event = None
+
+    def start(self):
+        from kivy.clock import Clock
+
+        self._thread = threading.Thread(target=self._decode, name="asset-preloader", daemon=True)
+        self._thread.start()
+        self._event = Clock.schedule_interval(self._upload, 0)
+
+    def cancel(self):
+        self._cancelled.set()
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+
+    @property
+    def progress(self):
+        """Доля выполненной работы от 0 до 1."""
+        return self.done / self.total if self.total else 1.0
+
+    # ------------------------------------------------------------------
+    # Фоновый поток
+    # ------------------------------------------------------------------
+    def _decode(self):
+        """Кладёт в очередь ("image", путь, (файл, картинка)), ("video", путь, None), ("step", None, шаг)."""
+        from kivy.core.image import ImageLoader
+        from kivy.resources import resource_find
+
+        for path in self.images:
+            if self._cancelled.is_set():
+                return
+            filename = resource_find(path)
+            image = None
+            if filename is None:
+                print(f"Файл не найден: {path}")
+            else:
+                try:
+                    # keep_data: пиксели нужны главному потоку для текстуры
+                    image = ImageLoader.load(filename, keep_data=True)
+                except Exception as e:
+                    print(f"Не удалось декодировать {path}: {e}")
+            self._ready.put(("image", path, (filename, image)))
+        for path in self.videos:
+            if self._cancelled.is_set():
+                return
+            try:
+                with open(resource_find(path) or path, "rb") as f:
+                    while f.read(READ_CHUNK):
+                        pass
+            except OSError as e:
+                print(f"Не удалось прочитать {path}: {e}")
+            self._ready.put(("video", path, None))
+        for step in MAIN_THREAD_STEPS:
+            self._ready.put(("step", None, step))
+
+    # ------------------------------------------------------------------
+    # Главный поток
+    # ------------------------------------------------------------------
+    def _upload(self, dt):
+        start = time.perf_counter()
+        while self.done < self.total:
+            try:
+                kind, path, payload = self._ready.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "image":
+                filename, image = payload
+                if image is None:
+                    self.failed.append(path)
+                else:
+                    # Пиксели после создания текстуры больше не нужны
+                    image.keep_data = False
+                    if image.texture is not None:
+                        _register(path, filename, image)
+            elif kind == "step":
+                payload()
+            self.done += 1
+            if self.on_progress:
+                self.on_progress(self.done, self.total)
+            if time.perf_counter() - start >= self.frame_budget:
+                break
+        if self.done < self.total:
+            return True
+        self._event = None
+        if self.on_complete:
+            self.on_complete()
+        return False
@@ -0,0 +1,122 @@
+"""
+Пакетный прогон многих независимых партий на всех ядрах.
+
+    python batch_simulate.py --games 200 --turns 100 --seed 1
+
+Каждая партия играется в отдельном процессе на своей копии базы
+(simulate.run_simulation), поэтому общего соединения и блокировок SQLite нет.
+Партия i получает зерно seed + i: пакет воспроизводим, а любую партию можно
+повторить отдельно через simulate.py --seed.
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from simulate import DEFAULT_DB, parse_ratio, run_simulation
+from turn_engine import FACTIONS
+
+
+def _play(task):
+    """Рабочая функция процесса: одна партия по набору параметров."""
+    seed, options = task
+    return run_simulation(seed=seed, **options)
+
+
+def run_batch(games, turns, seed=0, jobs=None, **options):
+    """
+    Прогоняет games независимых партий в пуле процессов.
+    :param jobs: Количество процессов (None — по числу ядер, 1 — без пула).
+    :param options: Остальные параметры simulate.run_simulation (db, faction, tax_rate, ...).
+    :return: Список итогов партий в порядке зёрен.
+    """
+    options["turns"] = turns
+    tasks = [(seed + i, options) for i in range(games)]
+    if jobs == 1:
+        return [_play(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(_play, tasks))
+
+
+def summarize(summaries):
+    """
+    Сводит итоги партий в одну таблицу для балансировки фракций.
+    :return: Словарь с количеством партий, средней длиной, лидерами,
+             исходами по фракции игрока и средними строками results.
+    """
+    games = len(summaries)
+    leaders = Counter(summary["leader"] for summary in summaries)
+    outcomes = defaultdict(Counter)
+    for summary in summaries:
+        outcomes[summary["faction"]][summary["status"] or "не завершена"] += 1
+
+    totals = defaultdict(lambda: defaultdict(float))
+    counts = Counter()
+    for summary in summaries:
+        for faction, row in summary["results"].items():
+            counts[faction] += 1
+            for column, value in row.items():
+                totals[faction][column] += value or 0
+    results = {
+        faction: {column: total / counts[faction] for column, total in columns.items()}
+        for faction, columns in totals.items()
+    }
+
+    return {
+        "games": games,
+        "finished": sum(1 for summary in summaries if summary["finished"]),
+        "average_turns": sum(summary["turns_played"] for summary in summaries) / games if games else 0,
+        "leaders": {faction: leaders.get(faction, 0) for faction in FACTIONS},
+        "player_outcomes": {faction: dict(counter) for faction, counter in outcomes.items()},
+        "average_results": results,
+    }
+
+
+def print_report(report):
+    print(f"Партий: {report['games']}, завершено: {report['finished']}, "
+          f"в среднем ходов: {report['average_turns']:.1f}")
+    print("Лидер по городам:")
+    for faction, wins in sorted(report["leaders"].items(), key=lambda item: -item[1]):
+        share = wins / report["games"] if report["games"] else 0
+        print(f"  {faction}: {wins} ({share:.0%})")
+    print("Исходы по фракции игрока:")
+    for faction, outcome in sorted(report["player_outcomes"].items()):
+        print(f"  {faction}: " + ", ".join(f"{status} {count}" for status, count in sorted(outcome.items())))
+    print("Средние показатели results:")
+    for faction, row in sorted(report["average_results"].items()):
+        values = ", ".join(f"{column}={value:.2f}" for column, value in row.items())
+        print(f"  {faction}: {values}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетный прогон партий Lerdon на всех ядрах")
+    parser.add_argument("--games", type=int, default=100, help="количество партий")
+    parser.add_argument("--turns", type=int, default=100, help="максимальное количество ходов в партии")
+    parser.add_argument("--seed", type=int, default=0, help="зерно первой партии (дальше seed + i)")
+    parser.add_argument("--jobs", type=int, default=None, help="количество процессов (по умолчанию — все ядра)")
+    parser.add_argument("--db", default=DEFAULT_DB, help="исходная база (копируется для каждой партии)")
+    parser.add_argument("--faction", choices=FACTIONS, default=None, help="фракция игрока (по умолчанию случайная)")
+    parser.add_argument("--tax", type=int, default=30, help="ставка налога игрока в процентах")
+    parser.add_argument("--auto-build", type=parse_ratio, default=(1, 1),
+                        help="соотношение больниц и фабрик для автостройки игрока, например 1:1")
+    parser.add_argument("--in-memory", action="store_true", help="играть на копиях базы в памяти")
+    parser.add_argument("--json", dest="json_path", default=None,
+                        help="сохранить сводку и итоги всех партий в JSON")
+    args = parser.parse_args(argv)
+
+    summaries = run_batch(args.games, args.turns, seed=args.seed, jobs=args.jobs or os.cpu_count(),
+                          db=args.db, faction=args.faction, tax_rate=args.tax,
+                          auto_build_ratio=args.auto_build, in_memory=args.in_memory)
+    report = summarize(summaries)
+    print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"summary": report, "games": summaries}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Прогноз исхода боя без обращения к БД.
+
+Правила те же, что в fight.py (Battle.resolve, battle_units,
+calculate_unit_power): отряды сортируются по классу и урону, каждый
+атакующий отряд по очереди бьётся с каждым обороняющимся, сила атаки —
+урон × коэффициент класса, сила обороны — защита + живучесть.
+
+    forecast(attacking_army, defending_army)     # один бой
+    forecast_many([(attacking, defending), ...])  # много вариантов сразу
+
+Армии передаются в формате fight() — списки словарей с unit_name,
+unit_count и units_stats. forecast_many раскладывает все варианты в
+матрицы «вариант × тип отряда» и разыгрывает раунды сразу для всех
+вариантов средствами numpy. Без numpy (в сборке для Android его нет)
+варианты считаются по одному тем же кодом, что и настоящий бой; результат
+в обоих случаях совпадает с fight() до юнита.
+"""
+import sqlite3
+
+from fight import Battle, battle_order, calculate_unit_power, merge_units
+from seasons import effective_stats
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _result(winner, attacking, defending):
+    """
+    :param attacking: [(unit_name, initial_count, unit_count)] атакующих.
+    :param defending: То же для обороняющихся.
+    """
+    return {
+        "winner": winner,
+        "attacking_survivors": {name: count for name, initial, count in attacking},
+        "defending_survivors": {name: count for name, initial, count in defending},
+        "attacking_losses": sum(initial - count for name, initial, count in attacking),
+        "defending_losses": sum(initial - count for name, initial, count in defending),
+    }
+
+
+def forecast(attacking_army, defending_army):
+    """
+    Прогноз одного боя.
+    :return: {"winner": 'attacking' | 'defending', "attacking_survivors": {unit_name: count},
+              "defending_survivors": {...}, "attacking_losses", "defending_losses"}
+    """
+    # Бой без зданий и без сохранения — только раунды
+    battle = Battle(None, None, attacking_army, defending_army, None, None)
+    winner = battle.resolve()
+    return _result(
+        winner,
+        [(u['unit_name'], u['initial_count'], u['unit_count']) for u in battle.attacking],
+        [(u['unit_name'], u['initial_count'], u['unit_count']) for u in battle.defending],
+    )
+
+
+def _sorted_side(army):
+    """Отряды стороны в порядке боя (как в Battle.resolve)."""
+    return battle_order(merge_units(army))
+
+
+def _side_layout(armies):
+    """
+    Общий порядок типов отрядов для всех вариантов одной стороны.
+    :return: (список отрядов-образцов в порядке боя, {unit_name: столбец}).
+    """
+    samples = {}
+    for army in armies:
+        for unit in merge_units(army):
+            samples.setdefault(unit['unit_name'], unit)
+    order = _sorted_side(list(samples.values()))
+    return order, {unit['unit_name']: column for column, unit in enumerate(order)}
+
+
+def _fits_layout(sorted_names, layout):
+    """Совпадает ли порядок отрядов варианта с общим (иначе при равном приоритете порядок другой)."""
+    columns = [layout[name] for name in sorted_names]
+    return columns == sorted(columns)
+
+
+def forecast_many(battles):
+    """
+    Прогноз множества боёв (например, одной армии против всех городов-кандидатов).
+    :param battles: [(attacking_army, defending_army), ...]
+    :return: Список прогнозов в формате forecast() в том же порядке.
+    """
+    battles = list(battles)
+    if np is None or len(battles) < 2:
+        return [forecast(attacking, defending) for attacking, defending in battles]
+
+    attack_order, attack_columns = _side_layout(attacking for attacking, defending in battles)
+    defense_order, defense_columns = _side_layout(defending for attacking, defending in battles)
+
+    vectorised = []
+    results = [None] * len(battles)
+    for i, (attacking, defending) in enumerate(battles):
+        attacking_names = [u['unit_name'] for u in _sorted_side(attacking)]
+        defending_names = [u['unit_name'] for u in _sorted_side(defending)]
+        # Отряды с одним именем, но разными характеристиками в разных вариантах — считаем отдельно
+        same_stats = all(
+            u['units_stats'] == attack_order[attack_columns[u['unit_name']]]['units_stats'] for u in attacking
+        ) and all(
+            u['units_stats'] == defense_order[defense_columns[u['unit_name']]]['units_stats'] for u in defending
+        )
+        if same_stats and _fits_layout(attacking_names, attack_columns) \
+                and _fits_layout(defending_names, defense_columns):
+            vectorised.append(i)
+        else:
+            results[i] = forecast(attacking, defending)
+    if not vectorised:
+        return results
+
+    # Матрицы численности: строка — вариант, столбец — тип отряда в порядке боя
+    attackers = np.zeros((len(vectorised), len(attack_order)), dtype=np.int64)
+    defenders = np.zeros((len(vectorised), len(defense_order)), dtype=np.int64)
+    for row, i in enumerate(vectorised):
+        attacking, defending = battles[i]
+        for unit in merge_units(attacking):
+            attackers[row, attack_columns[unit['unit_name']]] = unit['unit_count']
+        for unit in merge_units(defending):
+            defenders[row, defense_columns[unit['unit_name']]] = unit['unit_count']
+    initial_attackers = attackers.copy()
+    initial_defenders = defenders.copy()
+
+    attack_points = [calculate_unit_power(unit, is_attacking=True) for unit in attack_order]
+    defense_points = [calculate_unit_power(unit, is_attacking=False) for unit in defense_order]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for a, attack_point in enumerate(attack_points):
+            for d, defense_point in enumerate(defense_points):
+                active = (attackers[:, a] > 0) & (defenders[:, d] > 0)
+                if not active.any():
+                    continue
+                # Те же операции, что в battle_units, для всех вариантов сразу
+                total_attack_power = attack_point * attackers[:, a]
+                total_defense_power = defense_point * defenders[:, d]
+                attack_wins = total_attack_power > total_defense_power
+                remaining_attackers = np.where(
+                    attack_wins, np.floor((total_attack_power - total_defense_power) / attack_point), 0)
+                remaining_defenders = np.where(
+                    attack_wins, 0, np.floor((total_defense_power - total_attack_power) / defense_point))
+                attackers[:, a] = np.where(active, remaining_attackers, attackers[:, a])
+                defenders[:, d] = np.where(active, remaining_defenders, defenders[:, d])
+
+    attack_won = (attackers > 0).any(axis=1)
+    for row, i in enumerate(vectorised):
+        attacking, defending = battles[i]
+        present_attackers = [attack_columns[u['unit_name']] for u in _sorted_side(attacking)]
+        present_defenders = [defense_columns[u['unit_name']] for u in _sorted_side(defending)]
+        results[i] = _result(
+            'attacking' if attack_won[row] else 'defending',
+            [(attack_order[c]['unit_name'], int(initial_attackers[row, c]), int(attackers[row, c]))
+             for c in present_attackers],
+            [(defense_order[c]['unit_name'], int(initial_defenders[row, c]), int(defenders[row, c]))
+             for c in present_defenders],
+        )
+    return results
+
+
+def army_from_db(conn, units):
+    """
+    Армия в формате fight() по списку (unit_name, unit_count); характеристики — одним запросом.
+    Юниты, которых нет в таблице units, пропускаются.
+    """
+    units = [(unit_name, unit_count) for unit_name, unit_count in units if unit_count > 0]
+    if not units:
+        return []
+    names = sorted({unit_name for unit_name, unit_count in units})
+    placeholders = ", ".join("?" * len(names))
+    try:
+        cursor = conn.execute(f"""
+            SELECT unit_name, attack, defense, durability, unit_class, image_path, faction
+            FROM units WHERE unit_name IN ({placeholders})
+        """, names)
+        stats = {row[0]: row[1:] for row in cursor.fetchall()}
+    except sqlite3.Error as e:
+        print(f"Ошибка при загрузке характеристик юнитов для прогноза: {e}")
+        return []
+    army = []
+    for unit_name, unit_count in units:
+        if unit_name not in stats:
+            continue
+        attack, defense, durability, unit_class, image_path, faction = stats[unit_name]
+        # Атака и защита — с коэффициентами текущего сезона
+        season = effective_stats(conn, faction).get(unit_name)
+        if season:
+            attack, defense = season["attack"], season["defense"]
+        army.append({
+            "unit_name": unit_name,
+            "unit_count": int(unit_count),
+            "unit_image": image_path,
+            "units_stats": {
+                "Урон": int(attack),
+                "Защита": int(defense),
+                "Живучесть": int(durability),
+                "Класс юнита": unit_class,
+            }
+        })
+    return army
@@ -0,0 +1,404 @@
+"""
+Замер времени хода на синтетических мирах разного размера.
+
+    python benchmark.py --cities 29 500 5000 --json bench.json
+    python benchmark.py --cities 500 --json after.json --compare bench.json
+
+Для каждого размера строится база с той же схемой, что и assets/game_data.db:
+города (cities и city), гарнизоны, здания, юниты, ресурсы, отношения и
+дипломатия для --factions фракций. Первые пять фракций — настоящие (их
+коэффициенты зашиты в код экономики и ИИ), остальные получают копии
+юнитов одной из них. Карта растёт вместе с числом городов, чтобы плотность
+городов оставалась как в исходной игре.
+
+Отдельно замеряются AIController.make_turn, Faction.update_resources, fight,
+GameScreen.update_city_military_status и MapWidget.draw_fortresses. Каждый
+повтор идёт на свежей копии мира в памяти. Последние два замера требуют Kivy
+и без него помечаются как пропущенные. Результаты пишутся в JSON, и --compare
+печатает отношение к прошлому прогону.
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import time
+
+from migrations import migrate
+from simulate import DEFAULT_DB
+from turn_engine import FACTIONS
+
+# Размер исходной карты и число городов на ней — по ним масштабируется синтетическая карта
+BASE_MAP_WIDTH = 1200
+BASE_MAP_HEIGHT = 800
+BASE_CITY_COUNT = 29
+
+FACTION_COLORS = ['[0, 0, 0.5]', '[0, 0.5, 0]', '[0.5, 0, 0]', '[0.5, 0.5, 0]', '[0, 0.5, 0.5]']
+
+# Рабочие таблицы, которые заполняются заново
+WORLD_TABLES = [
+    "buildings", "city", "cities", "garrisons", "units", "resources", "relations",
+    "diplomacies", "political_systems", "results", "trade_agreements", "queries",
+    "turn", "turn_save", "turn_check_attack_faction", "turn_check_move",
+    "user_faction", "auto_build_settings", "armies", "karma", "dossier",
+]
+
+
+def faction_names(count):
+    """Пять настоящих фракций, затем синтетические."""
+    names = list(FACTIONS[:count])
+    names += [f"Фракция {i}" for i in range(len(names) + 1, count + 1)]
+    return names
+
+
+def build_world(path, cities, factions=5, units_per_city=3, seed=0, source_db=DEFAULT_DB):
+    """
+    Создаёт синтетическую базу по образцу source_db.
+    :param path: Куда сохранить базу (файл перезаписывается).
+    :param cities: Количество городов.
+    :param factions: Количество фракций (не меньше 5).
+    :param units_per_city: Сколько разных отрядов стоит в каждом гарнизоне.
+    :return: Словарь с размерами построенного мира.
+    """
+    rng = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+
+    source = sqlite3.connect(source_db)
+    conn = sqlite3.connect(path)
+    try:
+        source.backup(conn)
+    finally:
+        source.close()
+    # Числовые координаты и сила армий заполняются триггерами при вставке городов и гарнизонов ниже
+    migrate(conn)
+
+    cursor = conn.cursor()
+    for table in WORLD_TABLES:
+        cursor.execute(f"DELETE FROM {table}")
+
+    names = faction_names(max(factions, len(FACTIONS)))
+
+    # Юниты: у настоящих фракций свои, синтетические копируют набор одной из настоящих
+    cursor.execute("""
+        SELECT faction, unit_name, cost_money, cost_time, image_path, attack, defense,
+               durability, unit_class, consumption
+        FROM units_default
+        ORDER BY id
+    """)
+    default_units = cursor.fetchall()
+    units_by_faction = {}
+    unit_rows = []
+    for index, faction in enumerate(names):
+        template = FACTIONS[index % len(FACTIONS)]
+        for row in default_units:
+            if row[0] != template:
+                continue
+            unit_name = row[1] if faction == template else f"{row[1]} ({faction})"
+            units_by_faction.setdefault(faction, []).append((unit_name, row[4]))
+            unit_rows.append((faction, unit_name) + tuple(row[2:]))
+    cursor.executemany("""
+        INSERT INTO units (faction, unit_name, cost_money, cost_time, image_path, attack, defense,
+                           durability, unit_class, consumption)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, unit_rows)
+
+    # Города: сначала настоящие, затем синтетические на карте, растущей вместе с их числом
+    cursor.execute("SELECT name, coordinates, faction FROM cities_default ORDER BY id")
+    real_cities = cursor.fetchall()[:cities]
+    scale = math.sqrt(max(cities, BASE_CITY_COUNT) / BASE_CITY_COUNT)
+    width, height = int(BASE_MAP_WIDTH * scale), int(BASE_MAP_HEIGHT * scale)
+    world_cities = [(name, coordinates, faction) for name, coordinates, faction in real_cities]
+    for i in range(len(world_cities), cities):
+        coordinates = f"[{rng.randrange(width)}, {rng.randrange(height)}]"
+        world_cities.append((f"Город {i + 1}", coordinates, names[i % len(names)]))
+
+    city_rows = []
+    cities_rows = []
+    for city_id, (name, coordinates, faction) in enumerate(world_cities, start=1):
+        x, y = map(int, coordinates.strip("[]").split(','))
+        color = FACTION_COLORS[names.index(faction) % len(FACTION_COLORS)]
+        city_rows.append((city_id, faction, color, name, coordinates))
+        cities_rows.append((city_id, name, coordinates, faction, f"({x}, {y})", f"({x}, {y - 20})"))
+    cursor.executemany("INSERT INTO city (id, kingdom, color, fortress_name, coordinates) VALUES (?, ?, ?, ?, ?)",
+                       city_rows)
+    cursor.executemany("""
+        INSERT INTO cities (id, name, coordinates, faction, icon_coordinates, label_coordinates)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, cities_rows)
+
+    # Гарнизоны и здания в каждом городе
+    garrison_rows = []
+    building_rows = []
+    for name, coordinates, faction in world_cities:
+        units = units_by_faction[faction]
+        for unit_name, image_path in rng.sample(units, min(units_per_city, len(units))):
+            garrison_rows.append((name, unit_name, rng.randint(10, 500), image_path))
+        building_rows.append((name, faction, "Больница", rng.randint(0, 50)))
+        building_rows.append((name, faction, "Фабрика", rng.randint(0, 50)))
+    cursor.executemany("INSERT INTO garrisons (city_id, unit_name, unit_count, unit_image) VALUES (?, ?, ?, ?)",
+                       garrison_rows)
+    cursor.executemany("INSERT INTO buildings (city_name, faction, building_type, count) VALUES (?, ?, ?, ?)",
+                       building_rows)
+
+    # Ресурсы, политика и служебные флаги для каждой фракции
+    cursor.execute("SELECT resource_type, amount FROM resources_default WHERE faction = ? ORDER BY id",
+                   (FACTIONS[0],))
+    default_resources = cursor.fetchall()
+    cursor.executemany("INSERT INTO resources (faction, resource_type, amount) VALUES (?, ?, ?)",
+                       [(faction, resource_type, amount * 100 if resource_type == "Кроны" else amount)
+                        for faction in names for resource_type, amount in default_resources])
+    cursor.executemany("INSERT INTO political_systems (faction, system) VALUES (?, ?)",
+                       [(faction, rng.choice(["Капитализм", "Коммунизм"])) for faction in names])
+    cursor.executemany("INSERT INTO turn_check_attack_faction (faction, check_attack) VALUES (?, ?)",
+                       [(faction, False) for faction in names])
+    cursor.executemany("INSERT INTO turn_check_move (faction, can_move) VALUES (?, ?)",
+                       [(faction, True) for faction in names])
+
+    # Отношения и дипломатия между всеми парами фракций (симметрично)
+    relation_rows = []
+    diplomacy_rows = []
+    for i, faction1 in enumerate(names):
+        for faction2 in names[i + 1:]:
+            relationship = str(rng.randint(0, 100))
+            status = rng.choices(["нейтралитет", "война", "союз"], weights=[7, 2, 1])[0]
+            relation_rows += [(faction1, faction2, relationship), (faction2, faction1, relationship)]
+            diplomacy_rows += [(faction1, faction2, status), (faction2, faction1, status)]
+    cursor.executemany("INSERT INTO relations (faction1, faction2, relationship) VALUES (?, ?, ?)", relation_rows)
+    cursor.executemany("INSERT INTO diplomacies (faction1, faction2, relationship) VALUES (?, ?, ?)",
+                       diplomacy_rows)
+
+    cursor.execute("INSERT INTO user_faction (faction_name) VALUES (?)", (names[0],))
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+    return {"cities": cities, "factions": len(names), "garrisons": len(garrison_rows),
+            "buildings": len(building_rows), "relations": len(relation_rows)}
+
+
+def clone_world(path, seed):
+    """Копия мира в памяти с теми же настройками, что у игры; random получает зерно seed."""
+    source = sqlite3.connect(path)
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    try:
+        source.backup(conn)
+    finally:
+        source.close()
+    conn.row_factory = sqlite3.Row
+    random.seed(seed)
+    return conn
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def stats(samples):
+    return {
+        "runs": len(samples),
+        "mean": statistics.fmean(samples),
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+    }
+
+
+# ----------------------------------------------------------------------
+# Замеры. Каждый получает свежую копию мира и возвращает список времён в секундах.
+# ----------------------------------------------------------------------
+def bench_make_turn(conn):
+    """Ход каждой фракции ИИ по отдельности (игрок — первая фракция)."""
+    from ii import AIController
+    from world_state import WorldState
+
+    world = WorldState(conn)
+    player = conn.execute("SELECT faction_name FROM user_faction").fetchone()[0]
+    samples = []
+    for faction in FACTIONS:
+        if faction == player:
+            continue
+        controller = AIController(faction, conn, world=world)
+        samples.append(timed(controller.make_turn))
+    return samples
+
+
+def bench_update_resources(conn):
+    from faction import Faction
+
+    player = conn.execute("SELECT faction_name FROM user_faction").fetchone()[0]
+    faction = Faction(player, conn)
+    return [timed(faction.update_resources)]
+
+
+def bench_fight(conn):
+    """Бой между двумя соседними по списку городами разных фракций с полными гарнизонами."""
+    from fight import fight
+    from ii import AIController
+
+    rows = conn.execute("""
+        SELECT c.name, c.faction FROM cities c
+        WHERE EXISTS (SELECT 1 FROM garrisons g WHERE g.city_id = c.name)
+        ORDER BY c.id
+    """).fetchall()
+    attacker = rows[0]
+    defender = next(row for row in rows if row[1] != attacker[1])
+    controller = AIController(attacker[1], conn)
+    attacking_army = controller.get_defending_army(attacker[0])
+    defending_army = controller.get_defending_army(defender[0])
+    return [timed(lambda: fight(attacker[0], defender[0], defending_army, attacking_army,
+                                attacker[1], defender[1], conn))]
+
+
+def bench_city_military_status(conn):
+    from game_process import GameScreen
+
+    class Host:
+        """Минимальный носитель методов GameScreen, без построения экрана."""
+        update_city_military_status = GameScreen.update_city_military_status
+
+    host = Host()
+    host.conn = conn
+    host.city_star_levels = {}
+
+    def recompute():
+        # Замеряется пересчёт, а не попадание в кэш по версии army_strength
+        host.city_star_key = None
+        host.update_city_military_status()
+
+    return [timed(recompute)]
+
+
+def bench_draw_fortresses(conn):
+    from kivy.uix.widget import Widget
+    from main import MapWidget
+
+    # Без __init__: он открывает окно и ставит таймер обновления
+    widget = MapWidget.__new__(MapWidget)
+    Widget.__init__(widget)
+    widget.conn = conn
+    widget.is_drawing = False
+    widget.fortress_rectangles = []
+    widget.city_views = {}
+    widget.current_player_kingdom = None
+    widget.map_scale = 1.0
+    widget.map_pos = [0, 0]
+    widget.base_map_width = BASE_MAP_WIDTH
+    widget.base_map_height = BASE_MAP_HEIGHT
+    return [timed(widget.draw_fortresses)]
+
+
+BENCHMARKS = {
+    "make_turn": bench_make_turn,
+    "update_resources": bench_update_resources,
+    "fight": bench_fight,
+    "update_city_military_status": bench_city_military_status,
+    "draw_fortresses": bench_draw_fortresses,
+}
+
+
+def run_benchmarks(world_path, repeat=3, seed=0, only=None):
+    """
+    Прогоняет замеры на одном мире.
+    :return: {имя замера: статистика} или {имя: {"skipped": причина}}.
+    """
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        samples = []
+        try:
+            for run in range(repeat):
+                conn = clone_world(world_path, seed + run)
+                try:
+                    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                        samples += bench(conn)
+                finally:
+                    conn.close()
+        except ImportError as e:
+            results[name] = {"skipped": f"нет зависимости: {e.name}"}
+            continue
+        except Exception as e:
+            results[name] = {"skipped": f"{type(e).__name__}: {e}"}
+            continue
+        results[name] = stats(samples)
+    return results
+
+
+def print_report(report, previous=None):
+    previous_worlds = {world["cities"]: world for world in (previous or {}).get("worlds", [])}
+    for world in report["worlds"]:
+        print(f"Мир: {world['cities']} городов, {world['factions']} фракций, "
+              f"{world['garrisons']} гарнизонов (построен за {world['build_seconds']:.2f} с)")
+        old = previous_worlds.get(world["cities"], {}).get("timings", {})
+        for name, timing in world["timings"].items():
+            if "skipped" in timing:
+                print(f"  {name}: пропущен ({timing['skipped']})")
+                continue
+            line = f"  {name}: {timing['median'] * 1000:.1f} мс (мин {timing['min'] * 1000:.1f}, n={timing['runs']})"
+            if "median" in old.get(name, {}):
+                line += f"  ×{timing['median'] / old[name]['median']:.2f} к прошлому прогону"
+            print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер времени хода на синтетических мирах")
+    parser.add_argument("--cities", type=int, nargs="+", default=[29, 500, 5000], help="размеры миров")
+    parser.add_argument("--factions", type=int, default=24, help="количество фракций в мире (не меньше 5)")
+    parser.add_argument("--units-per-city", type=int, default=3, help="отрядов в каждом гарнизоне")
+    parser.add_argument("--repeat", type=int, default=3, help="повторов каждого замера")
+    parser.add_argument("--seed", type=int, default=0, help="зерно генерации мира и ходов")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=None, help="выполнить только эти замеры")
+    parser.add_argument("--db", default=DEFAULT_DB, help="база-образец для схемы и справочников")
+    parser.add_argument("--workdir", default=None, help="куда сохранять синтетические базы (по умолчанию — временная папка)")
+    parser.add_argument("--json", dest="json_path", default=None, help="сохранить результаты в JSON")
+    parser.add_argument("--compare", default=None, help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args(argv)
+
+    import tempfile
+    with tempfile.TemporaryDirectory(prefix="lerdon_bench_") as tmp_dir:
+        workdir = args.workdir or tmp_dir
+        os.makedirs(workdir, exist_ok=True)
+        worlds = []
+        for cities in args.cities:
+            path = os.path.join(workdir, f"world_{cities}.db")
+            start = time.perf_counter()
+            world = build_world(path, cities, factions=args.factions, units_per_city=args.units_per_city,
+                                seed=args.seed, source_db=args.db)
+            world["build_seconds"] = time.perf_counter() - start
+            world["timings"] = run_benchmarks(path, repeat=args.repeat, seed=args.seed, only=args.only)
+            worlds.append(world)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "worlds": worlds,
+    }
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+    print_report(report, previous)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
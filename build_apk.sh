@@ -102,6 +102,11 @@ sed -i 's/^p4a.whitelist =.*/p4a.whitelist = python3.11/' "$SPEC_FILE" 2>/dev/nu
 sed -i 's/^android.archs =.*/android.archs = x86, arm64-v8a, armeabi-v7a, x86_64/' "$SPEC_FILE" 2>/dev/null || echo "android.archs = x86, arm64-v8a, armeabi-v7a, x86_64" >> "$SPEC_FILE"
 log_time
 
+# === Атлас текстур карты ===
+echo "🖼️ Сборка атласа иконок карты..."
+python3 texture_cache.py || error_exit "Не удалось собрать атлас текстур (нужны kivy и Pillow)"
+log_time
+
 # === Сборка APK ===
 echo "📦 Начинаем сборку APK... Это занимает 35-40 минут!"
 START_BUILD_TIME=$(date +%s)
@@ -13,7 +13,7 @@ package.domain = com.lerdon
 source.dir = .
 
 # Include files (расширения файлов для включения)
-source.include_exts = py,png,jpg,ttf,mp3,mp4,db,sqlite3,json,txt
+source.include_exts = py,png,jpg,ttf,mp3,mp4,db,sqlite3,json,txt,atlas
 
 android.add_assets = files/menu/dossier
 # Include patterns (шаблоны для включения файлов)
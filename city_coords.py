@@ -0,0 +1,64 @@
+"""
+Координаты городов в числовых столбцах.
+
+Координаты хранятся текстом: "[x, y]" в city.coordinates и cities.coordinates,
+"(x, y)" в cities.icon_coordinates и label_coordinates. Раньше их разбирали
+при каждом чтении (ast.literal_eval на карте, eval в звёздах мощи, split в ИИ).
+Шаг 1 migrations.py добавляет рядом числовые столбцы x/y
+(у cities ещё icon_x/icon_y и label_x/label_y), заполняет их и вешает
+триггеры, которые пересчитывают их при любой записи текстовых столбцов.
+Текстовые столбцы остаются источником данных для старого кода и бэкапа.
+
+Столбцы добавляются и в таблицы *_default в том же порядке, чтобы
+restore_from_backup (INSERT ... SELECT *) продолжал работать.
+
+city_coordinates(conn) возвращает кэш {name: (x, y)}: координаты городов
+за партию не меняются, поэтому он сбрасывается invalidate() только при
+пересоздании таблицы cities.
+"""
+import sqlite3
+
+_caches = {}
+
+
+class CityCoordinates:
+    def __init__(self, points):
+        """
+        :param points: {name: (x, y)} в порядке id городов.
+        """
+        self.points = points
+        self.names_by_point = {point: name for name, point in points.items()}
+
+    @classmethod
+    def from_db(cls, conn):
+        cursor = conn.cursor()
+        cursor.execute("SELECT name, x, y FROM cities WHERE x IS NOT NULL AND y IS NOT NULL ORDER BY id")
+        return cls({name: (x, y) for name, x, y in cursor.fetchall()})
+
+    def point(self, city_name):
+        """Координаты (x, y) города или None."""
+        return self.points.get(city_name)
+
+    def city_at(self, x, y):
+        """Название города с координатами (x, y) или None."""
+        return self.names_by_point.get((x, y))
+
+
+def city_coordinates(conn):
+    """Кэш координат городов для соединения; загружается при первом обращении."""
+    cache = _caches.get(id(conn))
+    if cache is None or cache[0] is not conn:
+        try:
+            cache = _caches[id(conn)] = (conn, CityCoordinates.from_db(conn))
+        except sqlite3.Error as e:
+            print(f"Ошибка при загрузке координат городов: {e}")
+            return CityCoordinates({})
+    return cache[1]
+
+
+def invalidate(conn=None):
+    """Сбрасывает кэш соединения (или все кэши) после пересоздания таблицы cities."""
+    if conn is None:
+        _caches.clear()
+    else:
+        _caches.pop(id(conn), None)
@@ -0,0 +1,103 @@
+"""
+Пространственный индекс городов для поиска ближайшего города ИИ без
+ограничения дальности.
+
+Поиск ближайшего города перебирал все города фракции на каждое
+объявление войны. CityIndex раскладывает города каждой фракции по
+равномерной сетке с шагом ATTACK_RANGE, и ближайший город ищется
+расширяющимися кольцами ячеек до первого заведомо лучшего результата.
+Списки соседей в пределах порогов ATTACK и TRANSFER дают ИИ граф дорог
+(road_graph.py); индекс нужен там, где порога нет — например, сбор войск
+в ближайший к цели союзный город, когда в пределах переброски своих
+городов нет.
+
+Расстояние — манхэттенское, как в графе дорог. При равных расстояниях
+выигрывает город с меньшим id (порядок WorldState.cities), так что
+результат не зависит от раскладки по ячейкам.
+
+Индекс строится по снимку мира и перестраивается WorldState после
+reload_cities(), то есть только когда меняются владельцы городов.
+"""
+from road_graph import ATTACK, DISTANCE_LIMITS
+
+# Дальность атаки: до вражеского города должно быть меньше этого расстояния
+ATTACK_RANGE = DISTANCE_LIMITS[ATTACK]
+
+
+class CityIndex:
+    def __init__(self, cities, cell_size=ATTACK_RANGE):
+        """
+        :param cities: {name: {"faction", "x", "y", ...}} в порядке id (WorldState.cities).
+        :param cell_size: Размер ячейки сетки.
+        """
+        self.cell_size = cell_size
+        self.points = {}  # {faction: [(order, name, x, y)]}
+        self.grids = {}   # {faction: {(cx, cy): [(order, name, x, y)]}}
+        self.bounds = {}  # {faction: (min_cx, min_cy, max_cx, max_cy)}
+        for order, (name, city) in enumerate(cities.items()):
+            if city["x"] is None:
+                continue
+            point = (order, name, city["x"], city["y"])
+            self.points.setdefault(city["faction"], []).append(point)
+            grid = self.grids.setdefault(city["faction"], {})
+            grid.setdefault(self._cell(city["x"], city["y"]), []).append(point)
+        for faction, grid in self.grids.items():
+            xs = [cx for cx, cy in grid]
+            ys = [cy for cx, cy in grid]
+            self.bounds[faction] = (min(xs), min(ys), max(xs), max(ys))
+
+    def _cell(self, x, y):
+        return x // self.cell_size, y // self.cell_size
+
+    @staticmethod
+    def _ring(cx, cy, radius):
+        """Ячейки на расстоянии ровно radius ячеек (по Чебышёву) от (cx, cy)."""
+        if radius == 0:
+            yield cx, cy
+            return
+        for dx in range(-radius, radius + 1):
+            yield cx + dx, cy - radius
+            yield cx + dx, cy + radius
+        for dy in range(-radius + 1, radius):
+            yield cx - radius, cy + dy
+            yield cx + radius, cy + dy
+
+    def _nearest(self, faction, x, y, limit=None, exclude=None):
+        """Ближайший город фракции к точке как (distance, order, name) или None."""
+        grid = self.grids.get(faction)
+        if not grid:
+            return None
+        cx, cy = self._cell(x, y)
+        min_cx, min_cy, max_cx, max_cy = self.bounds[faction]
+        max_radius = max(cx - min_cx, max_cx - cx, cy - min_cy, max_cy - cy)
+        best = None
+        radius = 0
+        while radius <= max_radius:
+            # Любая точка в кольце radius дальше, чем (radius - 1) ячеек по одной из осей
+            lower_bound = (radius - 1) * self.cell_size
+            if best is not None and lower_bound > best[0]:
+                break
+            if limit is not None and lower_bound >= limit:
+                break
+            for cell in self._ring(cx, cy, radius):
+                for order, name, px, py in grid.get(cell, ()):
+                    if name == exclude:
+                        continue
+                    distance = abs(px - x) + abs(py - y)
+                    if limit is not None and distance >= limit:
+                        continue
+                    candidate = (distance, order, name)
+                    if best is None or candidate < best:
+                        best = candidate
+            radius += 1
+        return best
+
+    def nearest(self, faction, x, y, limit=None, exclude=None):
+        """
+        Ближайший к точке город фракции.
+        :param limit: Расстояние должно быть строго меньше limit (None — без ограничения).
+        :param exclude: Имя города, который не рассматривается (например, сама точка).
+        :return: Имя города или None.
+        """
+        best = self._nearest(faction, x, y, limit, exclude)
+        return best[2] if best else None
@@ -52,3 +52,11 @@ if not os.path.exists(copied_db):
 # В дальнейшем остальные модули (например, ваши DAO/ORM или SQL-запросы)
 # могут просто импортировать db_path из этого файла
 db_path = copied_db
+
+# ==========================
+# 5. Миграции схемы
+# ==========================
+# Копия базы у игрока могла остаться от старой версии игры:
+# недостающие шаги схемы (индексы, новые столбцы и таблицы) применяются здесь
+from migrations import migrate_file
+migrate_file(db_path)
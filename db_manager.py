@@ -1,23 +1,146 @@
+"""
+Соединения с базой игры: один писатель и пул читателей.
+
+Раньше всё приложение работало через одно соединение из Lerdon.__init__
+(check_same_thread=False), а одиночка DBManager здесь же не использовался.
+Теперь DBManager открывает:
+
+    - писателя (writer) — единственное соединение, которое меняет базу.
+      Его получают движок хода (TurnEngine) и всё, что сейчас пишет;
+    - пул соединений только для чтения (режим WAL) для запросов интерфейса:
+      читатель видит последнее зафиксированное состояние и не ждёт,
+      пока писатель держит транзакцию хода.
+
+    db = DBManager(db_path)
+    conn = db.writer
+    with reader(conn) as read_conn:           # conn — писатель или любое соединение
+        relations = DiplomacyRepository(read_conn).diplomacies(faction)
+
+reader(conn) берёт читателя из пула менеджера, которому принадлежит
+писатель conn. Если менеджера нет (simulate.py, benchmark.py, база в
+памяти) или поток-владелец писателя сам сейчас внутри транзакции, он
+читает через писателя — так поток хода видит собственные незафиксированные
+изменения. Владелец писателя — поток, создавший менеджер; движок хода
+забирает писателя себе через claim_writer(conn) в начале хода.
+
+Подготовленные запросы кэширует sqlite3 на каждом соединении (параметр
+cached_statements); репозитории (repositories.py) держат текст запросов
+в константах, поэтому повторный запрос берётся из кэша без разбора SQL.
+"""
+import os
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+READERS = 2
+STATEMENT_CACHE = 256
+BUSY_TIMEOUT = 5000
+
+# {id(писатель): DBManager}
+_managers = {}
+
+
+def _configure(conn):
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT};")
+
 
 class DBManager:
-    _instance = None
-
-    def __new__(cls, db_path=None):
-        if cls._instance is None:
-            cls._instance = super(DBManager, cls).__new__(cls)
-            cls._instance.db_path = db_path
-            cls._instance.conn = sqlite3.connect(db_path, check_same_thread=False)
-            cls._instance.conn.execute("PRAGMA journal_mode=WAL;")
-            cls._instance.conn.execute("PRAGMA synchronous=NORMAL;")
-            cls._instance.conn.execute("PRAGMA busy_timeout=5000;")
-        return cls._instance
-
-    def get_connection(self):
-        return self._instance.conn
-
-    def close_all(self):
-        if self._instance.conn:
-            self._instance.conn.execute("PRAGMA wal_checkpoint(FULL);")
-            self._instance.conn.execute("PRAGMA journal_mode=DELETE;")
-            self._instance.conn.close()
\ No newline at end of file
+    def __init__(self, db_path, readers=READERS):
+        """
+        :param db_path: Файл базы игры.
+        :param readers: Сколько соединений для чтения держать в пуле.
+        """
+        self.db_path = db_path
+        self.readers = readers
+        self.writer = sqlite3.connect(db_path, check_same_thread=False, cached_statements=STATEMENT_CACHE)
+        _configure(self.writer)
+        self.writer.execute("PRAGMA journal_mode=WAL;")
+        self.writer.execute("PRAGMA synchronous=NORMAL;")
+        self.writer_thread = threading.get_ident()
+        self._pool = queue.LifoQueue()
+        self._opened = []
+        self._lock = threading.Lock()
+        self.closed = False
+        _managers[id(self.writer)] = self
+
+    def _open_reader(self):
+        uri = f"file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=STATEMENT_CACHE)
+        _configure(conn)
+        conn.execute("PRAGMA query_only=ON;")
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._opened) < self.readers:
+                conn = self._open_reader()
+                self._opened.append(conn)
+                return conn
+        # Все читатели заняты — ждём освободившегося
+        return self._pool.get()
+
+    @contextmanager
+    def reader(self):
+        """Соединение только для чтения из пула; возвращается в пул по выходе из блока."""
+        if self.writer.in_transaction and threading.get_ident() == self.writer_thread:
+            yield self.writer
+            return
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def claim_writer(self):
+        """Делает текущий поток владельцем писателя (поток, в котором идёт ход)."""
+        self.writer_thread = threading.get_ident()
+
+    def close(self):
+        """Закрывает читателей, делает checkpoint WAL и закрывает писателя. Повторный вызов ничего не делает."""
+        if self.closed:
+            return
+        self.closed = True
+        _managers.pop(id(self.writer), None)
+        for conn in self._opened:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"Ошибка при закрытии соединения для чтения: {e}")
+        self._opened = []
+        try:
+            self.writer.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        except sqlite3.Error as e:
+            print(f"[WARNING] Не удалось сделать WAL checkpoint: {e}")
+        self.writer.close()
+
+
+def manager(conn):
+    """DBManager, которому принадлежит писатель conn, или None."""
+    return _managers.get(id(conn))
+
+
+@contextmanager
+def reader(conn):
+    """
+    Соединение для чтения: из пула менеджера писателя conn, а без менеджера — сам conn.
+    """
+    db = manager(conn)
+    if db is None:
+        yield conn
+        return
+    with db.reader() as read_conn:
+        yield read_conn
+
+
+def claim_writer(conn):
+    """Передаёт писателя conn текущему потоку; для соединений без менеджера ничего не делает."""
+    db = manager(conn)
+    if db is not None:
+        db.claim_writer()
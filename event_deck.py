@@ -0,0 +1,145 @@
+"""
+Колода случайных событий.
+
+EventManager выбирал событие запросом ORDER BY RANDOM() LIMIT 1 —
+сортировкой всей таблицы events на каждый бросок, — а для событий
+sequences ещё и вызывал json_extract для каждой строки; JSON эффектов
+выбранного события разбирался заново. Теперь таблица читается один раз
+при создании EventManager:
+
+    deck = EventDeck.from_db(conn)
+    deck.draw(ACTIVE, PASSIVE)     # обычное событие хода
+    deck.draw((SEQUENCES, 1))      # событие за положительную карму (kf > 1)
+    deck.draw((SEQUENCES, -1))     # событие за отрицательную карму (kf < 1)
+
+События группируются по типу и знаку kf (больше, меньше или равен 1),
+эффекты разбираются заранее. Выбор — методом псевдонимов (Уолкер/Воуз):
+O(1) на бросок с учётом веса события (ключ "weight" в эффектах, по
+умолчанию 1). Генератор случайных чисел передаётся снаружи; по умолчанию
+это модуль random, поэтому прогон simulate.py с --seed воспроизводим.
+"""
+import json
+import random
+import sqlite3
+
+ACTIVE = "active"
+PASSIVE = "passive"
+SEQUENCES = "sequences"
+
+
+class Event:
+    def __init__(self, event_id, description, event_type, effects, option_1_description=None,
+                 option_2_description=None):
+        """
+        :param effects: Разобранный JSON эффектов события.
+        """
+        self.id = event_id
+        self.description = description
+        self.event_type = event_type
+        self.effects = effects
+        if event_type == ACTIVE:
+            # Тексты вариантов лежат в отдельных столбцах, обработчики берут их из эффектов
+            effects["option_1_description"] = option_1_description
+            effects["option_2_description"] = option_2_description
+        self.resource = effects.get("resource")
+        self.kf = effects.get("kf")
+        self.weight = effects.get("weight", 1)
+
+    @property
+    def kf_sign(self):
+        """1 для kf > 1, -1 для kf < 1, 0 без kf или при kf = 1."""
+        if self.kf is None or self.kf == 1.0:
+            return 0
+        return 1 if self.kf > 1.0 else -1
+
+    @property
+    def group(self):
+        """Ключ группы в колоде: (тип события, знак kf)."""
+        return self.event_type, self.kf_sign
+
+
+class AliasTable:
+    """Выбор индекса с вероятностью, пропорциональной весу, за O(1) (метод псевдонимов)."""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        self.n = n
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        scaled = [weight * n / total for weight in weights]
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+
+    def sample(self, rng):
+        i = min(int(rng.random() * self.n), self.n - 1)
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+class EventDeck:
+    def __init__(self, events, rng=None):
+        """
+        :param events: Список Event.
+        :param rng: Генератор с методом random() (random.Random или модуль random).
+        """
+        self.rng = rng if rng is not None else random
+        self.groups = {}
+        for event in events:
+            if event.weight > 0:
+                self.groups.setdefault(event.group, []).append(event)
+        self._tables = {}  # {ключи групп: (события, AliasTable)}
+
+    @classmethod
+    def from_db(cls, conn, rng=None):
+        """Читает таблицу events; при ошибке колода пуста."""
+        try:
+            cursor = conn.execute("""
+                SELECT id, description, event_type, effects, option_1_description, option_2_description
+                FROM events
+                ORDER BY id
+            """)
+            rows = cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Ошибка при загрузке событий: {e}")
+            return cls([], rng)
+        events = []
+        for event_id, description, event_type, effects, option_1, option_2 in rows:
+            try:
+                parsed = json.loads(effects) if effects else {}
+            except ValueError as e:
+                print(f"Событие {event_id}: не удалось разобрать эффекты: {e}")
+                continue
+            events.append(Event(event_id, description, event_type, parsed, option_1, option_2))
+        return cls(events, rng)
+
+    def _table(self, keys):
+        table = self._tables.get(keys)
+        if table is None:
+            events = []
+            for key in keys:
+                if isinstance(key, str):
+                    # Тип события без учёта kf — все его группы
+                    events += [event for group, members in self.groups.items() if group[0] == key
+                               for event in members]
+                else:
+                    events += self.groups.get(key, [])
+            events.sort(key=lambda event: event.id)
+            table = self._tables[keys] = (events, AliasTable([event.weight for event in events]) if events else None)
+        return table
+
+    def draw(self, *keys):
+        """
+        Случайное событие из указанных групп или None, если в них нет событий.
+        :param keys: Тип события (ACTIVE) или группа (SEQUENCES, 1) — несколько сразу.
+        """
+        events, table = self._table(keys)
+        if not events:
+            return None
+        return events[table.sample(self.rng)]
@@ -1,5 +1,6 @@
-from lerdon_libraries import *
-from db_lerdon_connect import *
+import random
+
+from event_deck import ACTIVE, PASSIVE, SEQUENCES, EventDeck
 
 def format_number(number):
     """Форматирует число с добавлением приставок (тыс., млн., млрд., трлн., квадр., квинт., секст., септил., октил., нонил., децил., андец.)"""
@@ -40,6 +41,9 @@ def format_number(number):
 
 def get_adaptive_font_size(min_size=15, max_size=20):
     """Адаптирует размер шрифта под ширину экрана с учетом Android"""
+    from kivy.core.window import Window
+    from kivy.utils import platform
+
     screen_width = Window.width
 
     # Увеличенный коэффициент для лучшей читаемости
@@ -58,11 +62,15 @@ def get_adaptive_font_size(min_size=15, max_size=20):
 
 
 class EventManager:
-    def __init__(self, player_faction, game_screen, class_faction_economic, conn):
+    def __init__(self, player_faction, game_screen, class_faction_economic, conn, rng=None):
+        """:param rng: Генератор случайных чисел для колоды и кармы (по умолчанию модуль random)."""
         self.player_faction = player_faction
         self.game_screen = game_screen  # Ссылка на экран игры для отображения событий
         self.db_connection = conn # Используем единую сессию с БД
         self.economics = class_faction_economic  # Экономический модуль
+        self.rng = rng if rng is not None else random
+        # События читаются один раз за партию
+        self.deck = EventDeck.from_db(conn, self.rng)
 
     def generate_event(self, current_turn):
         """
@@ -76,32 +84,18 @@ class EventManager:
             return  # Если событие sequences сгенерировано — выходим
 
         # Иначе генерируем обычное событие (active или passive)
-        cursor = self.db_connection.cursor()
-        cursor.execute("""
-            SELECT id, description, event_type, effects, option_1_description, option_2_description
-            FROM events
-            WHERE event_type IN ('active', 'passive')
-            ORDER BY RANDOM()
-            LIMIT 1
-        """)
-        event = cursor.fetchone()
+        event = self.deck.draw(ACTIVE, PASSIVE)
         if not event:
             print("События не найдены в базе данных.")
             return
 
-        # Распаковываем данные события
-        event_id, description, event_type, effects, option_1_description, option_2_description = event
-        effects = json.loads(effects)  # Преобразуем JSON-строку в словарь
-        effects["option_1_description"] = option_1_description
-        effects["option_2_description"] = option_2_description
-
         # Обрабатываем событие в зависимости от его типа
-        if event_type == "active":
-            print(f"Активное событие: {description}")
-            self.handle_active_event(description, effects)
-        elif event_type == "passive":
-            print(f"Пассивное событие: {description}")
-            self.handle_passive_event(description, effects)
+        if event.event_type == ACTIVE:
+            print(f"Активное событие: {event.description}")
+            self.handle_active_event(event.description, event.effects)
+        elif event.event_type == PASSIVE:
+            print(f"Пассивное событие: {event.description}")
+            self.handle_passive_event(event.description, event.effects)
 
     def handle_active_event(self, description, effects):
         """
@@ -130,7 +124,7 @@ class EventManager:
         turns_since_last_check = current_turn - last_check_turn
 
         # Проверяем, прошло ли достаточно ходов для нового "среза"
-        if turns_since_last_check < random.randint(10, 15):  # ↑ увеличили интервал
+        if turns_since_last_check < self.rng.randint(10, 15):  # ↑ увеличили интервал
             return False
 
         # Обновляем last_check_turn, чтобы избежать повторной попытки в ближайших ходах
@@ -178,28 +172,16 @@ class EventManager:
         Генерирует событие sequences с учётом типа кармы.
         :param karma_type: 'posi' или 'negat'
         """
-        kf_condition = "> 1.0" if karma_type == "posi" else "< 1.0"
-        query = f"""
-            SELECT id, description, effects 
-            FROM events
-            WHERE event_type = 'sequences'
-              AND json_extract(effects, '$.kf') {kf_condition}
-            ORDER BY RANDOM()
-            LIMIT 1
-        """
-        cursor = self.db_connection.cursor()
-        cursor.execute(query)
-        event = cursor.fetchone()
+        kf_sign = 1 if karma_type == "posi" else -1
+        event = self.deck.draw((SEQUENCES, kf_sign))
         if not event:
-            print(f"[WARN] Нет подходящих событий для '{karma_type}' (kf {kf_condition})")
+            print(f"[WARN] Нет подходящих событий для '{karma_type}' (kf {'> 1.0' if kf_sign > 0 else '< 1.0'})")
             return False
 
-        event_id, description, effects_json = event
-        effects = json.loads(effects_json)
-
+        description = event.description
         # Получаем тип ресурса и коэффициент
-        resource_type = effects.get("resource", None)
-        kf = effects.get("kf", 1.0)
+        resource_type = event.resource
+        kf = event.kf
 
         if resource_type:
             current_value = self.get_resource_amount(resource_type)
@@ -247,6 +229,10 @@ class EventManager:
         """
         Отображение активного события в виде модального окне с выбором.
         """
+        from kivy.metrics import dp
+        from kivy.uix.boxlayout import BoxLayout
+        from kivy.uix.label import Label
+
         content = BoxLayout(orientation="vertical", padding=dp(15), spacing=dp(10))
         font_size = get_adaptive_font_size()
 
@@ -282,13 +268,11 @@ class EventManager:
 
         # Обработчики нажатий
         def on_button_1(instance):
-            self.apply_effects_with_economic_module(effects.get("option_1", {}))
-            self.update_karma(self.player_faction, 4)
+            self.choose_option(effects, 1)
             popup.dismiss()
 
         def on_button_2(instance):
-            self.apply_effects_with_economic_module(effects.get("option_2", {}))
-            self.update_karma(self.player_faction, -6)
+            self.choose_option(effects, 2)
             popup.dismiss()
 
         button_1.bind(on_press=on_button_1)
@@ -299,8 +283,26 @@ class EventManager:
         content.add_widget(button_2)
         popup.open()
 
+    def choose_option(self, effects, option):
+        """
+        Применяет выбранный вариант активного события и меняет карму игрока.
+        :param option: 1 — первый вариант (+4 к карме), 2 — второй (-6 к карме).
+        """
+        if option == 1:
+            self.apply_effects_with_economic_module(effects.get("option_1", {}))
+            self.update_karma(self.player_faction, 4)
+        else:
+            self.apply_effects_with_economic_module(effects.get("option_2", {}))
+            self.update_karma(self.player_faction, -6)
+
     def create_styled_popup(self, title, content):
         """Создает стилизованное всплывающее окно с анимацией и адаптивным размером"""
+        from kivy.animation import Animation
+        from kivy.core.window import Window
+        from kivy.graphics import Color, RoundedRectangle
+        from kivy.metrics import dp
+        from kivy.uix.popup import Popup
+
         width = min(Window.width * 0.95, dp(500))
         height = min(Window.height * 0.75, dp(600))
 
@@ -337,6 +339,10 @@ class EventManager:
 
     def create_gradient_button(self, text, color1, color2, font_size):
         """Создает кнопку с градиентным фоном и закругленными углами без лишних прямоугольников"""
+        from kivy.graphics import Color, RoundedRectangle
+        from kivy.metrics import dp
+        from kivy.uix.button import Button
+
         btn = Button(
             text=text,
             background_normal='',
@@ -429,6 +435,13 @@ class EventManager:
         по которому скользит текст события целиком, не обрезаясь.
         Label исчезает только после того, как текст полностью выйдет за левый край.
         """
+        from kivy.animation import Animation
+        from kivy.clock import Clock
+        from kivy.core.window import Window
+        from kivy.graphics import Color, Rectangle
+        from kivy.metrics import dp
+        from kivy.uix.boxlayout import BoxLayout
+        from kivy.uix.label import Label
 
         # Проверяем, есть ли уже активная бегущая строка
         if hasattr(self, '_running_marquee') and self._running_marquee:
@@ -1,5 +1,17 @@
-from lerdon_libraries import *
-from db_lerdon_connect import *
+import sqlite3
+
+import map_events
+import notifications
+from lerdon_log import get_logger
+from unit_of_work import UnitOfWork
+
+log = get_logger("fight")
+
+# Урон, необходимый для разрушения одного здания
+DAMAGE_PER_BUILDING = 45900
+# Типы зданий, которые разрушаются в первую очередь (в этом порядке)
+PRIORITY_BUILDINGS = ['Больница', 'Фабрика']
+
 
 def merge_units(army):
     """
@@ -21,52 +33,34 @@ def merge_units(army):
             merged_army[unit_name]['unit_count'] += unit['unit_count']
     return list(merged_army.values())
 
-def update_results_table(db_connection, faction, units_combat, units_destroyed, enemy_losses):
-    """
-    Обновляет или создает запись в таблице results для указанной фракции.
+def _write_results(cursor, faction, units_combat, units_destroyed, enemy_losses):
+    """Добавляет итоги боя фракции в таблицу results (создаёт запись, если её нет)."""
+    # Проверяем, существует ли уже запись для этой фракции
+    cursor.execute("SELECT COUNT(*) FROM results WHERE faction = ?", (faction,))
+    exists = cursor.fetchone()[0]
+
+    if exists > 0:
+        # Обновляем существующую запись
+        cursor.execute("""
+            UPDATE results
+            SET 
+                Units_Combat = Units_Combat + ?, 
+                Units_Destroyed = Units_Destroyed + ?,
+                Units_killed = Units_killed + ?
+            WHERE faction = ?
+        """, (units_combat, units_destroyed, enemy_losses, faction))
+    else:
+        # Вставляем новую запись
+        cursor.execute("""
+            INSERT INTO results (
+                Units_Combat, Units_Destroyed, Units_killed, 
+                Army_Efficiency_Ratio, Average_Deal_Ratio, 
+                Average_Net_Profit_Coins, Average_Net_Profit_Raw, 
+                Economic_Efficiency, faction
+            )
+            VALUES (?, ?, ?, 0, 0, 0, 0, 0, ?)
+        """, (units_combat, units_destroyed, enemy_losses, faction))
 
-    :param db_connection: Соединение с базой данных.
-    :param faction: Название фракции.
-    :param units_combat: Общее число юнитов фракции на начало боя.
-    :param units_destroyed: Общие потери фракции после боя.
-    :param enemy_losses: Потери противника (количество уничтоженных юнитов).
-    """
-    try:
-        with db_connection:  # BEGIN + commit() / rollback() автоматически
-            cursor = db_connection.cursor()
-
-            # Проверяем, существует ли уже запись для этой фракции
-            cursor.execute("SELECT COUNT(*) FROM results WHERE faction = ?", (faction,))
-            exists = cursor.fetchone()[0]
-
-            if exists > 0:
-                # Обновляем существующую запись
-                cursor.execute("""
-                    UPDATE results
-                    SET 
-                        Units_Combat = Units_Combat + ?, 
-                        Units_Destroyed = Units_Destroyed + ?,
-                        Units_killed = Units_killed + ?
-                    WHERE faction = ?
-                """, (units_combat, units_destroyed, enemy_losses, faction))
-            else:
-                # Вставляем новую запись
-                cursor.execute("""
-                    INSERT INTO results (
-                        Units_Combat, Units_Destroyed, Units_killed, 
-                        Army_Efficiency_Ratio, Average_Deal_Ratio, 
-                        Average_Net_Profit_Coins, Average_Net_Profit_Raw, 
-                        Economic_Efficiency, faction
-                    )
-                    VALUES (?, ?, ?, 0, 0, 0, 0, 0, ?)
-                """, (units_combat, units_destroyed, enemy_losses, faction))
-
-    except sqlite3.IntegrityError as e:
-        print(f"[ERROR] Ошибка целостности данных в results: {e}")
-    except sqlite3.Error as e:
-        print(f"[ERROR] Ошибка базы данных в update_results_table: {e}")
-    except Exception as e:
-        print(f"[ERROR] Неожиданная ошибка в update_results_table: {e}")
 
 def show_battle_report(report_data, is_user_involved=False, user_faction=None, conn=None):
     """
@@ -75,8 +69,18 @@ def show_battle_report(report_data, is_user_involved=False, user_faction=None, c
     :param is_user_involved: Участвовал ли пользователь в бою.
     :param user_faction: Фракция пользователя (если участвовал).
     """
+    from kivy.graphics import Color, Rectangle
+    from kivy.metrics import dp, sp
+    from kivy.uix.boxlayout import BoxLayout
+    from kivy.uix.button import Button
+    from kivy.uix.gridlayout import GridLayout
+    from kivy.uix.label import Label
+    from kivy.uix.popup import Popup
+    from kivy.uix.scrollview import ScrollView
+    from kivy.utils import platform
+
     if not report_data:
-        print("Нет данных для отображения.")
+        log.debug("Нет данных для отображения.")
         return
 
     # Основной контейнер
@@ -202,14 +206,6 @@ def show_battle_report(report_data, is_user_involved=False, user_faction=None, c
     content.add_widget(scroll_view)
     content.add_widget(close_button)
 
-    # === Обновление досье только если игрок участвовал ===
-    if is_user_involved and user_faction and report_data:
-        is_victory = any(item['result'] == "Победа" for item in report_data)
-        try:
-            update_dossier_battle_stats(conn, user_faction, is_victory)
-        except Exception as e:
-            print(f"[Ошибка] Не удалось обновить досье: {e}")
-
     # Всплывающее окно
     popup = Popup(
         title="Итоги боя",
@@ -219,8 +215,257 @@ def show_battle_report(report_data, is_user_involved=False, user_faction=None, c
     )
     popup.open()
 
+def battle_order(units):
+    """Отряды в порядке вступления в бой: класс по возрастанию, затем урон по убыванию (сортировка устойчивая)."""
+    def priority(u):
+        stats = u.get('units_stats', {})
+        unit_class = int(stats.get('Класс юнита', 0))
+        attack = int(stats.get('Урон', 0))
+        return (unit_class, -attack)
+
+    return sorted(units, key=priority)
+
+
+class Battle:
+    """
+    Бой целиком в памяти.
+
+    Раньше бой ходил в БД на каждую пару «атакующий отряд × обороняющийся
+    отряд»: урон по зданиям читал и обновлял таблицу buildings, а гарнизоны
+    потом записывались построчно. Battle получает армии, здания обороняемого
+    города и гарнизон города атаки заранее (load), разыгрывает бой в памяти
+    (resolve) и записывает итог в одной точке сохранения (save).
+    """
+
+    def __init__(self, attacking_city, defending_city, attacking_army, defending_army,
+                 attacking_fraction, defending_fraction, buildings=None, attacking_garrison=None):
+        """
+        :param buildings: Здания обороняемого города {id: [building_type, count]} в порядке id.
+        :param attacking_garrison: Гарнизон города атаки до боя {unit_name: unit_count}.
+        """
+        self.attacking_city = attacking_city
+        self.defending_city = defending_city
+        self.attacking_fraction = attacking_fraction
+        self.defending_fraction = defending_fraction
+        self.buildings = buildings if buildings is not None else {}
+        self.attacking_garrison = attacking_garrison if attacking_garrison is not None else {}
+        self.changed_buildings = set()
+        self.damage_info = {}  # {building_type: уничтожено зданий} за весь бой
+        self.winner = None
+
+        # Объединяем одинаковые юниты
+        self.attacking = merge_units(attacking_army)
+        self.defending = merge_units(defending_army)
+
+        # Инициализируем потери
+        for u in self.attacking + self.defending:
+            u['initial_count'] = u['unit_count']
+            u['killed_count'] = 0
+
+    @classmethod
+    def load(cls, conn, attacking_city, defending_city, attacking_army, defending_army,
+             attacking_fraction, defending_fraction):
+        """Создаёт бой, загрузив здания обороняемого города и гарнизон города атаки."""
+        buildings = {}
+        attacking_garrison = {}
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, building_type, count FROM buildings
+                WHERE city_name = ?
+                ORDER BY id
+            """, (defending_city,))
+            buildings = {row[0]: [row[1], row[2]] for row in cursor.fetchall()}
+            cursor.execute("""
+                SELECT unit_name, unit_count FROM garrisons WHERE city_id = ?
+            """, (attacking_city,))
+            attacking_garrison = {row[0]: row[1] for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            print(f"Ошибка при загрузке данных для боя: {e}")
+        return cls(attacking_city, defending_city, attacking_army, defending_army,
+                   attacking_fraction, defending_fraction, buildings, attacking_garrison)
+
+    def resolve(self):
+        """Разыгрывает бой; возвращает победителя ('attacking' или 'defending')."""
+        self.attacking = battle_order(self.attacking)
+        self.defending = battle_order(self.defending)
+
+        # Бой: каждый атакующий против каждого обороняющего
+        for atk in self.attacking:
+            for df in self.defending:
+                if atk['unit_count'] > 0 and df['unit_count'] > 0:
+                    total_attack_power = calculate_unit_power(atk, is_attacking=True) * atk['unit_count']
+                    self.damage_buildings(total_attack_power)
+                    battle_units(atk, df)
+
+        # Вычисляем потери после боя
+        for u in self.attacking + self.defending:
+            u['killed_count'] = u['initial_count'] - u['unit_count']
+
+        # Определяем победителя
+        self.winner = 'attacking' if any(u['unit_count'] > 0 for u in self.attacking) else 'defending'
+        return self.winner
+
+    def damage_buildings(self, all_damage):
+        """
+        Урон по инфраструктуре обороняемого города: разрушаются больницы, затем фабрики.
+        :param all_damage: Общий урон раунда.
+        """
+        # Как и раньше, учитываются только здания с count > 0; при одинаковом типе — последняя строка
+        city_data = {}
+        for building_type, count in self.buildings.values():
+            if count is not None and count > 0:
+                city_data[building_type] = count
+        if not city_data:
+            return
+
+        log.debug("Данные инфраструктуры до удара: %s", city_data)
+
+        # Сколько зданий может быть разрушено этим уроном
+        potential_destroyed_buildings = int(all_damage // DAMAGE_PER_BUILDING)
+
+        for building in PRIORITY_BUILDINGS:
+            if building in city_data and city_data[building] > 0:
+                count = city_data[building]
+                if potential_destroyed_buildings >= count:
+                    # Уничтожаем все здания этого типа
+                    destroyed = count
+                    self._set_building_count(building, lambda current: 0)
+                    potential_destroyed_buildings -= count
+                else:
+                    # Уничтожаем часть зданий
+                    destroyed = potential_destroyed_buildings
+                    self._set_building_count(
+                        building, lambda current: current - destroyed if current is not None else None)
+                    potential_destroyed_buildings = 0
+                self.damage_info[building] = self.damage_info.get(building, 0) + destroyed
+
+                if potential_destroyed_buildings == 0:
+                    break
+
+        log.debug("Данные инфраструктуры после удара: %s", {
+            building_type: count for building_type, count in self.buildings.values()})
+
+    def _set_building_count(self, building_type, update):
+        # Изменение касается всех строк этого типа, как UPDATE ... WHERE building_type = ?
+        for building_id, row in self.buildings.items():
+            if row[0] == building_type:
+                row[1] = update(row[1])
+                self.changed_buildings.add(building_id)
+
+    def save(self, conn, uow=None):
+        """
+        Записывает итог боя (гарнизоны, здания, владельца города, results) в точке
+        сохранения: ошибка откатывает только бой, а не уже записанные действия хода.
+        :param uow: UnitOfWork хода ИИ; без него (бой из интерфейса) итог фиксируется сразу.
+        :return: True, если итог записан; False, если запись откатилась.
+        """
+        uow = uow if uow is not None else UnitOfWork(conn)
+        attacker_won = self.winner == 'attacking'
+        survivors = self.attacking if attacker_won else self.defending
+        # Остаток в городе атаки: исходный гарнизон минус ушедшие в бой
+        remaining_in_source = [
+            (unit['unit_name'], self.attacking_garrison.get(unit['unit_name'], 0) - unit['initial_count'])
+            for unit in self.attacking
+        ]
+        try:
+            with uow.savepoint():
+                cursor = conn.cursor()
+                # Гарнизон обороняемого города заменяется выжившими победителя
+                cursor.execute("DELETE FROM garrisons WHERE city_id = ?", (self.defending_city,))
+                cursor.executemany("""
+                    INSERT INTO garrisons (city_id, unit_name, unit_count, unit_image)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(city_id, unit_name) DO UPDATE SET
+                    unit_count = excluded.unit_count,
+                    unit_image = excluded.unit_image
+                """, [
+                    (self.defending_city, unit['unit_name'], unit['unit_count'], unit.get('unit_image', ''))
+                    for unit in survivors if unit['unit_count'] > 0
+                ])
+
+                # Гарнизон города атаки (общий блок для обоих исходов)
+                cursor.executemany("""
+                    UPDATE garrisons
+                    SET unit_count = ?
+                    WHERE city_id = ? AND unit_name = ?
+                """, [(count, self.attacking_city, name) for name, count in remaining_in_source if count > 0])
+                cursor.executemany("""
+                    DELETE FROM garrisons
+                    WHERE city_id = ? AND unit_name = ?
+                """, [(self.attacking_city, name) for name, count in remaining_in_source if count <= 0])
+
+                # Здания, пострадавшие от урона
+                cursor.executemany("UPDATE buildings SET count = ? WHERE id = ?", [
+                    (self.buildings[building_id][1], building_id) for building_id in sorted(self.changed_buildings)
+                ])
+
+                if attacker_won:
+                    # Обновляем принадлежность города
+                    cursor.execute("""
+                        UPDATE city SET kingdom = ? WHERE fortress_name = ?
+                    """, (self.attacking_fraction, self.defending_city))
+                    cursor.execute("""
+                        UPDATE cities SET faction = ? WHERE name = ?
+                    """, (self.attacking_fraction, self.defending_city))
+                    cursor.execute("""
+                        UPDATE buildings
+                        SET faction = ?
+                        WHERE city_name = ?
+                    """, (self.attacking_fraction, self.defending_city))
+
+                # Таблица results
+                attacking_units, defending_units, attacking_losses, defending_losses = self.totals()
+                _write_results(cursor, self.attacking_fraction, attacking_units, attacking_losses,
+                               defending_losses)
+                _write_results(cursor, self.defending_fraction, defending_units, defending_losses,
+                               attacking_losses)
+        except sqlite3.Error as e:
+            print(f"Ошибка при сохранении итогов боя: {e}")
+            return False
+
+        if attacker_won:
+            map_events.city_changed(self.defending_city)
+        return True
+
+    def totals(self):
+        """(юнитов атаки, юнитов обороны, потери атаки, потери обороны)."""
+        return (
+            sum(u['initial_count'] for u in self.attacking),
+            sum(u['initial_count'] for u in self.defending),
+            sum(u['killed_count'] for u in self.attacking),
+            sum(u['killed_count'] for u in self.defending),
+        )
+
+    def report(self, units):
+        return [{
+            'unit_name': u['unit_name'],
+            'initial_count': u['initial_count'],
+            'unit_count': u['unit_count'],
+            'killed_count': u['killed_count']
+        } for u in units]
+
+
+def user_involved(conn, user_faction, *armies):
+    """Есть ли среди армий юниты фракции игрока (один запрос на все юниты)."""
+    unit_names = {unit['unit_name'] for army in armies for unit in army}
+    if not user_faction or not unit_names:
+        return False
+    placeholders = ", ".join("?" * len(unit_names))
+    try:
+        row = conn.execute(f"""
+            SELECT 1 FROM units
+            WHERE faction = ? AND unit_name IN ({placeholders})
+            LIMIT 1
+        """, (user_faction, *sorted(unit_names))).fetchone()
+        return row is not None
+    except sqlite3.Error as e:
+        print(f"[ERROR] Не удалось проверить фракцию юнитов: {e}")
+        return False
+
+
 def fight(attacking_city, defending_city, defending_army, attacking_army,
-          attacking_fraction, defending_fraction, conn):
+          attacking_fraction, defending_fraction, conn, uow=None):
     """
     Основная функция боя между двумя армиями.
 
@@ -231,14 +476,13 @@ def fight(attacking_city, defending_city, defending_army, attacking_army,
     :param attacking_fraction: Фракция атакующего
     :param defending_fraction: Фракция защитника
     :param conn: Активное соединение с БД
-    :return: dict с результатами боя
+    :param uow: UnitOfWork хода ИИ, если бой идёт внутри него
+    :return: dict с результатами боя или None, если итог не удалось записать (боя не было)
     """
-    print('Армия attacking_army: ', attacking_army)
-    print('Армия defending_army: ', defending_army)
+    log.debug("Армия attacking_army: %s", attacking_army)
+    log.debug("Армия defending_army: %s", defending_army)
 
-    # Создаем новый курсор для работы с базой данных
     cursor = conn.cursor()
-
     try:
         # Получаем фракцию игрока
         cursor.execute("SELECT faction_name FROM user_faction")
@@ -248,122 +492,25 @@ def fight(attacking_city, defending_city, defending_army, attacking_army,
         print(f"[ERROR] Не удалось получить фракцию игрока: {e}")
         user_faction = None
 
-    is_user_involved = False
-
     # Проверяем участие игрока в бою
-    if user_faction:
-        # Проверяем атакующую армию
-        for unit in attacking_army:
-            if isinstance(unit, dict) and 'unit_name' in unit:
-                unit_name = unit['unit_name']
-            elif isinstance(unit, (list, tuple)) and len(unit) > 0:
-                unit_name = unit[0]
-            else:
-                print("[WARNING] Неверный формат юнита в атакующей армии.")
-                continue
-
-            try:
-                cursor.execute("SELECT faction FROM units WHERE unit_name = ?", (unit_name,))
-                result = cursor.fetchone()
-                if result and result[0] == user_faction:
-                    is_user_involved = True
-                    break
-            except sqlite3.Error as e:
-                print(f"[ERROR] Не удалось проверить фракцию для '{unit_name}': {e}")
-
-        # Если атакующий игрок не участвует — проверяем оборону
-        if not is_user_involved:
-            for unit in defending_army:
-                if isinstance(unit, dict) and 'unit_name' in unit:
-                    unit_name = unit['unit_name']
-                elif isinstance(unit, (list, tuple)) and len(unit) > 0:
-                    unit_name = unit[0]
-                else:
-                    print("[WARNING] Неверный формат юнита в обороняющейся армии.")
-                    continue
-
-                try:
-                    cursor.execute("SELECT faction FROM units WHERE unit_name = ?", (unit_name,))
-                    result = cursor.fetchone()
-                    if result and result[0] == user_faction:
-                        is_user_involved = True
-                        break
-                except sqlite3.Error as e:
-                    print(f"[ERROR] Не удалось проверить фракцию для '{unit_name}': {e}")
-
-    # Завершаем работу с курсором
-    cursor.close()
-
-    # Объединяем одинаковые юниты
-    merged_attacking = merge_units(attacking_army)
-    merged_defending = merge_units(defending_army)
-
-    # Инициализируем потери
-    for u in merged_attacking + merged_defending:
-        u['initial_count'] = u['unit_count']
-        u['killed_count'] = 0
-
-    # Приоритет для сортировки: класс (по возрастанию), затем атака (по убыванию)
-    def priority(u):
-        stats = u.get('units_stats', {})
-        unit_class = int(stats.get('Класс юнита', 0))
-        attack = int(stats.get('Урон', 0))
-        return (unit_class, -attack)  # Сортируем по классу (возрастание), затем по урону (убывание)
-
-    merged_attacking.sort(key=priority)
-    merged_defending.sort(key=priority)
-
-    # Бой: каждый атакующий против каждого обороняющего
-    for atk in merged_attacking:
-        for df in merged_defending:
-            if atk['unit_count'] > 0 and df['unit_count'] > 0:
-                atk_new, df_new = battle_units(atk, df, defending_city, user_faction, conn)
-                atk['unit_count'] = atk_new['unit_count']
-                df['unit_count'] = df_new['unit_count']
-
-    # Вычисляем потери после боя
-    for u in merged_attacking + merged_defending:
-        u['killed_count'] = u['initial_count'] - u['unit_count']
-
-    # Определяем победителя
-    winner = 'attacking' if any(u['unit_count'] > 0 for u in merged_attacking) else 'defending'
-
-    # Обновляем гарнизоны
-    update_garrisons_after_battle(
-        winner=winner,
-        attacking_city=attacking_city,
-        defending_city=defending_city,
-        attacking_army=merged_attacking,
-        defending_army=merged_defending,
-        attacking_fraction=attacking_fraction,
-        conn=conn  # Передаем conn, чтобы внутри использовать свой курсор
-    )
+    is_user_involved = user_involved(conn, user_faction, attacking_army, defending_army)
 
-    # Подготовка данных для таблицы results
-    total_attacking_units = sum(u['initial_count'] for u in merged_attacking)
-    total_defending_units = sum(u['initial_count'] for u in merged_defending)
-    total_attacking_losses = sum(u['killed_count'] for u in merged_attacking)
-    total_defending_losses = sum(u['killed_count'] for u in merged_defending)
+    battle = Battle.load(conn, attacking_city, defending_city, attacking_army, defending_army,
+                         attacking_fraction, defending_fraction)
+    winner = battle.resolve()
+    if not battle.save(conn, uow):
+        # Итог откатился — ни отчёта, ни досье для боя, которого в базе нет
+        return None
 
-    # Обновляем таблицу results
-    update_results_table(conn, attacking_fraction, total_attacking_units, total_attacking_losses, total_defending_losses)
-    update_results_table(conn, defending_fraction, total_defending_units, total_defending_losses, total_attacking_losses)
+    if user_faction == 1 and battle.damage_info:
+        # Показать информацию об уроне
+        show_damage_info_infrastructure(battle.damage_info)
 
+    total_attacking_units, total_defending_units, total_attacking_losses, total_defending_losses = battle.totals()
 
     # Формируем отчёт
-    final_report_attacking = [{
-        'unit_name': u['unit_name'],
-        'initial_count': u['initial_count'],
-        'unit_count': u['unit_count'],
-        'killed_count': u['killed_count']
-    } for u in merged_attacking]
-
-    final_report_defending = [{
-        'unit_name': u['unit_name'],
-        'initial_count': u['initial_count'],
-        'unit_count': u['unit_count'],
-        'killed_count': u['killed_count']
-    } for u in merged_defending]
+    final_report_attacking = battle.report(battle.attacking)
+    final_report_defending = battle.report(battle.defending)
 
     # Показываем отчет при участии игрока
     if is_user_involved:
@@ -376,7 +523,15 @@ def fight(attacking_city, defending_city, defending_army, attacking_army,
             user_faction=user_faction,
             city=defending_city
         )
-        show_battle_report(report_data, is_user_involved=is_user_involved, user_faction=user_faction, conn=conn)
+        # Обновляем досье до показа отчёта, чтобы статистика не зависела от интерфейса
+        if user_faction and report_data:
+            is_victory = any(item['result'] == "Победа" for item in report_data)
+            try:
+                update_dossier_battle_stats(conn, user_faction, is_victory, uow)
+            except Exception as e:
+                print(f"[Ошибка] Не удалось обновить досье: {e}")
+        notifications.show_battle_report(report_data, is_user_involved=is_user_involved,
+                                         user_faction=user_faction, conn=conn)
 
     return {
         "winner": winner,
@@ -486,10 +641,9 @@ def calculate_unit_power(unit, is_attacking):
         defense = unit['units_stats']['Защита']
         return durability + defense
 
-def battle_units(attacking_unit, defending_unit, city, user_faction, conn):
+def battle_units(attacking_unit, defending_unit):
     """
     Осуществляет бой между двумя юнитами.
-    :param city:
     :param attacking_unit: Атакующий юнит.
     :param defending_unit: Защитный юнит.
     :return: Обновленные данные об атакующем и защитном юнитах после боя.
@@ -502,8 +656,6 @@ def battle_units(attacking_unit, defending_unit, city, user_faction, conn):
     defense_points = calculate_unit_power(defending_unit, is_attacking=False)
     total_defense_power = defense_points * defending_unit['unit_count']
 
-    damage_to_infrastructure(total_attack_power, city, user_faction, conn)
-
     # Определение победителя раунда
     if total_attack_power > total_defense_power:
         # Атакующий побеждает
@@ -522,199 +674,9 @@ def battle_units(attacking_unit, defending_unit, city, user_faction, conn):
 
     return attacking_unit, defending_unit
 
-def update_garrisons_after_battle(winner, attacking_city, defending_city,
-                                  attacking_army, defending_army,
-                                  attacking_fraction, conn):
-    """
-    Обновляет гарнизоны после боя.
-    """
-    try:
-            cursor = conn.cursor()
-            if winner == 'attacking':
-                # Если победила атакующая сторона
-                # Удаляем гарнизон обороняющейся стороны
-                cursor.execute("""
-                    DELETE FROM garrisons WHERE city_id = ?
-                """, (defending_city,))
-
-                # Перемещаем оставшиеся атакующие войска в захваченный город
-                for unit in attacking_army:
-                    if unit['unit_count'] > 0:
-                        cursor.execute("""
-                            INSERT INTO garrisons (city_id, unit_name, unit_count, unit_image)
-                            VALUES (?, ?, ?, ?)
-                            ON CONFLICT(city_id, unit_name) DO UPDATE SET
-                            unit_count = excluded.unit_count,
-                            unit_image = excluded.unit_image
-                        """, (
-                            defending_city,
-                            unit['unit_name'],
-                            unit['unit_count'],
-                            unit.get('unit_image', '')
-                        ))
-
-                # Обновляем принадлежность города
-                cursor.execute("""
-                    UPDATE city SET kingdom = ? WHERE fortress_name = ?
-                """, (attacking_fraction, defending_city))
-                cursor.execute("""
-                    UPDATE cities SET faction = ? WHERE name = ?
-                """, (attacking_fraction, defending_city))
-                cursor.execute("""
-                    UPDATE buildings
-                    SET faction = ?
-                    WHERE city_name = ?
-                """, (attacking_fraction, defending_city))
-
-            else:
-                # Если победила обороняющаяся сторона
-                # Сначала удаляем ВСЕ записи гарнизона обороняющегося города
-                cursor.execute("DELETE FROM garrisons WHERE city_id = ?", (defending_city,))
-
-                # Добавляем только оставшиеся юниты (unit_count > 0)
-                for unit in defending_army:
-                    if unit['unit_count'] > 0:
-                        cursor.execute("""
-                            INSERT INTO garrisons (city_id, unit_name, unit_count, unit_image)
-                            VALUES (?, ?, ?, ?)
-                            ON CONFLICT(city_id, unit_name) DO UPDATE SET
-                            unit_count = excluded.unit_count,
-                            unit_image = excluded.unit_image
-                        """, (
-                            defending_city,
-                            unit['unit_name'],
-                            unit['unit_count'],
-                            unit.get('unit_image', '')
-                        ))
-
-            # Обновляем гарнизон атакующего города (общий блок для обоих случаев)
-            original_counts = {}
-            cursor.execute("""
-                SELECT unit_name, unit_count FROM garrisons WHERE city_id = ?
-            """, (attacking_city,))
-            for row in cursor.fetchall():
-                original_counts[row['unit_name']] = row['unit_count']
-
-            for unit in attacking_army:
-                remaining_in_source = original_counts.get(unit['unit_name'], 0) - unit['initial_count']
-                if remaining_in_source > 0:
-                    cursor.execute("""
-                        UPDATE garrisons 
-                        SET unit_count = ? 
-                        WHERE city_id = ? AND unit_name = ?
-                    """, (remaining_in_source, attacking_city, unit['unit_name']))
-                else:
-                    cursor.execute("""
-                        DELETE FROM garrisons 
-                        WHERE city_id = ? AND unit_name = ?
-                    """, (attacking_city, unit['unit_name']))
-
-    except sqlite3.Error as e:
-        print(f"Ошибка при обновлении гарнизонов: {e}")
-
-
-
 
 #------------------------------------
 
-def damage_to_infrastructure(all_damage, city_name, user_faction, conn):
-    """
-    Вычисляет урон по инфраструктуре города и обновляет данные в базе данных.
-
-    :param all_damage: Общий урон, который нужно нанести.
-    :param city_name: Название города, по которому наносится урон.
-    """
-
-    # Константа для урона, необходимого для разрушения одного здания
-    global damage_info
-    DAMAGE_PER_BUILDING = 45900
-
-    # Подключение к базе данных
-    try:
-        cursor = conn.cursor()
-
-        # Загрузка данных о зданиях для указанного города
-        cursor.execute('''
-            SELECT building_type, count 
-            FROM buildings 
-            WHERE city_name = ? AND count > 0
-        ''', (city_name,))
-        rows = cursor.fetchall()
-
-        # Преобразование данных в словарь
-        city_data = {}
-        for row in rows:
-            building_type, count = row
-            city_data[building_type] = count
-
-        if not city_data:
-            return
-
-        print(f"Данные инфраструктуры до удара: {city_data}")
-
-        effective_weapon_damage = all_damage
-        print(f"Эффективный урон по инфраструктуре: {effective_weapon_damage}")
-
-        # Подсчет общего числа зданий
-        total_buildings = sum(city_data.values())
-        if total_buildings == 0:
-            print("В городе нет зданий для нанесения урона.")
-            return
-
-        # Сколько зданий может быть разрушено этим уроном
-        potential_destroyed_buildings = int(effective_weapon_damage // DAMAGE_PER_BUILDING)
-        print(f"Максимально возможное количество разрушенных зданий: {potential_destroyed_buildings}")
-
-        # Уничтожаем здания, начиная с больниц и фабрик
-        damage_info = {}
-        priority_buildings = ['Больница', 'Фабрика']  # Приоритетные типы зданий для уничтожения
-
-        for building in priority_buildings:
-            if building in city_data and city_data[building] > 0:
-                count = city_data[building]
-                if potential_destroyed_buildings >= count:
-                    # Уничтожаем все здания этого типа
-                    damage_info[building] = count
-                    city_data[building] = 0
-                    potential_destroyed_buildings -= count
-
-                    # Обновляем данные в базе данных
-                    cursor.execute('''
-                        UPDATE buildings 
-                        SET count = 0 
-                        WHERE city_name = ? AND building_type = ?
-                    ''', (city_name, building))
-                else:
-                    # Уничтожаем часть зданий
-                    damage_info[building] = potential_destroyed_buildings
-                    city_data[building] -= potential_destroyed_buildings
-
-                    # Обновляем данные в базе данных
-                    cursor.execute('''
-                        UPDATE buildings 
-                        SET count = count - ? 
-                        WHERE city_name = ? AND building_type = ?
-                    ''', (potential_destroyed_buildings, city_name, building))
-
-                    potential_destroyed_buildings = 0
-
-                if potential_destroyed_buildings == 0:
-                    break
-
-        print(f"Данные инфраструктуры после удара: {city_data}")
-
-        # Сохраняем изменения в базе данных
-        conn.commit()
-        print('Обновленная инфраструктура сохранена.')
-
-    except Exception as e:
-        print(f"Ошибка при работе с базой данных: {e}")
-
-    if user_faction == 1:
-        # Показать информацию об уроне
-        show_damage_info_infrastructure(damage_info)
-
-
 def show_damage_info_infrastructure(damage_info):
     from kivy.uix.boxlayout import BoxLayout
     from kivy.uix.label import Label
@@ -736,52 +698,53 @@ def show_damage_info_infrastructure(damage_info):
     popup = Popup(title="Результат удара по инфраструктуре", content=content, size_hint=(0.7, 0.7))
     popup.open()
 
-def update_dossier_battle_stats(conn, user_faction, is_victory):
+def update_dossier_battle_stats(conn, user_faction, is_victory, uow=None):
     """
     Обновляет статистику по боям в таблице dossier для текущей фракции пользователя.
 
     :param db_connection: Соединение с базой данных.
     :param user_faction: Название фракции игрока.
     :param is_victory: True, если игрок победил, False — если проиграл.
+    :param uow: UnitOfWork хода ИИ; без него запись фиксируется сразу.
     """
+    uow = uow if uow is not None else UnitOfWork(conn)
     try:
-        cursor = conn.cursor()
-        # Проверяем, существует ли запись для этой фракции
-        cursor.execute("SELECT battle_victories, battle_defeats FROM dossier WHERE faction = ?", (user_faction,))
-        result = cursor.fetchone()
+        with uow.savepoint():
+            cursor = conn.cursor()
+            # Проверяем, существует ли запись для этой фракции
+            cursor.execute("SELECT battle_victories, battle_defeats FROM dossier WHERE faction = ?", (user_faction,))
+            result = cursor.fetchone()
 
-        if result:
-            # Если запись есть — обновляем нужное поле
-            if is_victory:
-                cursor.execute("""
-                    UPDATE dossier
-                    SET battle_victories = battle_victories + 1,
-                        last_data = datetime('now')
-                    WHERE faction = ?
-                """, (user_faction,))
-            else:
-                cursor.execute("""
-                    UPDATE dossier
-                    SET battle_defeats = battle_defeats + 1,
-                        last_data = datetime('now')
-                    WHERE faction = ?
-                """, (user_faction,))
-        else:
-            # Если записи нет — создаём новую
-            if is_victory:
-                cursor.execute("""
-                    INSERT INTO dossier (
-                        faction, battle_victories, battle_defeats, last_data
-                    ) VALUES (?, 1, 0, datetime('now'))
-                """, (user_faction,))
+            if result:
+                # Если запись есть — обновляем нужное поле
+                if is_victory:
+                    cursor.execute("""
+                        UPDATE dossier
+                        SET battle_victories = battle_victories + 1,
+                            last_data = datetime('now')
+                        WHERE faction = ?
+                    """, (user_faction,))
+                else:
+                    cursor.execute("""
+                        UPDATE dossier
+                        SET battle_defeats = battle_defeats + 1,
+                            last_data = datetime('now')
+                        WHERE faction = ?
+                    """, (user_faction,))
             else:
-                cursor.execute("""
-                    INSERT INTO dossier (
-                        faction, battle_victories, battle_defeats, last_data
-                    ) VALUES (?, 0, 1, datetime('now'))
-                """, (user_faction,))
-        conn.commit()
-        print(f"[Досье] Обновлены данные для фракции '{user_faction}'")
+                # Если записи нет — создаём новую
+                if is_victory:
+                    cursor.execute("""
+                        INSERT INTO dossier (
+                            faction, battle_victories, battle_defeats, last_data
+                        ) VALUES (?, 1, 0, datetime('now'))
+                    """, (user_faction,))
+                else:
+                    cursor.execute("""
+                        INSERT INTO dossier (
+                            faction, battle_victories, battle_defeats, last_data
+                        ) VALUES (?, 0, 1, datetime('now'))
+                    """, (user_faction,))
+        log.debug("[Досье] Обновлены данные для фракции '%s'", user_faction)
     except Exception as e:
-        conn.rollback()
-        print(f"[Ошибка] Не удалось обновить досье: {e}")
\ No newline at end of file
+        print(f"[Ошибка] Не удалось обновить досье: {e}")
@@ -5,11 +5,23 @@ from economic import *
 import economic
 import army
 import politic
-from ii import AIController
+import notifications
+import army_strength
+import map_events
+from fight import show_battle_report
 from sov import AdvisorView
 from event_manager import EventManager
 from results_game import ResultsGame
+from save_slots import QUICK_SLOT, SaveSlots
 from seasons import SeasonManager
+from turn_engine import TurnEngine
+from texture_cache import image_texture
+from db_manager import reader
+from repositories import DiplomacyRepository, MapRepository
+
+# Логика игры показывает окна через notifications, реальные обработчики — интерфейсные
+notifications.register_handler("message", show_message)
+notifications.register_handler("battle_report", show_battle_report)
 
 
 # Новые кастомные виджеты
@@ -61,8 +73,6 @@ def parse_formatted_number(formatted_str):
         return float('nan')  # Возвращаем NaN при ошибке парсинга
 
 
-# Список всех фракций
-FACTIONS = ["Аркадия", "Селестия", "Хиперион", "Халидон", "Этерия"]
 global_resource_manager = {}
 translation_dict = {
     "Аркадия": "arkadia",
@@ -453,7 +463,8 @@ class GameScreen(Screen):
     SEASON_NAMES = ['Зима', 'Весна', 'Лето', 'Осень']
     SEASON_ICONS = ['snowflake', 'green_leaf', 'sun', 'yellow_leaf']
 
-    def __init__(self, selected_faction, cities, conn=None, **kwargs):
+    def __init__(self, selected_faction, cities, conn=None, season_idx=None, **kwargs):
+        """:param season_idx: Сезон загруженного сохранения (None — новая партия)."""
         super(GameScreen, self).__init__(**kwargs)
         self.selected_faction = selected_faction
         self.cities = cities
@@ -465,40 +476,50 @@ class GameScreen(Screen):
         self.faction = self.game_state_manager.faction
         self.conn = self.game_state_manager.conn
         self.cursor = self.game_state_manager.cursor
-        self.turn_counter = self.game_state_manager.turn_counter
 
-        # Сохраняем текущую фракцию игрока
-        self.save_selected_faction_to_db()
-        # Инициализация политических данных
-        self.initialize_political_data()
+        # Движок хода: фракция игрока, политика, сезон и контроллеры ИИ
+        self.engine = TurnEngine(self.selected_faction, self.faction, self.conn,
+                                 turn_counter=self.game_state_manager.turn_counter)
+        self.engine.start_game(season_idx=season_idx)
         self.prev_diplomacy_state = {}
-        # Инициализация AI-контроллеров
-        self.ai_controllers = {}
         # Инициализация EventManager
         self.event_manager = EventManager(self.selected_faction, self, self.game_state_manager.faction, self.conn)
+        self.engine.event_manager = self.event_manager
         # Инициализация UI
         self.is_android = platform == 'android'
-        self.season_manager = SeasonManager()
-        self.current_idx = random.randint(0, 3)
-        current_season = {
-            'name': self.SEASON_NAMES[self.current_idx],
-            'icon': self.SEASON_ICONS[self.current_idx]
-        }
         self.init_ui()
-        self._update_season_display(current_season)
-        self.season_manager.update(self.current_idx, self.conn)
+        self._update_season_display(self.engine.current_season())
+        # Отчёт о запросах в циклах поверх карты (LERDON_SQL_TRACE)
+        self.sql_trace_label = None
+        if self.engine.sql_trace.enabled:
+            self.init_sql_trace_overlay()
         # Запускаем обновление ресурсов каждую 1 секунду
         Clock.schedule_interval(self.update_cash, 1)
-        # Запускаем обновление рейтинга армии каждые 1.4 секунду
+        # Запускаем обновление рейтинга армии каждые 1.4 секунду;
+        # пересчёт идёт только после изменения гарнизонов или владельцев городов
+        self.city_star_key = None
+        map_events.subscribe(self.on_city_changed)
         Clock.schedule_interval(self.update_army_rating, 1.4)
 
-    def save_selected_faction_to_db(self):
-        conn = self.conn
-        cursor = conn.cursor()
+    @property
+    def turn_counter(self):
+        return self.engine.turn_counter
+
+    @turn_counter.setter
+    def turn_counter(self, value):
+        self.engine.turn_counter = value
 
-        cursor.execute("INSERT INTO user_faction (faction_name) VALUES (?)", (self.selected_faction,))
+    @property
+    def current_idx(self):
+        return self.engine.current_idx
 
-        conn.commit()
+    @property
+    def ai_controllers(self):
+        return self.engine.ai_controllers
+
+    @property
+    def season_manager(self):
+        return self.engine.season_manager
 
     def init_ui(self):
         self.season_container = FloatLayout(
@@ -715,9 +736,6 @@ class GameScreen(Screen):
         # Сохраняем координаты ResourceBox
         self.save_interface_element("ResourceBox", "top_left", self.resource_box)
 
-        # === Инициализация ИИ ===
-        self.init_ai_controllers()
-
         def on_end_turn(instance):
             instance.start_progress()
             Clock.schedule_once(lambda dt: self.process_turn(None), 1.5)
@@ -761,18 +779,14 @@ class GameScreen(Screen):
         """
 
         current_faction = self.selected_faction
-        cursor = self.conn.cursor()
         # Сохраняем предыдущее состояние, если оно еще не было загружено
         if not hasattr(self, 'prev_diplomacy_state'):
             self.prev_diplomacy_state = {}
         message = "фракци"
         try:
             # Получаем текущие отношения для текущей фракции
-            cursor.execute("""
-                SELECT faction2, relationship FROM diplomacies
-                WHERE faction1 = ?
-            """, (current_faction,))
-            current_records = dict(cursor.fetchall())
+            with reader(self.conn) as conn:
+                current_records = DiplomacyRepository(conn).diplomacies(current_faction)
 
             # Словарь для хранения изменений по типам
             changes = {
@@ -885,30 +899,30 @@ class GameScreen(Screen):
         """
         Обработка хода игрока и ИИ.
         """
-        # Увеличиваем счетчик ходов
-        self.turn_counter += 1
+        phase = self.engine.metrics.phase
+        # Увеличиваем счетчик ходов и сохраняем его
+        with phase("begin_turn"):
+            self.engine.begin_turn()
 
         # Обновляем метку с текущим ходом
         self.turn_label.text = f"Текущий ход: {self.turn_counter}"
-        # Сохраняем текущее значение хода в таблицу turn
-        self.save_turn(self.selected_faction, self.turn_counter)
-        # Сохраняем историю ходов в таблицу turn_save
-        self.save_turn_history(self.selected_faction, self.turn_counter)
 
         # Обновляем ресурсы игрока
-        self.faction.update_resources()
-        self.resource_box.update_resources()
-        self.check_diplomacy_changes()
+        with phase("player_economy", self.selected_faction):
+            self.faction.update_resources()
+        with phase("resource_box", self.selected_faction):
+            self.resource_box.update_resources()
+        with phase("check_diplomacy_changes", self.selected_faction):
+            self.check_diplomacy_changes()
         # Проверяем условие завершения игры
-        game_continues, reason = self.faction.end_game()  # Получаем статус и причину завершения
+        with phase("check_game_over"):
+            game_continues, reason, status = self.engine.check_game_over()  # Статус, причина и исход
         if not game_continues:
+            # Последний ход тоже попадает в историю запросов и замеров
+            self.engine.sql_trace.end_turn()
+            self.engine.metrics.flush()
             print("Условия завершения игры выполнены.")
 
-            # Определяем статус завершения (win или lose)
-            if "Мир во всем мире" in reason or "Все фракции были уничтожены" in reason:
-                status = "win"  # Условия победы
-            else:
-                status = "lose"  # Условия поражения
             # Запускаем модуль results_game для обработки результатов
             results_game_instance = ResultsGame(status, reason, self.conn)  # Создаем экземпляр класса ResultsGame
             results_game_instance.show_results(self.selected_faction, status, reason)
@@ -916,44 +930,64 @@ class GameScreen(Screen):
             return  # Прерываем выполнение дальнейших действий
 
         # Выполнение хода для всех ИИ
-        for ai_controller in self.ai_controllers.values():
-            ai_controller.make_turn()
-        # Обновляем статус уничтоженных фракций
-        self.update_destroyed_factions()
-        # Обновляем статус ходов
-        self.reset_check_attack_flags()
-        self.initialize_turn_check_move()
-        # Обновляем текущий сезон
-        new_season = self.update_season(self.turn_counter)
-        self._update_season_display(new_season)
-        self.season_manager.update(self.current_idx, self.conn)
+        with phase("ai_turns"):
+            self.engine.run_ai_turns()
+        # Уничтоженные фракции, флаги ходов и смена сезона
+        with phase("finish_turn"):
+            new_season = self.engine.finish_turn()
+        with phase("season_display"):
+            self._update_season_display(new_season)
         print("Здесь должны вызываться функции отрисовки звезд мощи городов")
         # Обновляем статус городов и отрисовываем звёздочки мощи армий
         # Принудительно обновляем рейтинг один раз
-        self.update_army_rating()
+        with phase("army_rating"):
+            self.update_army_rating()
         # Логирование или обновление интерфейса после хода
         print(f"Ход {self.turn_counter} завершён")
 
-        self.event_now = random.randint(1, 100)
         # Проверяем, нужно ли запустить событие
-        if self.turn_counter % self.event_now == 0:
-            print("Генерация события...")
-            self.event_manager.generate_event(self.turn_counter)
-
-    def update_season(self, turn_count: int) -> dict:
-        """
-        Вызываем каждый ход, передавая turn_count.
-        Если turn_count кратно 4, переключаем current_idx на следующий сезон.
-        Возвращаем {'name': <название>, 'icon': <иконка>}.
-        """
-        if turn_count > 1 and (turn_count - 1) % 4 == 0:
-            # Переходим к следующему сезону
-            self.current_idx = (self.current_idx + 1) % 4
-
-        return {
-            'name': self.SEASON_NAMES[self.current_idx],
-            'icon': self.SEASON_ICONS[self.current_idx]
-        }
+        with phase("roll_event"):
+            self.engine.roll_event()
+        self.engine.sql_trace.end_turn()
+        self.update_sql_trace_overlay()
+        # Замеры пишутся между ходами, вне транзакций ИИ
+        self.engine.metrics.flush()
+
+    def init_sql_trace_overlay(self):
+        """Полупрозрачная панель с отчётом трассировки SQL; касание сворачивает и разворачивает её."""
+        self.sql_trace_label = Label(
+            text="Трассировка SQL: отчёт появится после хода",
+            font_size='11sp',
+            color=(1, 1, 0.6, 1),
+            halign='left',
+            valign='top',
+            size_hint=(0.6, 0.3),
+            pos_hint={'x': 0.01, 'y': 0.12}
+        )
+        self.sql_trace_label.bind(size=lambda instance, value: setattr(instance, 'text_size', value))
+        with self.sql_trace_label.canvas.before:
+            Color(0, 0, 0, 0.6)
+            self._sql_trace_bg = Rectangle()
+
+        def update_sql_trace_rect(instance, value):
+            self._sql_trace_bg.pos = instance.pos
+            self._sql_trace_bg.size = instance.size
+
+        def toggle_sql_trace(instance, touch):
+            if instance.collide_point(*touch.pos):
+                instance.opacity = 0.15 if instance.opacity == 1 else 1
+                return True
+            return False
+
+        self.sql_trace_label.bind(pos=update_sql_trace_rect, size=update_sql_trace_rect,
+                                  on_touch_down=toggle_sql_trace)
+        self.add_widget(self.sql_trace_label)
+
+    def update_sql_trace_overlay(self):
+        """Показывает отчёт трассировки SQL за последний ход."""
+        if self.sql_trace_label is None or not self.engine.sql_trace.history:
+            return
+        self.sql_trace_label.text = self.engine.sql_trace.format_report(limit=8)
 
     def on_season_pressed(self, instance, touch):
         """
@@ -1128,7 +1162,19 @@ class GameScreen(Screen):
             color=(1, 1, 1, 1)
         )
 
+        # --- Кнопка «Сохранить» (синяя) ---
+        btn_save = Button(
+            text="Сохранить",
+            size_hint=(1, 1),
+            background_normal='',
+            background_color=hex_color('#3182CE'),
+            font_size=sp(16),
+            bold=True,
+            color=(1, 1, 1, 1)
+        )
+
         btn_container.add_widget(btn_yes)
+        btn_container.add_widget(btn_save)
         btn_container.add_widget(btn_no)
 
         # Добавляем метку и контейнер с кнопками в основной контент
@@ -1151,50 +1197,23 @@ class GameScreen(Screen):
 
         # --- Привязываем действия к кнопкам ---
         btn_yes.bind(on_release=lambda x: (popup.dismiss(), App.get_running_app().restart_app()))
+        btn_save.bind(on_release=lambda x: (popup.dismiss(), self.save_game()))
         btn_no.bind(on_release=popup.dismiss)
 
         popup.open()
 
-    def initialize_political_data(self):
-        """
-        Инициализирует таблицу political_systems значениями по умолчанию,
-        если она пуста. Политическая система для каждой фракции выбирается случайным образом.
-        Условие: не может быть меньше 2 и больше 3 стран с одним политическим строем.
-        """
-        cursor = self.conn.cursor()
-        try:
-            # Проверяем, есть ли записи в таблице
-            cursor.execute("SELECT COUNT(*) FROM political_systems")
-            count = cursor.fetchone()[0]
-            if count == 0:
-                # Список всех фракций
-                factions = ["Аркадия", "Селестия", "Хиперион", "Этерия", "Халидон"]
-
-                # Список возможных политических систем
-                systems = ["Капитализм", "Коммунизм"]
-
-                # Функция для проверки распределения
-                def is_valid_distribution(distribution):
-                    counts = {system: distribution.count(system) for system in systems}
-                    return all(2 <= count <= 3 for count in counts.values())
-
-                # Генерация случайного распределения
-                while True:
-                    default_systems = [(faction, random.choice(systems)) for faction in factions]
-                    distribution = [system for _, system in default_systems]
-
-                    if is_valid_distribution(distribution):
-                        break
-
-                # Вставляем данные в таблицу
-                cursor.executemany(
-                    "INSERT INTO political_systems (faction, system) VALUES (?, ?)",
-                    default_systems
-                )
-                self.conn.commit()
-                print("Таблица political_systems инициализирована случайными значениями.")
-        except sqlite3.Error as e:
-            print(f"Ошибка при инициализации таблицы political_systems: {e}")
+    def save_game(self):
+        """Сохраняет партию в быстрый слот; из главного меню её можно продолжить."""
+        saved = SaveSlots(self.conn).save(
+            QUICK_SLOT,
+            faction=self.selected_faction,
+            turn=self.turn_counter,
+            season=self.current_idx,
+        )
+        if saved:
+            self.show_notification(f"Партия сохранена (ход {self.turn_counter}).", title="Сохранение")
+        else:
+            self.show_notification("Не удалось сохранить партию.", title="Сохранение")
 
     def update_cash(self, dt):
         """Обновление текущего капитала фракции через каждые 1 секунду."""
@@ -1230,70 +1249,10 @@ class GameScreen(Screen):
         advisor_view = AdvisorView(self.selected_faction, self.conn)
         self.game_area.add_widget(advisor_view)
 
-    def update_destroyed_factions(self):
-        """
-        Обновляет статус фракций в таблице diplomacies.
-        Если у фракции нет ни одного города в таблице city,
-        все записи для этой фракции в таблице diplomacies помечаются как "уничтожена".
-        """
-        cursor = self.conn.cursor()
-        try:
-            # Шаг 1: Получаем список всех фракций, у которых есть города
-            cursor.execute("""
-                SELECT DISTINCT kingdom
-                FROM city
-            """)
-            factions_with_cities = {row[0] for row in cursor.fetchall()}
-
-            # Шаг 2: Получаем все уникальные фракции из таблицы diplomacies
-            cursor.execute("""
-                SELECT DISTINCT faction1
-                FROM diplomacies
-            """)
-            all_factions = {row[0] for row in cursor.fetchall()}
-
-            # Шаг 3: Определяем фракции, у которых нет ни одного города
-            destroyed_factions = all_factions - factions_with_cities
-
-            if destroyed_factions:
-                print(f"Фракции без городов (уничтожены): {', '.join(destroyed_factions)}")
-
-                # Шаг 4: Обновляем записи в таблице diplomacies для уничтоженных фракций
-                for faction in destroyed_factions:
-                    cursor.execute("""
-                        UPDATE diplomacies
-                        SET relationship = ?
-                        WHERE faction1 = ? OR faction2 = ?
-                    """, ("уничтожена", faction, faction))
-                    print(f"Статус фракции '{faction}' обновлен на 'уничтожена'.")
-
-                # Фиксируем изменения в базе данных
-                self.conn.commit()
-            else:
-                print("Все фракции имеют хотя бы один город. Нет уничтоженных фракций.")
-
-        except sqlite3.Error as e:
-            print(f"Ошибка при обновлении статуса уничтоженных фракций: {e}")
-
-    def reset_check_attack_flags(self):
-        """
-        Обновляет значения check_attack на False для всех записей в таблице turn_check_attack_faction.
-        """
-        cursor = self.conn.cursor()
-        try:
-            cursor.execute("""
-                UPDATE turn_check_attack_faction
-                SET check_attack = ?
-            """, (False,))
-            self.conn.commit()
-            print("Флаги check_attack успешно сброшены на False.")
-        except sqlite3.Error as e:
-            print(f"Ошибка при сбросе флагов check_attack: {e}")
-
     def update_army_rating(self, dt=None):
-        """Обновляет рейтинг армии и отрисовывает звёзды над городами."""
-        self.update_city_military_status()
-        self.draw_army_stars_on_map()
+        """Обновляет рейтинг армии и перерисовывает звёзды над городами, если он изменился."""
+        if self.update_city_military_status():
+            self.draw_army_stars_on_map()
 
     def draw_army_stars_on_map(self):
         """
@@ -1301,9 +1260,9 @@ class GameScreen(Screen):
         Использует готовые координаты из self.city_star_levels:
             { city_name: (star_level, icon_x, icon_y, city_name) }
         """
-        star_img_path = 'files/status/army_in_city/star.png'
-        if not os.path.exists(star_img_path):
-            print(f"Файл звезды не найден: {star_img_path}")
+        # Текстура звезды одна на все звёзды (атлас или кэш texture_cache.py)
+        star_texture = image_texture('files/status/army_in_city/star.png')
+        if star_texture is None:
             return
 
         # Параметры отрисовки
@@ -1340,70 +1299,11 @@ class GameScreen(Screen):
                     x_i = start_x + i * (STAR_SIZE + SPACING)
                     y_i = start_y
                     Rectangle(
-                        source=star_img_path,
+                        texture=star_texture,
                         pos=(x_i, y_i),
                         size=(STAR_SIZE, STAR_SIZE)
                     )
 
-    def get_total_army_strength_by_faction(self, faction):
-        """Возвращает общую мощь армии фракции."""
-        cursor = self.conn.cursor()
-        class_coefficients = {
-            "1": 1.3,
-            "2": 1.7,
-            "3": 2.0,
-            "4": 3.0,
-            "5": 4.0
-        }
-        try:
-            cursor.execute("""
-                SELECT g.unit_name, g.unit_count, u.attack, u.defense, u.durability, u.unit_class
-                FROM garrisons g
-                JOIN units u ON g.unit_name = u.unit_name
-                WHERE u.faction = ?
-                  AND g.city_id IN (SELECT name FROM cities WHERE faction = ?)
-            """, (faction, faction))
-            rows = cursor.fetchall()
-            total_strength = 0
-            for row in rows:
-                unit_name, count, attack, defense, durability, unit_class = row
-                coefficient = class_coefficients.get(unit_class, 1.0)
-                unit_strength = (attack * coefficient) + defense + durability
-                total_strength += unit_strength * count
-            return total_strength
-        except sqlite3.Error as e:
-            print(f"Ошибка при подсчёте общей мощи армии: {e}")
-            return 0
-
-    def get_city_army_strength_by_faction(self, city_id, faction):
-        """Возвращает мощь армии фракции в конкретном городе."""
-        cursor = self.conn.cursor()
-        class_coefficients = {
-            "1": 1.3,
-            "2": 1.7,
-            "3": 2.0,
-            "4": 3.0,
-            "5": 4.0
-        }
-        try:
-            cursor.execute("""
-                SELECT g.unit_name, g.unit_count, u.attack, u.defense, u.durability, u.unit_class
-                FROM garrisons g
-                JOIN units u ON g.unit_name = u.unit_name
-                WHERE g.city_id = ? AND u.faction = ?
-            """, (city_id, faction))
-            rows = cursor.fetchall()
-            city_strength = 0
-            for row in rows:
-                unit_name, count, attack, defense, durability, unit_class = row
-                coefficient = class_coefficients.get(unit_class, 1.0)
-                unit_strength = (attack * coefficient) + defense + durability
-                city_strength += unit_strength * count
-            return city_strength
-        except sqlite3.Error as e:
-            print(f"Ошибка при подсчёте мощи города {city_id}: {e}")
-            return 0
-
     def calculate_star_level(self, total_strength, city_strength):
         """Возвращает уровень (количество звездочек) на основе процентного соотношения мощи."""
         if total_strength == 0 or city_strength == 0:
@@ -1423,116 +1323,61 @@ class GameScreen(Screen):
     def update_city_military_status(self):
         """
         Для всех фракций:
-          1) Находим все города, где есть гарнизоны
-          2) Для каждой фракции считаем общую мощь армии
-          3) Для каждого города этой фракции считаем его мощь
-          4) Вычисляем star_level = 0–3
-          5) Сохраняем в self.city_star_levels:
+          1) Одним запросом берём города с их владельцами и мощью владельца
+             в каждом городе (таблица army_strength)
+          2) Общая мощь фракции — сумма мощи по её городам
+          3) Вычисляем star_level = 0–3
+          4) Сохраняем в self.city_star_levels:
              { city_name: (star_level, icon_x, icon_y, city_name) }
+        Пока гарнизоны и владельцы городов не менялись, ничего не пересчитывается.
+        :return: True, если звёзды изменились и их нужно перерисовать.
         """
-        cursor = self.conn.cursor()
-        try:
-            cursor.execute("""
-                SELECT name, faction, icon_coordinates 
-                FROM cities 
-                WHERE icon_coordinates IS NOT NULL
-            """)
-            raw_cities = cursor.fetchall()
-        except sqlite3.Error as e:
-            print(f"Ошибка при получении городов с гарнизонами: {e}")
+        with reader(self.conn) as conn:
+            key = army_strength.version(conn)
+            if key is not None and key == getattr(self, 'city_star_key', None):
+                return False
+            key, raw_cities = MapRepository(conn).city_strengths()
+        if raw_cities is None:
             self.city_star_levels = {}
-            return
+            self.city_star_key = None
+            return True
 
         if not raw_cities:
             print("Нет городов с гарнизонами.")
             self.city_star_levels = {}
-            return
+            self.city_star_key = key
+            return True
 
-        from collections import defaultdict
-        factions_cities = defaultdict(list)
-        for city_name, faction, coords_str in raw_cities:
-            factions_cities[faction].append((city_name, coords_str))
+        total_strengths = {}
+        for city_name, faction, icon_x, icon_y, city_strength in raw_cities:
+            total_strengths[faction] = total_strengths.get(faction, 0) + city_strength
 
         new_dict = {}
-
-        for faction, cities_list in factions_cities.items():
-            total_strength = self.get_total_army_strength_by_faction(faction)
+        for city_name, faction, icon_x, icon_y, city_strength in raw_cities:
+            total_strength = total_strengths[faction]
             if total_strength == 0:
                 continue
 
-            for city_name, coords_str in cities_list:
-                try:
-                    coords = eval(coords_str)  # лучше заменить на ast.literal_eval
-                    icon_x, icon_y = coords
-                except Exception as ex:
-                    print(f"Ошибка парсинга icon_coordinates для {city_name}: {ex}")
-                    continue
-
-                city_strength = self.get_city_army_strength_by_faction(city_name, faction)
-
-                if city_strength == 0:
-                    star_level = 0
+            if city_strength == 0:
+                star_level = 0
+            else:
+                percent = (city_strength / total_strength) * 100
+                if percent < 35:
+                    star_level = 1
+                elif percent < 65:
+                    star_level = 2
                 else:
-                    percent = (city_strength / total_strength) * 100
-                    if percent < 35:
-                        star_level = 1
-                    elif percent < 65:
-                        star_level = 2
-                    else:
-                        star_level = 3
-
-                new_dict[city_name] = (star_level, icon_x, icon_y, city_name)
+                    star_level = 3
 
+            new_dict[city_name] = (star_level, icon_x, icon_y, city_name)
 
         self.city_star_levels = new_dict
+        self.city_star_key = key
+        return True
 
-
-    def initialize_turn_check_move(self):
-        """
-        Инициализирует запись о возможности перемещения для текущей фракции.
-        Устанавливает значение 'can_move' = True по умолчанию.
-        """
-        cursor = self.conn.cursor()
-        try:
-            cursor.execute("""
-                UPDATE turn_check_move
-                SET can_move = ?
-            """, (True,))
-            self.conn.commit()
-            print("Флаги can_move успешно сброшены на True.")
-        except sqlite3.Error as e:
-            print(f"Ошибка при сбросе флагов can_move: {e}")
-
-    def init_ai_controllers(self):
-        """Создание контроллеров ИИ для каждой фракции кроме выбранной"""
-        for faction in FACTIONS:
-            if faction != self.selected_faction:
-                self.ai_controllers[faction] = AIController(faction, self.conn)
-
-    def load_turn(self, faction):
-        """Загрузка текущего значения хода для фракции."""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT turn_count FROM turn WHERE faction = ?', (faction,))
-        result = cursor.fetchone()
-        return result[0] if result else 0
-
-    def save_turn(self, faction, turn_count):
-        """Сохранение текущего значения хода для фракции."""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO turn (faction, turn_count)
-            VALUES (?, ?)
-        ''', (faction, turn_count))
-        self.conn.commit()
-
-    def save_turn_history(self, faction, turn_count):
-        """Сохранение истории ходов в таблицу turn_save."""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT INTO turn_save (faction, turn_count)
-            VALUES (?, ?)
-        ''', (faction, turn_count))
-        self.conn.commit()
+    def on_city_changed(self, city_name):
+        """Уведомление map_events: владелец города сменился — звёзды мощи пересчитываются на следующем тике."""
+        self.city_star_key = None
 
     def save_interface_element(self, element_name, screen_section, widget):
         """Сохраняет координаты и размер элемента интерфейса в базу данных."""
@@ -1563,6 +1408,6 @@ class GameScreen(Screen):
 
     def reset_game(self):
         """Сброс игры (например, при новой игре)."""
-        self.save_turn(self.selected_faction, 0)  # Сбрасываем счетчик ходов до 0
+        self.engine.save_turn(self.selected_faction, 0)  # Сбрасываем счетчик ходов до 0
         self.turn_counter = 0
         print("Счетчик ходов сброшен.")
\ No newline at end of file
@@ -1,13 +1,34 @@
-from lerdon_libraries import *
+import logging
+import random
+import sqlite3
+
+from army_strength import faction_consumption, faction_strengths
+from battle_forecast import forecast_many
 from fight import fight
-from db_lerdon_connect import *
+from lerdon_log import get_logger
+import map_events
+from road_graph import ATTACK, TRANSFER, road_graph
+from seasons import effective_stats
+from turn_metrics import TurnMetrics
+from unit_of_work import UnitOfWork
+from world_state import WorldState
+
+log = get_logger("ii")
+
 
 class AIController:
-    def __init__(self, faction, conn=None):
+    def __init__(self, faction, conn=None, world=None, metrics=None):
         self.faction = faction
         self.turn = 0
         self.db_connection = conn
         self.cursor = self.db_connection.cursor()
+        # Общий снимок мира; без него контроллер держит собственный и обновляет его сам
+        self.owns_world = world is None
+        self.world = world if world is not None else WorldState(conn)
+        # Все записи хода копятся здесь и фиксируются одной транзакцией в make_turn
+        self.uow = UnitOfWork(conn)
+        # Замеры фаз хода (по умолчанию выключены)
+        self.metrics = metrics if metrics is not None else TurnMetrics(conn)
         self.garrison = self.load_garrison()
         self.relations = self.load_relations()
         self.previous_crowns = 0
@@ -48,35 +69,25 @@ class AIController:
     # Методы загрузки данных из БД
     def load_resources(self):
         """
-        Загружает текущие ресурсы фракции из таблицы resources.
+        Загружает текущие ресурсы фракции из снимка мира.
         """
-        try:
-            self.cursor.execute('''
-                SELECT resource_type, amount
-                FROM resources
-                WHERE faction = ?
-            ''', (self.faction,))
-            rows = self.cursor.fetchall()
-
-            # Обновление ресурсов на основе данных из базы данных
-            for resource_type, amount in rows:
-                if resource_type == "Кроны":
-                    self.money = amount
-                elif resource_type == "Рабочие":
-                    self.free_peoples = amount
-                elif resource_type == "Сырье":
-                    self.raw_material = amount
-                elif resource_type == "Население":
-                    self.population = amount
-
-        except sqlite3.Error as e:
-            print(f"Ошибка при загрузке ресурсов: {e}")
+        # Обновление ресурсов на основе данных из снимка
+        for resource_type, amount in self.world.faction_resources(self.faction).items():
+            if resource_type == "Кроны":
+                self.money = amount
+            elif resource_type == "Рабочие":
+                self.free_peoples = amount
+            elif resource_type == "Сырье":
+                self.raw_material = amount
+            elif resource_type == "Население":
+                self.population = amount
 
     def load_buildings(self):
         """
         Загружает данные о зданиях для текущей фракции из таблицы buildings.
         """
         try:
+            self.uow.flush()
             self.cursor.execute('''
                 SELECT city_name, building_type, count 
                 FROM buildings 
@@ -108,28 +119,14 @@ class AIController:
 
         except sqlite3.Error as e:
             print(f"Ошибка при загрузке зданий: {e}")
+            self.uow.rollback()
 
     def load_relations(self):
         """
-        Загружает отношения текущей фракции с остальными из базы данных.
+        Загружает отношения текущей фракции с остальными из снимка мира.
         Возвращает словарь, где ключи — названия фракций, а значения — уровни отношений.
         """
-        try:
-            # Выполняем запрос к таблице relations
-            self.cursor.execute('''
-                SELECT faction2, relationship
-                FROM relations
-                WHERE faction1 = ?
-            ''', (self.faction,))
-            rows = self.cursor.fetchall()
-
-            # Преобразуем результат в словарь
-            relations = {faction2: relationship for faction2, relationship in rows}
-            return relations
-
-        except sqlite3.Error as e:
-            print(f"Ошибка при загрузке отношений: {e}")
-            return {}
+        return self.world.relations_of(self.faction)
 
     def load_garrison(self):
         """
@@ -157,69 +154,56 @@ class AIController:
                     "unit_name": unit_name,
                     "unit_count": count
                 })
-            print(f"Гарнизон для фракции {self.faction} успешно загружен: {garrison}")
+            log.debug("Гарнизон для фракции %s успешно загружен: %s", self.faction, garrison)
             return garrison
         except Exception as e:
-            print(f"Ошибка при загрузке гарнизона для фракции {self.faction}: {e}")
+            log.error("Ошибка при загрузке гарнизона для фракции %s: %s", self.faction, e)
             return {}
 
     def load_army(self):
         query = """
-            SELECT unit_name, cost_money, cost_time, attack, defense, durability, unit_class, consumption 
+            SELECT unit_name, durability, unit_class, consumption
             FROM units 
             WHERE faction = ?
         """
         self.cursor.execute(query, (self.faction,))
+        # Атака, защита и стоимость — с коэффициентами текущего сезона
+        season = effective_stats(self.db_connection, self.faction)
         return {
             row[0]: {  # unit_name
                 "cost": {  # Стоимость юнита
-                    "money": row[1],  # cost_money
-                    "time": row[2]  # cost_time
+                    "money": season[row[0]]["cost_money"],
+                    "time": season[row[0]]["cost_time"]
                 },
                 "stats": {  # Характеристики юнита
-                    "Атака": row[3],
-                    "Защита": row[4],
-                    "Прочность": row[5],
-                    "Класс": row[6]
+                    "Атака": season[row[0]]["attack"],
+                    "Защита": season[row[0]]["defense"],
+                    "Прочность": row[1],
+                    "Класс": row[2]
                 },
-                "consumption": row[7]
+                "consumption": row[3]
             } for row in self.cursor.fetchall()
         }
 
     def load_cities(self):
         """
-        Загружает список городов для текущей фракции из таблицы cities.
-        Выводит отладочную информацию о загруженных городах.
+        Загружает список городов для текущей фракции из снимка мира.
+        Выводит отладочную информацию о загруженных городах (уровень DEBUG).
         Также подсчитывает количество городов и сохраняет его в self.city_count.
         """
-        try:
-            # SQL-запрос для получения списка городов
-            query = """
-                SELECT id, name 
-                FROM cities 
-                WHERE faction = ?
-            """
-            self.cursor.execute(query, (self.faction,))
-            rows = self.cursor.fetchall()
+        # Словарь {id: name}
+        cities = self.world.cities_of(self.faction)
 
-            # Преобразуем результат в словарь {id: name}
-            cities = {row[0]: row[1] for row in rows}
+        # Подсчет количества городов
+        self.city_count = len(cities)  # Сохраняем количество городов
 
-            # Подсчет количества городов
-            self.city_count = len(cities)  # Сохраняем количество городов
+        # Отладочный вывод: информация о загруженных городах
+        if log.isEnabledFor(logging.DEBUG):
+            listing = "\n".join(f"  ID: {city_id}, Название: {city_name}"
+                                 for city_id, city_name in cities.items()) or "  Города не найдены."
+            log.debug("Загружены города для фракции '%s':\n%s", self.faction, listing)
 
-            # Отладочный вывод: информация о загруженных городах
-            print(f"Загружены города для фракции '{self.faction}':")
-            if cities:
-                for city_id, city_name in cities.items():
-                    print(f"  ID: {city_id}, Название: {city_name}")
-            else:
-                print("  Города не найдены.")
-
-            return cities
-        except sqlite3.Error as e:
-            print(f"Ошибка при загрузке городов для фракции '{self.faction}': {e}")
-            return {}
+        return cities
 
     # Методы сохранения данных в БД
     def save_resources_to_db(self):
@@ -229,27 +213,16 @@ class AIController:
         """
         try:
             for resource_type, amount in self.resources.items():
-                # Проверяем, существует ли запись
-                self.cursor.execute('''
-                    SELECT amount
-                    FROM resources
+                # UPDATE не затрагивает отсутствующие записи, поэтому новые не добавляются
+                self.uow.queue('''
+                    UPDATE resources
+                    SET amount = ?
                     WHERE faction = ? AND resource_type = ?
-                ''', (self.faction, resource_type))
-                existing_record = self.cursor.fetchone()
-
-                if existing_record:
-                    # Обновляем существующую запись
-                    self.cursor.execute('''
-                        UPDATE resources
-                        SET amount = ?
-                        WHERE faction = ? AND resource_type = ?
-                    ''', (amount, self.faction, resource_type))
-                else:
-                    # Если записи нет, пропускаем её (не добавляем новую)
-                    pass
+                ''', (amount, self.faction, resource_type))
 
             # Сохраняем изменения в базе данных
-            self.db_connection.commit()
+            self.uow.commit()
+            self.world.set_resources(self.faction, self.resources)
         except sqlite3.Error as e:
             print(f"Ошибка при сохранении ресурсов: {e}")
 
@@ -260,20 +233,20 @@ class AIController:
         """
         try:
             # Удаляем старые записи для текущей фракции
-            self.cursor.execute("DELETE FROM buildings WHERE faction = ?", (self.faction,))
+            self.uow.queue("DELETE FROM buildings WHERE faction = ?", (self.faction,))
 
             # Вставляем новые записи для каждого города и типа здания
             for city_name, data in self.buildings.items():
                 for building_type, count in data["Здания"].items():
                     if count > 0:  # Сохраняем только те здания, количество которых больше 0
-                        self.cursor.execute("""
+                        self.uow.queue("""
                             INSERT INTO buildings (faction, city_name, building_type, count)
                             VALUES (?, ?, ?, ?)
                         """, (self.faction, city_name, building_type, count))
 
             # Сохраняем изменения в базе данных
-            self.db_connection.commit()
-            print("Данные о зданиях успешно сохранены в БД.")
+            self.uow.commit()
+            log.debug("Данные о зданиях успешно сохранены в БД.")
         except sqlite3.Error as e:
             print(f"Ошибка при сохранении данных о зданиях: {e}")
 
@@ -283,7 +256,7 @@ class AIController:
         """
         try:
             # Удаляем старые записи для текущей фракции
-            self.cursor.execute("""
+            self.uow.queue("""
                 DELETE FROM buildings
                 WHERE faction = ?
             """, (self.faction,))
@@ -294,20 +267,20 @@ class AIController:
                 factory_count = data["Здания"]["Фабрика"]
 
                 if hospital_count > 0:
-                    self.cursor.execute("""
+                    self.uow.queue("""
                         INSERT INTO buildings (faction, city_name, building_type, count)
                         VALUES (?, ?, ?, ?)
                     """, (self.faction, city_name, "Больница", hospital_count))
 
                 if factory_count > 0:
-                    self.cursor.execute("""
+                    self.uow.queue("""
                         INSERT INTO buildings (faction, city_name, building_type, count)
                         VALUES (?, ?, ?, ?)
                     """, (self.faction, city_name, "Фабрика", factory_count))
 
             # Сохраняем изменения
-            self.db_connection.commit()
-            print("Данные о зданиях успешно сохранены в БД.")
+            self.uow.commit()
+            log.debug("Данные о зданиях успешно сохранены в БД.")
         except sqlite3.Error as e:
             print(f"Ошибка при сохранении данных о зданиях: {e}")
 
@@ -317,17 +290,12 @@ class AIController:
         Обновляет существующие записи или создает новые, если их нет, ориентируясь на city_name и unit_name.
         """
         try:
+            saved_units = []
             # Для каждого города обновляем или добавляем записи гарнизона
             for city_name, units in self.garrison.items():
                 # Проверяем, принадлежит ли город текущей фракции
-                self.cursor.execute("""
-                    SELECT faction
-                    FROM cities
-                    WHERE name = ?
-                """, (city_name,))
-                result = self.cursor.fetchone()
-                if not result or result[0] != self.faction:
-                    print(f"Город {city_name} не принадлежит фракции {self.faction}. Пропускаем сохранение гарнизона.")
+                if self.world.city_owner(city_name) != self.faction:
+                    log.debug("Город %s не принадлежит фракции %s. Пропускаем сохранение гарнизона.", city_name, self.faction)
                     continue
 
                 # Если город принадлежит фракции, сохраняем юниты
@@ -335,8 +303,9 @@ class AIController:
                     unit_name = unit['unit_name']
                     unit_count = unit['unit_count']
                     unit_image = self.get_unit_image(unit_name)
-                    print(f"  Обработка юнита: {unit_name}, Количество: {unit_count}, Изображение: {unit_image}")
+                    log.debug("  Обработка юнита: %s, Количество: %s, Изображение: %s", unit_name, unit_count, unit_image)
                     # Проверяем, существует ли уже запись для данного city_name и unit_name
+                    self.uow.flush()
                     self.cursor.execute("""
                         SELECT unit_count
                         FROM garrisons
@@ -357,11 +326,15 @@ class AIController:
                             INSERT INTO garrisons (city_id, unit_name, unit_count, unit_image)
                             VALUES (?, ?, ?, ?)
                         """, (city_name, unit_name, unit_count, unit_image))
+                    saved_units.append((city_name, unit_name, unit_count, unit_image))
             # Сохраняем изменения в базе данных
-            self.db_connection.commit()
-            print("Гарнизон успешно сохранен в БД.")
+            self.uow.commit()
+            for city_name, unit_name, unit_count, unit_image in saved_units:
+                self.world.add_units(city_name, unit_name, unit_count, unit_image)
+            log.debug("Гарнизон успешно сохранен в БД.")
         except sqlite3.Error as e:
             print(f"Ошибка при сохранении гарнизона: {e}")
+            self.uow.rollback()
 
     def manage_buildings(self):
         try:
@@ -372,7 +345,7 @@ class AIController:
 
             # Проверяем, достаточно ли средств для начала строительства
             if building_budget < 350:
-                print("Недостаточно средств для строительства.")
+                log.debug("Недостаточно средств для строительства.")
                 return
 
             # Вычисляем, сколько зданий каждого типа можно построить
@@ -405,7 +378,7 @@ class AIController:
         # Загружаем актуальные данные о городах фракции
         self.cities = self.load_cities()
         if not self.cities:
-            print(f"Нет доступных городов для строительства у фракции '{self.faction}'.")
+            log.debug("Нет доступных городов для строительства у фракции '%s'.", self.faction)
             return False
 
         import random
@@ -424,7 +397,7 @@ class AIController:
         # Вычисляем, сколько еще можно построить зданий в городе
         remaining_slots = max_buildings_per_city - total_buildings
         if remaining_slots <= 0:
-            print(f"В городе {target_city} достигнут лимит зданий ({max_buildings_per_city}).")
+            log.debug("В городе %s достигнут лимит зданий (%s).", target_city, max_buildings_per_city)
             return False
 
         # Ограничиваем количество зданий, которое можно построить, минимальным значением
@@ -434,7 +407,7 @@ class AIController:
         # Проверяем, достаточно ли денег для постройки
         total_cost = cost * count_to_build
         if self.resources['Кроны'] < total_cost:
-            print(f"Недостаточно денег для постройки {count_to_build} зданий в городе {target_city}.")
+            log.debug("Недостаточно денег для постройки %s зданий в городе %s.", count_to_build, target_city)
             return False
 
         # Увеличиваем количество зданий в выбранном городе
@@ -449,7 +422,7 @@ class AIController:
 
         # Списываем кроны
         self.resources['Кроны'] -= total_cost
-        print(f"Построено {count_to_build} {building_type} в городе {target_city}")
+        log.debug("Построено %s %s в городе %s", count_to_build, building_type, target_city)
 
 
         return True
@@ -465,44 +438,31 @@ class AIController:
             price_per_lot = self.raw_material_price / 10000
             self.update_economic_efficiency(price_per_lot)  # Обновляем эффективность
 
-            print(f"Продано {amount_to_sell} сырья за {earned_crowns} крон.")
+            log.debug("Продано %s сырья за %s крон.", amount_to_sell, earned_crowns)
             return True
         else:
-            print("Недостаточно сырья для продажи.")
+            log.debug("Недостаточно сырья для продажи.")
             return False
 
     def determine_dominant_unit_type(self):
         """Определяет доминирующий тип войск по максимальному потреблению"""
-        try:
-            # Получаем все юниты фракции с их характеристиками
-            query = """
-                SELECT g.unit_name, g.unit_count, u.attack, u.defense, u.consumption
-                FROM garrisons g
-                JOIN units u ON g.unit_name = u.unit_name
-                WHERE u.faction = ?
-            """
-            self.cursor.execute(query, (self.faction,))
-            units = self.cursor.fetchall()
-
-            if not units:
-                return 'attack'  # По умолчанию, если нет юнитов
-
-            # Считаем общее потребление для каждого типа
-            type_consumption = {'attack': 0, 'defense': 0}
-            for unit in units:
-                unit_name, count, attack, defense, consumption = unit
-                total_consumption = count * consumption
-                if defense > attack:
-                    type_consumption['defense'] += total_consumption
-                else:
-                    type_consumption['attack'] += total_consumption
-
-            # Определяем доминирующий тип
-            return 'defense' if type_consumption['defense'] > type_consumption['attack'] else 'attack'
+        # Получаем все юниты фракции с их характеристиками
+        units = self.world.faction_garrisons(self.faction)
+
+        if not units:
+            return 'attack'  # По умолчанию, если нет юнитов
+
+        # Считаем общее потребление для каждого типа
+        type_consumption = {'attack': 0, 'defense': 0}
+        for city_id, unit_name, count, unit_image, unit in units:
+            total_consumption = count * unit["consumption"]
+            if unit["defense"] > unit["attack"]:
+                type_consumption['defense'] += total_consumption
+            else:
+                type_consumption['attack'] += total_consumption
 
-        except sqlite3.Error as e:
-            print(f"Ошибка анализа войск: {e}")
-            return 'attack'
+        # Определяем доминирующий тип
+        return 'defense' if type_consumption['defense'] > type_consumption['attack'] else 'attack'
 
     def hire_army(self):
         """
@@ -515,23 +475,23 @@ class AIController:
         works = self.resources['Рабочие']
 
         if crowns <= 0 or works <= 0:
-            print("Недостаточно средств для найма армии.")
+            log.debug("Недостаточно средств для найма армии.")
             return
 
         # Рассчитываем текущее потребление
         self.calculate_current_consumption()
-        print(f"Текущее потребление: {self.total_consumption}, Лимит армии: {self.army_limit}")
+        log.debug("Текущее потребление: %s, Лимит армии: %s", self.total_consumption, self.army_limit)
 
         if self.total_consumption > self.army_limit:
-            print("Текущее потребление достигло лимита. Наем армии невозможен.")
+            log.debug("Текущее потребление достигло лимита. Наем армии невозможен.")
             return
 
         available_consumption = self.army_limit - self.total_consumption
-        print(f"Доступное потребление: {available_consumption}")
+        log.debug("Доступное потребление: %s", available_consumption)
 
         # Определяем доминирующий тип войск
         dominant_type = self.determine_dominant_unit_type()
-        print(f"Доминирующий тип войск: {dominant_type}")
+        log.debug("Доминирующий тип войск: %s", dominant_type)
 
         # В поздней игре используем только middle и hard_attack юниты
         if self.turn > 14:
@@ -544,7 +504,7 @@ class AIController:
         else:
             # Определяем доминирующий тип войск для ранней игры
             dominant_type = self.determine_dominant_unit_type()
-            print(f"Доминирующий тип войск: {dominant_type}")
+            log.debug("Доминирующий тип войск: %s", dominant_type)
 
             # Устанавливаем приоритет найма противоположного типа
             resource_allocation = {
@@ -576,7 +536,7 @@ class AIController:
                 continue
 
             # Учитываем лимит потребления
-            print('Учитываем лимит потребления')
+            log.debug('Учитываем лимит потребления')
             max_units = min(affordable_units,
                             available_consumption // consumption if consumption > 0 else affordable_units)
             if max_units <= 0:
@@ -591,7 +551,7 @@ class AIController:
             }
 
             # Обновляем лучшие юниты для каждой категории
-            print('Обновляем лучшие юниты для каждой категории')
+            log.debug('Обновляем лучшие юниты для каждой категории')
             for category in ["attack", "defense", "middle", "hard_attack"]:
                 if category == "hard_attack" and self.turn <= 14:
                     continue  # Супер-атакующие юниты только в поздней игре
@@ -613,7 +573,7 @@ class AIController:
                 }
 
         if not total_units:
-            print("Недостаточно средств для найма армии.")
+            log.debug("Недостаточно средств для найма армии.")
             return
 
         # Выбираем город с максимальным развитием
@@ -624,10 +584,10 @@ class AIController:
         )[0]
 
         if not target_city:
-            print("Нет доступных городов для найма.")
+            log.debug("Нет доступных городов для найма.")
             return
 
-        print(f"Выбран город для найма: {target_city}.")
+        log.debug("Выбран город для найма: %s.", target_city)
         new_garrison = {target_city: []}
 
         for category, unit_info in total_units.items():
@@ -652,16 +612,16 @@ class AIController:
                 "unit_name": unit_name,
                 "unit_count": max_units
             })
-            print(f"Нанято {max_units} юнитов '{unit_name}' в городе {target_city}.")
+            log.debug("Нанято %s юнитов '%s' в городе %s.", max_units, unit_name, target_city)
 
         # Обновляем гарнизон и сохраняем
         self.garrison.update(new_garrison)
         self.save_garrison()
-        print("Гарнизон после найма:", self.garrison)
+        log.debug("Гарнизон после найма: %s", self.garrison)
 
         # Перерасчет потребления
         self.calculate_and_deduct_consumption()
-        print(f"После найма: Текущее потребление: {self.total_consumption}, Лимит: {self.army_limit}")
+        log.debug("После найма: Текущее потребление: %s, Лимит: %s", self.total_consumption, self.army_limit)
 
     def calculate_army_limit(self):
         """
@@ -676,38 +636,9 @@ class AIController:
         """
         Рассчитывает текущее потребление армии.
         """
-        try:
-            self.total_consumption = 0  # Сбрасываем предыдущее значение
-
-            # Выгрузка всех гарнизонов из таблицы garrisons
-            self.cursor.execute("""
-                SELECT city_id, unit_name, unit_count 
-                FROM garrisons
-            """)
-            garrisons = self.cursor.fetchall()
-
-            # Для каждого гарнизона находим соответствующий юнит в таблице units
-            for garrison in garrisons:
-                city_id, unit_name, unit_count = garrison
-
-                # Получаем потребление юнита
-                self.cursor.execute("""
-                    SELECT consumption, faction 
-                    FROM units 
-                    WHERE unit_name = ?
-                """, (unit_name,))
-                unit_data = self.cursor.fetchone()
-
-                if unit_data:
-                    consumption, unit_faction = unit_data
-                    if unit_faction == self.faction:
-                        # Добавляем потребление данного типа юнита
-                        self.total_consumption += consumption * unit_count
-
-            print(f"Текущее потребление сырья: {self.total_consumption}")
-
-        except Exception as e:
-            print(f"Ошибка при расчете текущего потребления: {e}")
+        # Журнал потребления по фракциям ведут триггеры на garrisons (army_strength.py)
+        self.total_consumption = faction_consumption(self.db_connection, self.faction)
+        log.debug("Текущее потребление сырья: %s", self.total_consumption)
 
     def calculate_and_deduct_consumption(self):
         """
@@ -715,38 +646,19 @@ class AIController:
         и вычета суммарного потребления из self.raw_material.
         """
         try:
-            # Шаг 1: Выгрузка всех гарнизонов из таблицы garrisons
-            self.cursor.execute("""
-                SELECT city_id, unit_name, unit_count 
-                FROM garrisons
-            """)
-            garrisons = self.cursor.fetchall()
-
-            # Шаг 2: Для каждого гарнизона находим соответствующий юнит в таблице units
-            for garrison in garrisons:
-                city_id, unit_name, unit_count = garrison
-
-                # Проверяем, к какой фракции принадлежит юнит
-                self.cursor.execute("""
-                    SELECT consumption, faction 
-                    FROM units 
-                    WHERE unit_name = ?
-                """, (unit_name,))
-                unit_data = self.cursor.fetchone()
-
-                if unit_data:
-                    consumption, faction = unit_data
-
-                    # Учитываем только юниты текущей фракции
-                    if faction == self.faction:
-                        # Расчет потребления для данного типа юнита
-                        self.total_consumption = consumption * unit_count
+            # Шаг 1–2: потребление фракции из журнала army_strength — то же число, что у игрока
+            # (Faction.calculate_and_deduct_consumption); гарнизоны из очереди хода сначала пишутся в БД
+            self.uow.flush()
+            self.calculate_current_consumption()
 
             # Шаг 3: Вычитание общего потребления из денег фракции
             self.raw_material -= self.total_consumption
-            print(f"Общее потребление сырья: {self.total_consumption}")
-            print(f"Остаток сырья у фракции: {self.raw_material}")
+            log.debug("Общее потребление сырья: %s", self.total_consumption)
+            log.debug("Остаток сырья у фракции: %s", self.raw_material)
 
+        except sqlite3.Error as e:
+            print(f"Ошибка при расчёте потребления: {e}")
+            self.uow.rollback()
         except Exception as e:
             print(f"Произошла ошибка: {e}")
 
@@ -762,6 +674,7 @@ class AIController:
         Загружает данные о количестве больниц и фабрик из базы данных.
         """
         try:
+            self.uow.flush()
             query = """
                 SELECT building_type, SUM(count)
                 FROM buildings
@@ -775,9 +688,10 @@ class AIController:
             self.hospitals = next((count for b_type, count in rows if b_type == "Больница"), 0)
             self.factories = next((count for b_type, count in rows if b_type == "Фабрика"), 0)
 
-            print(f"Загружены здания: Больницы={self.hospitals}, Фабрики={self.factories}")
+            log.debug("Загружены здания: Больницы=%s, Фабрики=%s", self.hospitals, self.factories)
         except sqlite3.Error as e:
             print(f"Ошибка при загрузке данных о зданиях: {e}")
+            self.uow.rollback()
 
     def generate_raw_material_price(self):
         """
@@ -785,7 +699,7 @@ class AIController:
         """
         # Простая реализация: случайная цена в диапазоне
         self.raw_material_price = round(random.uniform(16200, 49250), 2200)
-        print(f"Новая цена на сырье: {self.raw_material_price}")
+        log.debug("Новая цена на сырье: %s", self.raw_material_price)
 
     def update_trade_resources_from_db(self):
         """
@@ -805,6 +719,7 @@ class AIController:
                 WHERE target_faction = ?
             """
             # Передаем self.faction как одиночное значение
+            self.uow.flush()
             self.cursor.execute(query, (self.faction,))
             rows = self.cursor.fetchall()
 
@@ -832,9 +747,10 @@ class AIController:
                     if initiator_type_resource in self.resources:
                         self.resources[initiator_type_resource] += initiator_summ_resource
 
-            print(f"Ресурсы из торговых соглашений обновлены: {self.resources}")
+            log.debug("Ресурсы из торговых соглашений обновлены: %s", self.resources)
         except sqlite3.Error as e:
             print(f"Ошибка при обновлении ресурсов из торговых соглашений: {e}")
+            self.uow.rollback()
         except ValueError as ve:
             print(f"Ошибка в данных: {ve}")
 
@@ -845,6 +761,8 @@ class AIController:
         self.raw_material, self.population и словарь self.resources.
         """
         try:
+            # Обмены из process_trade_agreements могли ещё лежать в очереди
+            self.uow.flush()
             query = "SELECT resource_type, amount FROM resources WHERE faction = ?"
             self.cursor.execute(query, (self.faction,))
             rows = self.cursor.fetchall()
@@ -869,9 +787,10 @@ class AIController:
                 'Население': self.population
             }
 
-            print(f"Ресурсы успешно загружены из БД: {self.resources}")
+            log.debug("Ресурсы успешно загружены из БД: %s", self.resources)
         except sqlite3.Error as e:
             print(f"Ошибка при загрузке ресурсов из БД: {e}")
+            self.uow.rollback()
 
     def update_resources(self):
         """
@@ -959,7 +878,7 @@ class AIController:
 
             self.save_resources_to_db()
 
-            print(f"Ресурсы обновлены: {self.resources}, Больницы: {self.hospitals}, Фабрики: {self.factories}")
+            log.debug("Ресурсы обновлены: %s, Больницы: %s, Фабрики: %s", self.resources, self.hospitals, self.factories)
 
         except sqlite3.Error as e:
             print(f"Ошибка при обновлении ресурсов: {e}")
@@ -969,7 +888,7 @@ class AIController:
             self.save_resources_to_db()
             self.save_buildings()
             self.save_results_to_db()
-            print("Все данные успешно сохранены в БД")
+            log.debug("Все данные успешно сохранены в БД")
         except Exception as e:
             print(f"Ошибка при сохранении данных: {e}")
 
@@ -983,22 +902,11 @@ class AIController:
         Returns:
             str: Путь к изображению юнита или пустая строка, если не найдено
         """
-        try:
-            query = """
-                SELECT image_path 
-                FROM units 
-                WHERE faction = ? AND unit_name = ?
-            """
-            self.cursor.execute(query, (self.faction, unit_name))
-            result = self.cursor.fetchone()
-            if result:
-                return result[0]  # Возвращаем путь к изображению
-            else:
-                print(f"Предупреждение: Изображение для юнита '{unit_name}' не найдено")
-                return ""
-        except Exception as e:
-            print(f"Ошибка при получении изображения юнита '{unit_name}': {e}")
-            return ""
+        unit = self.world.units.get(unit_name)
+        if unit and unit["faction"] == self.faction:
+            return unit["image_path"]  # Возвращаем путь к изображению
+        print(f"Предупреждение: Изображение для юнита '{unit_name}' не найдено")
+        return ""
 
     def process_trade_agreements(self):
         """
@@ -1016,6 +924,7 @@ class AIController:
                 FROM trade_agreements
                 WHERE target_faction = ?
             """
+            self.uow.flush()
             self.cursor.execute(query, (self.faction,))
             rows = self.cursor.fetchall()
 
@@ -1028,7 +937,7 @@ class AIController:
 
                 # Определяем коэффициент на основе уровня отношений
                 if relation_level < 15:
-                    print(f"Отказ от сделки с {initiator}. Низкий уровень отношений ({relation_level}).")
+                    log.debug("Отказ от сделки с %s. Низкий уровень отношений (%s).", initiator, relation_level)
                     self.update_agreement_status(trade_id, False)  # Проставляем agree = false
                     continue
 
@@ -1036,7 +945,7 @@ class AIController:
                 has_enough_resources = self.resources.get(target_type_resource, 0) >= target_summ_resource
 
                 if not has_enough_resources:
-                    print(f"Отказ от сделки с {initiator}. Недостаточно ресурсов для выполнения сделки.")
+                    log.debug("Отказ от сделки с %s. Недостаточно ресурсов для выполнения сделки.", initiator)
                     self.update_agreement_status(trade_id, False)  # Проставляем agree = false
                     continue
 
@@ -1063,22 +972,21 @@ class AIController:
 
                 # Проверяем, выгодна ли сделка
                 if resource_ratio > coefficient:
-                    print(
-                        f"Отказ от сделки с {initiator}. Не выгодное соотношение ({resource_ratio:.2f} < {coefficient:.2f})."
-                    )
+                    log.debug("Отказ от сделки с %s. Не выгодное соотношение (%.2f < %.2f).",
+                              initiator, resource_ratio, coefficient)
                     self.update_agreement_status(trade_id, False)  # Проставляем agree = false
                     continue
 
                 # Если сделка выгодна, выполняем обмен ресурсами
-                print(
-                    f"Принята сделка с {initiator}. Соотношение: {resource_ratio:.2f}, Коэффициент: {coefficient:.2f}."
-                )
+                log.debug("Принята сделка с %s. Соотношение: %.2f, Коэффициент: %.2f.",
+                          initiator, resource_ratio, coefficient)
                 self.execute_trade(initiator, target_faction, initiator_type_resource, target_type_resource,
                                    initiator_summ_resource, target_summ_resource)
                 self.update_agreement_status(trade_id, True)  # Проставляем agree = true
 
         except sqlite3.Error as e:
             print(f"Ошибка при обработке торговых соглашений: {e}")
+            self.uow.rollback()
 
     def update_agreement_status(self, trade_id, status):
         """
@@ -1092,9 +1000,9 @@ class AIController:
                 SET agree = ?
                 WHERE id = ?
             """
-            self.cursor.execute(query, (status, trade_id))
-            self.db_connection.commit()
-            print(f"Статус сделки ID={trade_id} обновлен: agree={status}")
+            self.uow.queue(query, (status, trade_id))
+            self.uow.commit()
+            log.debug("Статус сделки ID=%s обновлен: agree=%s", trade_id, status)
         except sqlite3.Error as e:
             print(f"Ошибка при обновлении статуса сделки: {e}")
 
@@ -1103,13 +1011,14 @@ class AIController:
         Возвращает ресурсы инициатору сделки в случае отказа.
         """
         try:
-            self.cursor.execute("""
+            self.uow.queue("""
                 UPDATE resources
                 SET amount = amount + ?
                 WHERE faction = ? AND resource_type = ?
             """, (amount, initiator, resource_type))
-            self.db_connection.commit()
-            print(f"Возвращено {amount} {resource_type} фракции {initiator}.")
+            self.uow.commit()
+            self.world.adjust_resource(initiator, resource_type, amount)
+            log.debug("Возвращено %s %s фракции %s.", amount, resource_type, initiator)
         except sqlite3.Error as e:
             print(f"Ошибка при возврате ресурсов: {e}")
 
@@ -1118,12 +1027,12 @@ class AIController:
         Удаляет торговое соглашение из базы данных.
         """
         try:
-            self.cursor.execute("""
+            self.uow.queue("""
                 DELETE FROM trade_agreements
                 WHERE id = ?
             """, (trade_id,))
-            self.db_connection.commit()
-            print(f"Торговое соглашение ID={trade_id} удалено.")
+            self.uow.commit()
+            log.debug("Торговое соглашение ID=%s удалено.", trade_id)
         except sqlite3.Error as e:
             print(f"Ошибка при удалении торгового соглашения: {e}")
 
@@ -1134,102 +1043,56 @@ class AIController:
         """
         try:
             # Отнимаем ресурсы у инициатора
-            self.cursor.execute("""
+            self.uow.queue("""
                 UPDATE resources
                 SET amount = amount - ?
                 WHERE faction = ? AND resource_type = ?
             """, (initiator_summ_resource, initiator, initiator_type_resource))
 
             # Добавляем ресурсы целевой фракции
-            self.cursor.execute("""
+            self.uow.queue("""
                 UPDATE resources
                 SET amount = amount + ?
                 WHERE faction = ? AND resource_type = ?
             """, (target_summ_resource, target_faction, target_type_resource))
 
             # Добавляем ресурсы целевой фракции инициатору
-            self.cursor.execute("""
+            self.uow.queue("""
                 UPDATE resources
                 SET amount = amount + ?
                 WHERE faction = ? AND resource_type = ?
             """, (initiator_summ_resource, target_faction, initiator_type_resource))
 
             # Отнимаем ресурсы у целевой фракции
-            self.cursor.execute("""
+            self.uow.queue("""
                 UPDATE resources
                 SET amount = amount - ?
                 WHERE faction = ? AND resource_type = ?
             """, (target_summ_resource, initiator, target_type_resource))
 
-            self.db_connection.commit()
-            print(f"Обмен ресурсами выполнен: {initiator} <-> {target_faction}.")
+            self.uow.commit()
+            self.world.adjust_resource(initiator, initiator_type_resource, -initiator_summ_resource)
+            self.world.adjust_resource(target_faction, target_type_resource, target_summ_resource)
+            self.world.adjust_resource(target_faction, initiator_type_resource, initiator_summ_resource)
+            self.world.adjust_resource(initiator, target_type_resource, -target_summ_resource)
+            log.debug("Обмен ресурсами выполнен: %s <-> %s.", initiator, target_faction)
         except sqlite3.Error as e:
             print(f"Ошибка при выполнении обмена ресурсами: {e}")
 
     def load_political_system(self):
         """
-        Загружает текущую политическую систему фракции из базы данных.
+        Загружает текущую политическую систему фракции из снимка мира.
         """
-        try:
-            query = "SELECT system FROM political_systems WHERE faction = ?"
-            self.cursor.execute(query, (self.faction,))
-            result = self.cursor.fetchone()
-            return result[0] if result else "Капитализм"  # По умолчанию "Капитализм"
-        except sqlite3.Error as e:
-            print(f"Ошибка при загрузке политической системы: {e}")
-            return "Капитализм"
+        return self.world.political_system(self.faction)  # По умолчанию "Капитализм"
 
     def calculate_army_strength(self):
         """
         Рассчитывает силу армий для каждой фракции.
         :return: Словарь, где ключи — названия фракций, а значения — сила армии.
         """
-        class_coefficients = {
-            "1": 1.3,  # Класс 1: базовые юниты
-            "2": 1.7,  # Класс 2: улучшенные юниты
-            "3": 2.0,  # Класс 3: элитные юниты
-            "4": 3.0,  # Класс 4: легендарные юниты
-            "5": 4.0  # Класс 5: экстраординарные юниты
-        }
-
-        army_strength = {}
-
-        try:
-            # Получаем все юниты из таблицы garrisons и их характеристики из таблицы units
-            query = """
-                SELECT g.unit_name, g.unit_count, u.faction, u.attack, u.defense, u.durability, u.unit_class 
-                FROM garrisons g
-                JOIN units u ON g.unit_name = u.unit_name
-            """
-            self.cursor.execute(query)
-            garrison_data = self.cursor.fetchall()
-
-            # Рассчитываем силу армии для каждой фракции
-            for row in garrison_data:
-                unit_name, unit_count, faction, attack, defense, durability, unit_class = row
-
-                if not faction:
-                    continue
-
-                # Коэффициент класса
-                coefficient = class_coefficients.get(unit_class, 1.0)
-
-                # Рассчитываем силу юнита
-                unit_strength = (attack * coefficient) + defense + durability
-
-                # Умножаем на количество юнитов
-                total_strength = unit_strength * unit_count
-
-                # Добавляем к общей силе фракции
-                if faction not in army_strength:
-                    army_strength[faction] = 0
-                army_strength[faction] += total_strength
-
-        except sqlite3.Error as e:
-            print(f"Ошибка при расчете силы армии: {e}")
-            return {}
-
-        return army_strength
+        # Сила читается из таблицы army_strength, поэтому гарнизоны хода должны быть уже записаны
+        self.uow.flush()
+        return faction_strengths(self.db_connection)
 
     def notify_player_about_war(self, faction):
         """
@@ -1238,7 +1101,7 @@ class AIController:
         """
         try:
             # Здесь можно интегрировать логику для отображения окна уведомления
-            print(f"!!! ВНИМАНИЕ !!! Фракция {self.faction} объявила войну фракции {faction}.")
+            log.debug("!!! ВНИМАНИЕ !!! Фракция %s объявила войну фракции %s.", self.faction, faction)
             # Пример: вызов GUI-функции для отображения уведомления
             # show_notification(f"Фракция {self.faction} объявила войну!")
         except Exception as e:
@@ -1257,7 +1120,7 @@ class AIController:
                 SET relationship = ?
                 WHERE faction1 = ? AND faction2 = ?
             """
-            self.cursor.execute(query, (status, self.faction, faction))
+            self.uow.queue(query, (status, self.faction, faction))
 
             # Обновляем запись B-A
             query = """
@@ -1265,107 +1128,110 @@ class AIController:
                 SET relationship = ?
                 WHERE faction1 = ? AND faction2 = ?
             """
-            self.cursor.execute(query, (status, faction, self.faction))
+            self.uow.queue(query, (status, faction, self.faction))
 
-            self.db_connection.commit()
-            print(f"Статус дипломатии между {self.faction} и {faction} обновлен на '{status}'.")
+            self.uow.commit()
+            self.world.set_diplomacy(self.faction, faction, status)
+            log.debug("Статус дипломатии между %s и %s обновлен на '%s'.", self.faction, faction, status)
         except sqlite3.Error as e:
             print(f"Ошибка при обновлении статуса дипломатии: {e}")
 
-    def find_nearest_allied_city(self, faction):
+    def find_nearest_allied_city(self, faction, target_city=None):
         """
         Находит ближайший союзный город для передислокации войск.
         :param faction: Название фракции (своей или союзной)
+        :param target_city: Атакуемый город: войска стягиваются в ближайший к нему город фракции.
+                            Без него — город фракции, ближайший к нашим городам в пределах дальности атаки.
         :return: Имя ближайшего союзного города или None, если подходящий город не найден
         """
-        try:
-            # Получаем координаты всех городов текущей фракции
-            query = "SELECT name, coordinates FROM cities WHERE faction = ?"
-            self.cursor.execute(query, (self.faction,))
-            our_cities = self.cursor.fetchall()
-
-            # Получаем координаты всех союзных городов
-            query = "SELECT name, coordinates FROM cities WHERE faction = ?"
-            self.cursor.execute(query, (faction,))
-            allied_cities = self.cursor.fetchall()
-
-            # Находим ближайший союзный город с учетом ограничения по дистанции
-            nearest_city = None
-            for our_city_name, our_coords in our_cities:
-                our_coords = our_coords.strip("[]")  # Убираем [ и ]
-                our_x, our_y = map(int, our_coords.split(','))
-                for allied_city_name, allied_coords in allied_cities:
-                    allied_coords = allied_coords.strip("[]")  # Убираем [ и ]
-                    allied_x, allied_y = map(int, allied_coords.split(','))
-                    distance = ((our_x - allied_x) ** 2 + (our_y - allied_y) ** 2) ** 0.5
-                    if distance <= 225:
-                        nearest_city = allied_city_name
-            return nearest_city
-        except sqlite3.Error as e:
-            print(f"Ошибка при поиске ближайшего союзного города: {e}")
-            return None
-
-    def find_nearest_city(self, faction):
-        """Находит ближайший город противника для атаки.
-        :param faction: Название фракции
-        :return: Имя ближайшего города или None, если подходящий город не найден"""
-        try:
-            # Получаем координаты всех городов текущей фракции
-            query = "SELECT name, coordinates FROM cities WHERE faction = ?"
-            self.cursor.execute(query, (self.faction,))
-            our_cities = self.cursor.fetchall()
-
-            # Получаем координаты всех городов противника
-            query = "SELECT name, coordinates FROM cities WHERE faction = ?"
-            self.cursor.execute(query, (faction,))
-            enemy_cities = self.cursor.fetchall()
-
-            nearest_city = None
-
-            for our_city_name, our_coords in our_cities:
-                our_coords = our_coords.strip("[]")  # Убираем [ и ]
-                our_x, our_y = map(int, our_coords.split(','))
-
-                for enemy_city_name, enemy_coords in enemy_cities:
-                    enemy_coords = enemy_coords.strip("[]")  # Убираем [ и ]
-                    enemy_x, enemy_y = map(int, enemy_coords.split(','))
-
-                    # Новый расчет расстояния
-                    distance = abs(our_x - enemy_x) + abs(our_y - enemy_y)
-
-                    if distance < 225:
-                        nearest_city = enemy_city_name
-                        return nearest_city
+        target = self.world.cities.get(target_city) if target_city is not None else None
+        if target is None or target["x"] is None:
+            candidates = self.cities_within(faction, ATTACK)
+            return candidates[0] if candidates else None
+        # Соседи по графу дорог уже отсортированы от ближнего к дальнему
+        for distance, neighbour in road_graph(self.db_connection).neighbours(target_city, TRANSFER):
+            if self.world.city_owner(neighbour) == faction:
+                return neighbour
+        # Дальше порога переброски — пространственный индекс без ограничения дальности
+        return self.world.city_index.nearest(faction, target["x"], target["y"], exclude=target_city)
+
+    def cities_within(self, faction, kind):
+        """
+        Города фракции, связанные с нашими городами правилом kind графа дорог (road_graph.py).
+        :return: Имена от ближнего к дальнему; при равном расстоянии — в порядке городов.
+        """
+        roads = road_graph(self.db_connection)
+        order = self.world.city_order
+        found = {}  # {name: (расстояние, порядок нашего города, порядок города фракции)}
+        for own_order, name, x, y in self.world.city_index.points.get(self.faction, ()):
+            for distance, neighbour in roads.neighbours(name, kind):
+                if self.world.city_owner(neighbour) != faction:
+                    continue
+                key = (distance, own_order, order[neighbour])
+                if neighbour not in found or key < found[neighbour]:
+                    found[neighbour] = key
+        return sorted(found, key=found.get)
 
+    def choose_target_city(self, faction):
+        """
+        Выбирает город противника для атаки: ближайший из тех, что наша армия
+        по прогнозу боя (battle_forecast.py) захватит; если таких нет — просто ближайший.
+        :param faction: Название фракции противника
+        :return: Имя города или None, если в пределах дальности атаки городов нет
+        """
+        candidates = self.cities_within(faction, ATTACK)
+        if not candidates:
             return None
-        except sqlite3.Error as e:
-            print(f"Ошибка при поиске ближайшего города: {e}")
-            return None
-
-
+        army = self.planned_attack_army()
+        if army:
+            forecasts = forecast_many([(army, self.get_defending_army(city)) for city in candidates])
+            for city_name, forecast in zip(candidates, forecasts):
+                if forecast["winner"] == "attacking":
+                    return city_name
+        return candidates[0]
+
+    def planned_attack_army(self):
+        """
+        Армия, которую соберёт attack_city (атакующие юниты, а без них — защитные),
+        в формате fight() — для прогноза боя без передислокации.
+        """
+        rows = self.world.faction_garrisons(self.faction, lambda unit: unit["attack"] > unit["defense"])
+        if not rows:
+            rows = self.world.faction_garrisons(self.faction, lambda unit: unit["defense"] > unit["attack"])
+        return [{
+            "unit_name": unit_name,
+            "unit_count": unit_count,
+            "unit_image": unit_image,
+            "units_stats": {
+                "Урон": unit["attack"],
+                "Защита": unit["defense"],
+                "Живучесть": unit["durability"],
+                "Класс юнита": unit["unit_class"],
+            }
+        } for city_id, unit_name, unit_count, unit_image, unit in rows]
 
     def relocate_units(self, from_city_name, to_city_name, unit_name, unit_count, unit_image):
         try:
             # Проверяем, что города разные
             if from_city_name == to_city_name:
-                print(f"Передислокация в тот же город невозможна: {from_city_name}")
+                log.debug("Передислокация в тот же город невозможна: %s", from_city_name)
                 return
 
-            # Уменьшаем количество юнитов в исходном городе
-            self.cursor.execute("""
+            # Уменьшаем количество юнитов в исходном городе (сразу: гарнизоны читает бой)
+            self.uow.execute("""
                 UPDATE garrisons
                 SET unit_count = unit_count - ?
                 WHERE city_id = ? AND unit_name = ?
             """, (unit_count, from_city_name, unit_name))
 
             # Удаляем запись, если юнитов больше нет
-            self.cursor.execute("""
+            self.uow.execute("""
                 DELETE FROM garrisons
                 WHERE city_id = ? AND unit_name = ? AND unit_count <= 0
             """, (from_city_name, unit_name))
 
             # Добавляем юниты в целевой город
-            self.cursor.execute("""
+            self.uow.execute("""
                 INSERT INTO garrisons (city_id, unit_name, unit_count, unit_image)
                 VALUES (?, ?, ?, ?)
                 ON CONFLICT(city_id, unit_name) DO UPDATE SET
@@ -1373,10 +1239,12 @@ class AIController:
                 unit_image = excluded.unit_image
             """, (to_city_name, unit_name, unit_count, unit_image))
 
-            self.db_connection.commit()
-            print(f"Передислокация {unit_count} юнитов {unit_name} из {from_city_name} в {to_city_name} выполнена.")
+            self.uow.commit()
+            self.world.move_units(from_city_name, to_city_name, unit_name, unit_count, unit_image)
+            log.debug("Передислокация %s юнитов %s из %s в %s выполнена.", unit_count, unit_name, from_city_name, to_city_name)
         except sqlite3.Error as e:
             print(f"Ошибка при передислокации: {e}")
+            self.uow.rollback()
 
     def launch_attack_on_city(self, city_name, target_faction):
         """
@@ -1389,7 +1257,7 @@ class AIController:
             attacking_units = self.collect_attacking_units()
 
             if not attacking_units:
-                print("Нет атакующих юнитов. Используются защитные юниты для атаки.")
+                log.debug("Нет атакующих юнитов. Используются защитные юниты для атаки.")
                 attacking_units = self.collect_defensive_units()
 
             total_units = sum(unit["unit_count"] for unit in attacking_units)
@@ -1410,9 +1278,9 @@ class AIController:
                 remaining_units -= take_units
 
             # Передислоцируем все собранные юниты в ближайший союзный город
-            allied_city = self.find_nearest_allied_city(self.faction)
+            allied_city = self.find_nearest_allied_city(self.faction, city_name)
             if not allied_city:
-                print("Союзный город не найден.")
+                log.debug("Союзный город не найден.")
                 return
 
             for unit in attack_army:
@@ -1436,48 +1304,35 @@ class AIController:
         :param city_name: Имя города
         :return: Список обороняющихся юнитов
         """
-        try:
-            query = """
-                SELECT g.unit_name, g.unit_count, u.attack, u.defense, u.durability, u.unit_class, g.unit_image
-                FROM garrisons g
-                JOIN units u ON g.unit_name = u.unit_name
-                WHERE g.city_id = ?
-            """
-            self.cursor.execute(query, (city_name,))
-            defending_units = self.cursor.fetchall()
-
-            defending_army = []
-            for unit_name, unit_count, attack, defense, durability, unit_class, unit_image in defending_units:
-                defending_army.append({
-                    "unit_name": unit_name,
-                    "unit_count": int(unit_count),
-                    "unit_image": unit_image,
-                    "units_stats": {
-                        "Урон": int(attack),
-                        "Защита": int(defense),
-                        "Живучесть": int(durability),
-                        "Класс юнита": unit_class,
-                    }
-                })
-            return defending_army
-        except sqlite3.Error as e:
-            print(f"Ошибка при получении обороняющейся армии: {e}")
-            return []
+        defending_army = []
+        for unit_name, entry, unit in self.world.garrison_units(city_name):
+            defending_army.append({
+                "unit_name": unit_name,
+                "unit_count": int(entry["unit_count"]),
+                "unit_image": entry["unit_image"],
+                "units_stats": {
+                    "Урон": int(unit["attack"]),
+                    "Защита": int(unit["defense"]),
+                    "Живучесть": int(unit["durability"]),
+                    "Класс юнита": unit["unit_class"],
+                }
+            })
+        return defending_army
 
     def attack_city(self, city_name, faction):
         try:
             # Находим ближайший союзный город для атаки
-            allied_city = self.find_nearest_allied_city(self.faction)
+            allied_city = self.find_nearest_allied_city(self.faction, city_name)
             if not allied_city:
-                print("Не удалось найти ближайший союзный город.")
+                log.debug("Не удалось найти ближайший союзный город.")
                 return
 
-            print(f"Ближайший союзный город для атаки: {allied_city}")
+            log.debug("Ближайший союзный город для атаки: %s", allied_city)
 
             # Собираем все атакующие юниты из всех городов
             attacking_units = self.collect_attacking_units()
             if not attacking_units:
-                print("Нет атакующих юнитов. Используются защитные юниты для атаки.")
+                log.debug("Нет атакующих юнитов. Используются защитные юниты для атаки.")
                 attacking_units = self.collect_defensive_units()
 
             # Передислоцируем юниты в ближайший союзный город
@@ -1490,41 +1345,35 @@ class AIController:
                     unit_image=unit["unit_image"]
                 )
 
-            print(f"Все атакующие юниты передислоцированы в город {allied_city}.")
+            log.debug("Все атакующие юниты передислоцированы в город %s.", allied_city)
 
             # Проверяем общую численность войск в городе атаки
-            self.cursor.execute("""
-                SELECT SUM(unit_count) FROM garrisons WHERE city_id = ?
-            """, (allied_city,))
-            total_units = self.cursor.fetchone()[0] or 0
+            total_units = sum(entry["unit_count"] for entry in self.world.garrisons.get(allied_city, {}).values())
 
             if total_units == 0:
-                print("Войска не готовы к атаке. Гарнизон пуст.")
+                log.debug("Войска не готовы к атаке. Гарнизон пуст.")
                 return
 
             # Формируем армию для атаки
             attacking_army = []
             for unit in attacking_units:
-                self.cursor.execute("""
-                    SELECT attack, defense, durability, unit_class
-                    FROM units
-                    WHERE unit_name = ?
-                """, (unit["unit_name"],))
-                stats = self.cursor.fetchone()
+                stats = self.world.units.get(unit["unit_name"])
                 if stats:
                     attacking_army.append({
                         "unit_name": unit["unit_name"],
                         "unit_count": unit["unit_count"],
                         "unit_image": unit["unit_image"],
                         "units_stats": {
-                            "Урон": stats[0],
-                            "Защита": stats[1],
-                            "Живучесть": stats[2],
-                            "Класс юнита": stats[3],
+                            "Урон": stats["attack"],
+                            "Защита": stats["defense"],
+                            "Живучесть": stats["durability"],
+                            "Класс юнита": stats["unit_class"],
                         }
                     })
 
             # Атакуем вражеский город
+            # Бой читает гарнизоны и здания напрямую из БД и пишет итог в точке сохранения хода
+            self.uow.flush()
             result = fight(
                 attacking_city=allied_city,
                 defending_city=city_name,
@@ -1532,9 +1381,15 @@ class AIController:
                 attacking_army=attacking_army,
                 attacking_fraction=self.faction,
                 defending_fraction=faction,
-                conn=self.db_connection
+                conn=self.db_connection,
+                uow=self.uow
             )
-            print(f"Результат битвы: {result}")
+            log.debug("Результат битвы: %s", result)
+            if result is None:
+                return
+            # Бой меняет гарнизоны и принадлежность городов — перечитываем их в снимок
+            self.world.reload_garrisons()
+            self.world.reload_cities()
 
             # Обработка результата битвы
             if result["winner"] == "attacker":
@@ -1560,8 +1415,8 @@ class AIController:
                     if defense_count > 0:
                         self.relocate_units(allied_city, city_name, unit["unit_name"], defense_count,
                                             unit["unit_image"])
-                        print(
-                            f"Размещено {defense_count} юнитов '{unit['unit_name']}' в городе {city_name} для обороны.")
+                        log.debug("Размещено %s юнитов '%s' в городе %s для обороны.",
+                                  defense_count, unit["unit_name"], city_name)
 
                 # Отводим остальные войска обратно в союзный город
                 for unit in remaining_units:
@@ -1569,7 +1424,7 @@ class AIController:
                     if remaining_count > 0:
                         self.relocate_units(allied_city, allied_city, unit["unit_name"], remaining_count,
                                             unit["unit_image"])
-                        print(f"Отведено {remaining_count} юнитов '{unit['unit_name']}' обратно в город {allied_city}.")
+                        log.debug("Отведено %s юнитов '%s' обратно в город %s.", remaining_count, unit['unit_name'], allied_city)
 
                 # Обновляем принадлежность города
                 self.cursor.execute("""
@@ -1577,11 +1432,15 @@ class AIController:
                     SET faction = ?
                     WHERE name = ?
                 """, (self.faction, city_name))
+                self.world.reload_cities()
 
-                print(f"Город {city_name} захвачен и укреплен оборонительными войсками.")
+                log.debug("Город %s захвачен и укреплен оборонительными войсками.", city_name)
             else:
-                print(f"Атака на город {city_name} провалилась.")
+                log.debug("Атака на город %s провалилась.", city_name)
 
+        except sqlite3.Error as e:
+            print(f"Ошибка при атаке города: {e}")
+            self.uow.rollback()
         except Exception as e:
             print(f"Ошибка при атаке города: {e}")
 
@@ -1590,11 +1449,9 @@ class AIController:
         Захватывает город под контроль текущей фракции.
         :param city_name: Название захваченного города
         """
-        print("---------------------------------")
-        print("city_name", city_name)
-        print("---------------------------------")
+        log.debug("Захват города %s", city_name)
         try:
-            with self.db_connection:
+            with self.uow.savepoint():
                 # Удаляем гарнизон противника
                 self.cursor.execute("""
                     DELETE FROM garrisons WHERE city_id = ?
@@ -1627,6 +1484,7 @@ class AIController:
                     SET kingdom = ?
                     WHERE fortress_name = ?
                 """, (self.faction, city_name))
+                map_events.city_changed(city_name)
 
                 # Обновляем принадлежность зданий
                 self.cursor.execute("""
@@ -1635,7 +1493,9 @@ class AIController:
                     WHERE city_id = ?
                 """, (self.faction, city_name))
 
-                print(f"Город {city_name} успешно захвачен фракцией {self.faction}.")
+                log.debug("Город %s успешно захвачен фракцией %s.", city_name, self.faction)
+            self.world.reload_garrisons()
+            self.world.reload_cities()
         except sqlite3.Error as e:
             print(f"Ошибка при захвате города: {e}")
 
@@ -1665,6 +1525,7 @@ class AIController:
                 FROM buildings 
                 WHERE faction = ?
             """
+            self.uow.flush()
             self.cursor.execute(query, (self.faction,))
             rows = self.cursor.fetchall()
 
@@ -1675,10 +1536,11 @@ class AIController:
 
             # Обновляем self.buildings
             self.buildings = updated_buildings
-            print(f"Обновлены данные о зданиях для фракции {self.faction}: {self.buildings}")
+            log.debug("Обновлены данные о зданиях для фракции %s: %s", self.faction, self.buildings)
 
         except sqlite3.Error as e:
             print(f"Ошибка при обновлении данных о зданиях: {e}")
+            self.uow.rollback()
 
     def check_for_empty_garrison(self, city_id, faction):
         """
@@ -1696,7 +1558,7 @@ class AIController:
             total_units = self.cursor.fetchone()[0] or 0
 
             if total_units == 0:
-                print(f"Гарнизон противника в городе ID={city_id} уничтожен. Город переходит под контроль ИИ.")
+                log.debug("Гарнизон противника в городе ID=%s уничтожен. Город переходит под контроль ИИ.", city_id)
                 self.capture_city(city_id)
         except sqlite3.Error as e:
             print(f"Ошибка при проверке гарнизона: {e}")
@@ -1707,7 +1569,7 @@ class AIController:
         Если отношения падают ниже 12% И сила армии потенциального противника
         ниже в 1.5 раза, чем сила текущей фракции, объявляет войну.
         Также проверяет, находится ли фракция в состоянии войны, и если да,
-        сразу атакует ближайший город.
+        сразу атакует город, выбранный по прогнозу боя (choose_target_city).
         """
         try:
             # Загружаем текущие отношения с другими фракциями
@@ -1715,33 +1577,26 @@ class AIController:
             # Рассчитываем силу армий для всех фракций
             army_strength = self.calculate_army_strength()
             our_strength = army_strength.get(self.faction, 0)
-            print("our_strength:", type(our_strength), our_strength)
+            log.debug("our_strength: %s", our_strength)
 
             for faction, relationship in self.relations.items():
                 # Проверяем текущий статус дипломатии с фракцией
-                query = """
-                    SELECT relationship FROM diplomacies
-                    WHERE faction1 = ? AND faction2 = ?
-                """
-                self.cursor.execute(query, (self.faction, faction))
-                result = self.cursor.fetchone()
-
-                if result is None:
+                diplomacy_status = self.world.diplomacy(self.faction, faction)
+
+                if diplomacy_status is None:
                     # Если записи нет, считаем, что статус "мир"
                     diplomacy_status = "мир"
-                    print(f"Дипломатический статус с фракцией {faction} не найден. Установлен статус 'мир'.")
-                else:
-                    diplomacy_status = result[0]
+                    log.debug("Дипломатический статус с фракцией %s не найден. Установлен статус 'мир'.", faction)
 
                 if diplomacy_status == "война":
                     # Если уже объявлена война, атакуем ближайший город
-                    print(f"Фракция {self.faction} уже находится в состоянии войны с фракцией {faction}.")
-                    target_city = self.find_nearest_city(faction)
+                    log.debug("Фракция %s уже находится в состоянии войны с фракцией %s.", self.faction, faction)
+                    target_city = self.choose_target_city(faction)
                     if target_city:
-                        print(f"Ближайший вражеский город для атаки: {target_city}")
+                        log.debug("Вражеский город для атаки: %s", target_city)
                         self.attack_city(target_city, faction)
                     else:
-                        print(f"Не удалось найти подходящий город для атаки у фракции {faction}.")
+                        log.debug("Не удалось найти подходящий город для атаки у фракции %s.", faction)
                     continue
 
                 # Если нет войны, проверяем условия для объявления войны
@@ -1749,23 +1604,24 @@ class AIController:
                     enemy_strength = army_strength.get(faction, 0)
                     # Проверяем, что наша сила армии больше в 1.4 раза
                     if our_strength > 1.4 * enemy_strength:
-                        print(f"Отношения с фракцией {faction} упали ниже 12%. "
-                              f"Сила нашей армии: {our_strength}, сила противника: {enemy_strength}. Объявление войны.")
+                        log.debug("Отношения с фракцией %s упали ниже 12%%. "
+                                  "Сила нашей армии: %s, сила противника: %s. Объявление войны.",
+                                  faction, our_strength, enemy_strength)
                         # Обновляем статус дипломатии на "война"
                         self.update_diplomacy_status(faction, "война")
                         # Уведомляем игрока о начале войны
                         self.notify_player_about_war(faction)
-                        # Определяем ближайший город для атаки
-                        target_city = self.find_nearest_city(faction)
+                        # Выбираем город для атаки по прогнозу боя
+                        target_city = self.choose_target_city(faction)
                         if target_city:
-                            print(f"Ближайший вражеский город для атаки: {target_city}")
-                            # Наносим удар по ближайшему городу
+                            log.debug("Вражеский город для атаки: %s", target_city)
+                            # Наносим удар
                             self.attack_city(target_city, faction)
                         else:
-                            print(f"Не удалось найти подходящий город для атаки у фракции {faction}.")
+                            log.debug("Не удалось найти подходящий город для атаки у фракции %s.", faction)
                     else:
-                        print(f"Отношения с фракцией {faction} упали ниже 12%, "
-                              f"но сила противника слишком велика. Война не объявлена.")
+                        log.debug("Отношения с фракцией %s упали ниже 12%%, "
+                                  "но сила противника слишком велика. Война не объявлена.", faction)
         except Exception as e:
             print(f"Ошибка при проверке и объявлении войны: {e}")
 
@@ -1782,6 +1638,7 @@ class AIController:
                 SELECT resource, defense_city, attack_city, faction
                 FROM queries
             """
+            self.uow.flush()
             self.cursor.execute(query)
             rows = self.cursor.fetchall()
             is_ally_turn = False  # Флаг для отслеживания, был ли ход союзника
@@ -1793,7 +1650,7 @@ class AIController:
                 is_ally = self.is_faction_ally(faction)
 
                 if not is_ally:
-                    print(f"Фракция {faction} не является союзником. Пропускаем запрос.")
+                    log.debug("Фракция %s не является союзником. Пропускаем запрос.", faction)
                     continue
 
                 is_ally_turn = True  # Устанавливаем флаг, если хотя бы один запрос выполнен для союзника
@@ -1809,29 +1666,25 @@ class AIController:
                 # Если заполнен столбец attack_city
                 if attack_city:
                     # Получаем владельца целевого города
-                    self.cursor.execute("""
-                        SELECT faction FROM cities WHERE name = ?
-                    """, (attack_city,))
-                    target_faction_row = self.cursor.fetchone()
-
-                    if not target_faction_row:
-                        print(f"Город {attack_city} не найден.")
+                    if attack_city not in self.world.cities:
+                        log.debug("Город %s не найден.", attack_city)
                         continue
 
-                    target_faction = target_faction_row[0]
+                    target_faction = self.world.city_owner(attack_city)
 
                     # Обновляем статус дипломатии на "война"
                     self.update_diplomacy_status(target_faction, "война")
 
                     # Обнуляем отношения в таблице relations
-                    self.cursor.execute("""
+                    self.uow.queue("""
                         UPDATE relations
                         SET relationship = 0
                         WHERE faction1 = ? AND faction2 = ?
                     """, (self.faction, target_faction))
-                    self.db_connection.commit()
+                    self.uow.commit()
+                    self.world.set_relation(self.faction, target_faction, 0)
 
-                    print(f"Фракция {self.faction} объявила войну фракции {target_faction} по запросу союзника.")
+                    log.debug("Фракция %s объявила войну фракции %s по запросу союзника.", self.faction, target_faction)
 
                     # Выполняем атаку на город — теперь вторым параметром передаётся target_faction
                     self.launch_attack_on_city(attack_city, target_faction)  # ← Здесь изменение!
@@ -1839,12 +1692,13 @@ class AIController:
             # Очищаем таблицу queries, только если был ход союзника
             if is_ally_turn:
                 self.clear_queries_table()
-                print("Обработка запросов завершена. Таблица queries очищена.")
+                log.debug("Обработка запросов завершена. Таблица queries очищена.")
             else:
-                print("Обработка запросов завершена. Таблица queries не очищена, так как ходили не союзники.")
+                log.debug("Обработка запросов завершена. Таблица queries не очищена, так как ходили не союзники.")
 
         except sqlite3.Error as e:
             print(f"Ошибка при обработке запросов: {e}")
+            self.uow.rollback()
 
         except sqlite3.Error as e:
             print(f"Ошибка при обработке запросов: {e}")
@@ -1855,9 +1709,9 @@ class AIController:
         """
         try:
             query = "DELETE FROM queries"
-            self.cursor.execute(query)
-            self.db_connection.commit()
-            print("Таблица queries успешно очищена.")
+            self.uow.queue(query)
+            self.uow.commit()
+            log.debug("Таблица queries успешно очищена.")
         except sqlite3.Error as e:
             print(f"Ошибка при очистке таблицы queries: {e}")
 
@@ -1867,25 +1721,8 @@ class AIController:
         :param faction: Название фракции
         :return: True, если союзник ('союз'); False, если нет
         """
-        try:
-            # Загружаем статус дипломатии с указанной фракцией
-            query = """
-                SELECT relationship
-                FROM diplomacies
-                WHERE faction1 = ? AND faction2 = ?
-            """
-            self.cursor.execute(query, (self.faction, faction))
-            result = self.cursor.fetchone()
-
-            # Если запись найдена и статус равен 'союз', возвращаем True
-            if result and result[0] == 'союз':
-                return True
-
-            # Во всех остальных случаях возвращаем False
-            return False
-        except sqlite3.Error as e:
-            print(f"Ошибка при проверке союзника: {e}")
-            return False
+        # Статус дипломатии с указанной фракцией из снимка мира
+        return self.world.diplomacy(self.faction, faction) == 'союз'
 
     def transfer_resource_to_ally(self, faction, resource_type):
         """
@@ -1898,7 +1735,7 @@ class AIController:
             # Получаем текущее количество ресурса у текущей фракции
             current_amount = self.resources.get(resource_type, 0)
             if current_amount <= 0:
-                print(f"Нет доступных ресурсов типа {resource_type} для передачи.")
+                log.debug("Нет доступных ресурсов типа %s для передачи.", resource_type)
                 return
 
             # Вычисляем 15% от текущего количества ресурса
@@ -1908,7 +1745,7 @@ class AIController:
             self.resources[resource_type] -= amount_to_transfer
 
             # Записываем данные о передаче в таблицу trade_agreements
-            self.cursor.execute("""
+            self.uow.queue("""
                 INSERT INTO trade_agreements (
                     initiator, 
                     target_faction, 
@@ -1930,9 +1767,9 @@ class AIController:
             ))
 
             # Сохраняем изменения в базе данных
-            self.db_connection.commit()
+            self.uow.commit()
 
-            print(f"Передано {amount_to_transfer} {resource_type} союзной фракции {faction}.")
+            log.debug("Передано %s %s союзной фракции %s.", amount_to_transfer, resource_type, faction)
         except sqlite3.Error as e:
             print(f"Ошибка при передаче ресурсов: {e}")
 
@@ -1947,7 +1784,7 @@ class AIController:
             defensive_units = self.collect_defensive_units()
 
             if not defensive_units:
-                print("Нет доступных защитных юнитов для передислокации.")
+                log.debug("Нет доступных защитных юнитов для передислокации.")
                 return
 
             # Вычисляем 40% от общего количества защитных юнитов
@@ -1969,7 +1806,7 @@ class AIController:
                 })
                 remaining_units -= units_from_this
 
-            print('*******************************************relocated_units :', relocated_units)
+            log.debug("Юниты для передислокации: %s", relocated_units)
 
             # Передислоцируем юниты в указанный город
             for unit in relocated_units:
@@ -1981,60 +1818,36 @@ class AIController:
                     unit_image=unit["unit_image"]
                 )
 
-            print(f"Передислоцировано {units_to_relocate} защитных юнитов в город {city_name}.")
+            log.debug("Передислоцировано %s защитных юнитов в город %s.", units_to_relocate, city_name)
         except Exception as e:
             print(f"Ошибка при усилении обороны: {e}")
 
     def collect_defensive_units(self):
-        try:
-            query = """
-                        SELECT g.city_id, g.unit_name, g.unit_count, u.attack, g.unit_image
-                        FROM garrisons g
-                        JOIN units u ON g.unit_name = u.unit_name
-                        WHERE u.faction = ? AND u.defense > u.attack
-                    """
-            self.cursor.execute(query, (self.faction,))
-            rows = self.cursor.fetchall()
-            attacking_units = []
-            for row in rows:
-                city_id, unit_name, unit_count, attack, unit_image = row
-                print(f"Собран защитный юнит для атаки: {unit_name}, Количество: {unit_count}, Атака: {attack}")
-                attacking_units.append({
-                    "city_id": city_id,
-                    "unit_name": unit_name,
-                    "unit_count": unit_count,
-                    "unit_image": unit_image,
-                })
-            return attacking_units
-        except sqlite3.Error as e:
-            print(f"Ошибка при сборе защитных юнитов для атаки: {e}")
-            return []
+        rows = self.world.faction_garrisons(self.faction, lambda unit: unit["defense"] > unit["attack"])
+        attacking_units = []
+        for city_id, unit_name, unit_count, unit_image, unit in rows:
+            log.debug("Собран защитный юнит для атаки: %s, Количество: %s, Атака: %s", unit_name, unit_count, unit['attack'])
+            attacking_units.append({
+                "city_id": city_id,
+                "unit_name": unit_name,
+                "unit_count": unit_count,
+                "unit_image": unit_image,
+            })
+        return attacking_units
 
 
     def collect_attacking_units(self):
-        try:
-            query = """
-                SELECT g.city_id, g.unit_name, g.unit_count, u.attack, g.unit_image
-                FROM garrisons g
-                JOIN units u ON g.unit_name = u.unit_name
-                WHERE u.faction = ? AND u.attack > u.defense
-            """
-            self.cursor.execute(query, (self.faction,))
-            rows = self.cursor.fetchall()
-            attacking_units = []
-            for row in rows:
-                city_id, unit_name, unit_count, attack, unit_image = row
-                print(f"Собран атакующий юнит: {unit_name}, Количество: {unit_count}, Атака: {attack}")
-                attacking_units.append({
-                    "city_id": city_id,
-                    "unit_name": unit_name,
-                    "unit_count": unit_count,
-                    "unit_image": unit_image,
-                })
-            return attacking_units
-        except sqlite3.Error as e:
-            print(f"Ошибка при сборе атакующих юнитов: {e}")
-            return []
+        rows = self.world.faction_garrisons(self.faction, lambda unit: unit["attack"] > unit["defense"])
+        attacking_units = []
+        for city_id, unit_name, unit_count, unit_image, unit in rows:
+            log.debug("Собран атакующий юнит: %s, Количество: %s, Атака: %s", unit_name, unit_count, unit['attack'])
+            attacking_units.append({
+                "city_id": city_id,
+                "unit_name": unit_name,
+                "unit_count": unit_count,
+                "unit_image": unit_image,
+            })
+        return attacking_units
 
     def apply_political_system_bonus(self):
         """
@@ -2044,11 +1857,11 @@ class AIController:
         if system == "Капитализм":
             crowns_bonus = int(self.money_up * 1.65)
             self.resources['Кроны'] = int(self.resources.get('Кроны', 0)) + crowns_bonus
-            print(f"Бонус от капитализма: +{crowns_bonus} Крон")
+            log.debug("Бонус от капитализма: +%s Крон", crowns_bonus)
         elif system == "Коммунизм":
             raw_material_bonus = int(self.food_info * 2.25)
             self.resources['Сырье'] = int(self.resources.get('Сырье', 0)) + raw_material_bonus
-            print(f"Бонус от коммунизма: +{raw_material_bonus} Сырья")
+            log.debug("Бонус от коммунизма: +%s Сырья", raw_material_bonus)
 
     def update_relations_based_on_political_system(self):
         """
@@ -2077,14 +1890,7 @@ class AIController:
         """
         Загружает политическую систему указанной фракции.
         """
-        try:
-            query = "SELECT system FROM political_systems WHERE faction = ?"
-            self.cursor.execute(query, (faction,))
-            result = self.cursor.fetchone()
-            return result[0] if result else "Капитализм"  # По умолчанию "Капитализм"
-        except sqlite3.Error as e:
-            print(f"Ошибка при загрузке политической системы для фракции {faction}: {e}")
-            return "Капитализм"
+        return self.world.political_system(faction)  # По умолчанию "Капитализм"
 
     def update_relation_in_db(self, faction, new_relation):
         """
@@ -2096,8 +1902,9 @@ class AIController:
                 SET relationship = ?
                 WHERE faction1 = ? AND faction2 = ?
             """
-            self.cursor.execute(query, (new_relation, self.faction, faction))
-            self.db_connection.commit()
+            self.uow.queue(query, (new_relation, self.faction, faction))
+            self.uow.commit()
+            self.world.set_relation(self.faction, faction, new_relation)
         except sqlite3.Error as e:
             print(f"Ошибка при обновлении отношений для фракции {faction}: {e}")
 
@@ -2143,7 +1950,7 @@ class AIController:
                 self.cursor.execute('''INSERT INTO results (Average_Deal_Ratio, faction) VALUES (?, ?)''',
                                     (new_deal_ratio, self.faction))
 
-            self.db_connection.commit()
+            self.uow.commit()
         except sqlite3.Error as e:
             print(f"Ошибка сохранения результатов: {e}")
 
@@ -2155,30 +1962,48 @@ class AIController:
         """
         Основная логика хода ИИ фракции.
         """
-        print(f'---------ХОДИТ ФРАКЦИЯ: {self.faction}-------------------')
+        log.debug('---------ХОДИТ ФРАКЦИЯ: %s-------------------', self.faction)
         try:
-            # 1. Обновляем ресурсы из базы данных
-            self.update_resources()
-            self.process_queries()
-            # 2. Проверяем и объявляем войну, если необходимо
-            self.check_and_declare_war()
-            # 3. Применяем бонусы от политической системы
-            self.apply_political_system_bonus()
-            # 4. Изменяем отношения на основе политической системы
-            self.update_relations_based_on_political_system()
-            # 5. Загружаем данные о зданиях
-            self.update_buildings_from_db()
-            # 6. Управление строительством (90% крон на строительство)
-            self.manage_buildings()
-            # 7. Продажа сырья (99% сырья, если его больше 10000)
-            resources_sold = self.sell_resources()
-            # 8. Найм армии (на оставшиеся деньги после строительства и продажи сырья)
-            if resources_sold:
-                self.hire_army()
-            # 9. Сохраняем все изменения в базу данных
-            self.save_all_data()
-            # Увеличиваем счетчик ходов
+            # Собственный снимок обновляем сами, общий — обновляет движок хода
+            if self.owns_world:
+                self.world.reload()
+            # Все записи хода фиксируются одной транзакцией; при ошибке ход откатывается целиком
+            phase = self.metrics.phase
+            with self.uow:
+                # 1. Обновляем ресурсы из базы данных
+                with phase("update_resources", self.faction):
+                    self.update_resources()
+                with phase("process_queries", self.faction):
+                    self.process_queries()
+                # 2. Проверяем и объявляем войну, если необходимо
+                with phase("check_and_declare_war", self.faction):
+                    self.check_and_declare_war()
+                # 3. Применяем бонусы от политической системы
+                with phase("apply_political_system_bonus", self.faction):
+                    self.apply_political_system_bonus()
+                # 4. Изменяем отношения на основе политической системы
+                with phase("update_relations", self.faction):
+                    self.update_relations_based_on_political_system()
+                # 5. Загружаем данные о зданиях
+                with phase("update_buildings_from_db", self.faction):
+                    self.update_buildings_from_db()
+                # 6. Управление строительством (90% крон на строительство)
+                with phase("manage_buildings", self.faction):
+                    self.manage_buildings()
+                # 7. Продажа сырья (99% сырья, если его больше 10000)
+                with phase("sell_resources", self.faction):
+                    resources_sold = self.sell_resources()
+                # 8. Найм армии (на оставшиеся деньги после строительства и продажи сырья)
+                if resources_sold:
+                    with phase("hire_army", self.faction):
+                        self.hire_army()
+                # 9. Сохраняем все изменения в базу данных
+                with phase("save_all_data", self.faction):
+                    self.save_all_data()
+            # Ход зафиксирован (при uow.rollback() выход из блока поднимает TurnAborted)
             self.turn += 1
-            print(f'-----------КОНЕЦ {self.turn} ХОДА----------------  ФРАКЦИИ', self.faction)
+            log.debug('-----------КОНЕЦ %s ХОДА----------------  ФРАКЦИИ %s', self.turn, self.faction)
         except Exception as e:
             print(f"Ошибка при выполнении хода: {e}")
+            # Ход откачен — записи, продублированные в снимок, тоже надо отменить
+            self.world.reload()
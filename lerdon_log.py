@@ -0,0 +1,179 @@
+"""
+Журнал игры с уровнями по модулям, ленивым форматированием и кольцевым буфером.
+
+    from lerdon_log import get_logger
+    log = get_logger("ii")
+    log.debug("Гарнизон %s: %s", faction, garrison)   # строка не собирается, пока DEBUG выключен
+
+Большие отладочные структуры (гарнизоны, армии, словари ресурсов) пишутся
+на уровне DEBUG и только через аргументы (%s), а не f-строки: при выключенном
+уровне вызов сводится к проверке isEnabledFor и ничего не форматирует.
+
+Уровни задаются переменной окружения LERDON_LOG: общий уровень консоли и,
+через запятую, уровни отдельных модулей, например
+
+    LERDON_LOG=warning,ii=debug,fight=info
+
+Независимо от консоли последние записи от уровня INFO хранятся в кольцевом
+буфере и попадают в отчёт о падении (install_crash_handler).
+"""
+import logging
+import os
+import sys
+import time
+import traceback
+from collections import deque
+
+ENV_VARIABLE = "LERDON_LOG"
+ROOT = "lerdon"
+DEFAULT_LEVEL = logging.INFO
+RING_LEVEL = logging.INFO
+RING_CAPACITY = 500
+
+_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+_configured = False
+_console = None
+_ring = None
+
+
+class _ConsoleHandler(logging.StreamHandler):
+    """Пишет в текущий sys.stdout, чтобы redirect_stdout (simulate.py) глушил и журнал."""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class _ModuleLevelFilter(logging.Filter):
+    """Пропускает в консоль записи не ниже уровня своего модуля."""
+
+    def __init__(self, default_level, module_levels):
+        super().__init__()
+        self.default_level = default_level
+        self.module_levels = module_levels
+
+    def filter(self, record):
+        module = record.name[len(ROOT) + 1:]
+        return record.levelno >= self.module_levels.get(module, self.default_level)
+
+
+class RingBufferHandler(logging.Handler):
+    """Хранит последние записи журнала в памяти; форматирует их только при выгрузке."""
+
+    def __init__(self, capacity=RING_CAPACITY, level=RING_LEVEL):
+        super().__init__(level)
+        self.records = deque(maxlen=capacity)
+        self.setFormatter(logging.Formatter(_FORMAT))
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def dump(self):
+        """Последние записи в виде текста, от старых к новым."""
+        lines = []
+        for record in list(self.records):
+            try:
+                lines.append(self.format(record))
+            except Exception as e:
+                lines.append(f"{record.name}: {record.msg!r} (не удалось отформатировать: {e})")
+        return "\n".join(lines)
+
+
+def parse_levels(spec):
+    """
+    Разбирает строку вида "warning,ii=debug" в (общий уровень, {модуль: уровень}).
+    Неизвестные уровни пропускаются.
+    """
+    default_level = DEFAULT_LEVEL
+    module_levels = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        module, _, name = part.rpartition("=")
+        level = logging.getLevelName(name.strip().upper())
+        if not isinstance(level, int):
+            print(f"LERDON_LOG: неизвестный уровень '{name}'")
+            continue
+        if module:
+            module_levels[module.strip()] = level
+        else:
+            default_level = level
+    return default_level, module_levels
+
+
+def configure(spec=None):
+    """
+    Настраивает журнал. Вызывается сам при первом get_logger();
+    повторный вызов заменяет уровни.
+    :param spec: Уровни в формате LERDON_LOG (None — взять из переменной окружения).
+    """
+    global _configured, _console, _ring
+    if spec is None:
+        spec = os.environ.get(ENV_VARIABLE, "")
+    default_level, module_levels = parse_levels(spec)
+
+    root = logging.getLogger(ROOT)
+    root.propagate = False
+    if _console is None:
+        _console = _ConsoleHandler()
+        _console.setFormatter(logging.Formatter("[%(levelname)s] %(name)s: %(message)s"))
+        _ring = RingBufferHandler()
+        root.addHandler(_console)
+        root.addHandler(_ring)
+    for existing in list(_console.filters):
+        _console.removeFilter(existing)
+    _console.addFilter(_ModuleLevelFilter(default_level, module_levels))
+
+    # Уровень логгера — самый подробный из нужных консоли и буферу,
+    # чтобы ниже него вызовы отсекались ещё до создания записи
+    root.setLevel(min(default_level, RING_LEVEL))
+    for name in list(logging.Logger.manager.loggerDict):
+        if name.startswith(ROOT + "."):
+            logging.getLogger(name).setLevel(logging.NOTSET)
+    for module, level in module_levels.items():
+        logging.getLogger(f"{ROOT}.{module}").setLevel(min(level, RING_LEVEL))
+    _configured = True
+
+
+def get_logger(module):
+    """Логгер модуля игры (имя без расширения: "ii", "fight", "faction")."""
+    if not _configured:
+        configure()
+    return logging.getLogger(f"{ROOT}.{module}")
+
+
+def recent_records():
+    """Текст последних записей кольцевого буфера."""
+    return _ring.dump() if _ring is not None else ""
+
+
+def write_crash_report(path, exc_info=None):
+    """Записывает в файл трассировку исключения и последние записи журнала."""
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"Отчёт о падении от {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+            if exc_info is not None:
+                f.write("".join(traceback.format_exception(*exc_info)))
+                f.write("\n")
+            f.write("Последние записи журнала:\n")
+            f.write(recent_records())
+            f.write("\n")
+    except OSError as e:
+        print(f"Не удалось записать отчёт о падении в {path}: {e}")
+
+
+def install_crash_handler(path):
+    """Перед стандартной обработкой необработанного исключения сохраняет отчёт о падении."""
+    previous = sys.excepthook
+
+    def excepthook(exc_type, exc, tb):
+        write_crash_report(path, (exc_type, exc, tb))
+        previous(exc_type, exc, tb)
+
+    sys.excepthook = excepthook
@@ -1,8 +1,21 @@
+# Замер холодного старта — до остальных импортов
+import startup_timeline
+startup_timeline.install()
+
 from lerdon_libraries import *
 from game_process import GameScreen
 from ui import *
 from db_lerdon_connect import *
-from db_manager import DBManager
+from db_manager import DBManager, reader
+from repositories import DossierRepository
+from save_slots import QUICK_SLOT, SaveSlots
+import lerdon_log
+from road_graph import ROAD, road_graph
+import map_events
+from texture_cache import image_texture, label_texture
+from asset_preloader import AssetPreloader, required_assets
+
+startup_timeline.mark("модули игры загружены")
 
 class AuthorScreen(Screen):
     def __init__(self, conn, **kwargs):
@@ -11,6 +24,7 @@ class AuthorScreen(Screen):
         root = FloatLayout()
 
         # Фоновое видео
+        from kivy.uix.video import Video
         video = Video(source="files/menu/author.mp4",
                       options={'eos': 'loop'},
                       state='play',
@@ -91,13 +105,18 @@ class AuthorScreen(Screen):
         app.root.add_widget(MenuWidget(self.conn))
 
     def open_link(self, instance, url):
+        import webbrowser
         webbrowser.open(url)
 
 
 class LoadingScreen(FloatLayout):
+    # Доля прогресс-бара на предзагрузку картинок и видео, %
+    ASSETS_SHARE = 95
+
     def __init__(self, conn, **kwargs):
         super(LoadingScreen, self).__init__(**kwargs)
         self.conn = conn
+        self.preloader = None
         # === Фон через Canvas ===
         with self.canvas.before:
             self.bg_rect = Rectangle(
@@ -164,9 +183,6 @@ class LoadingScreen(FloatLayout):
     def start_loading(self, dt):
         self.current_progress = 0
         self.loading_steps = [
-            self.step_check_db,
-            self.step_cleanup_cache,
-            self.step_restore_backup,
             self.step_load_assets,
             self.step_complete
         ]
@@ -181,7 +197,7 @@ class LoadingScreen(FloatLayout):
             self.progress_bar.value = 100
             self.update_pb_canvas()
             self.label.text = "[color=#00ff00]В БОЙ![/color]"
-            Clock.schedule_once(self.switch_to_menu, 0.8)
+            Clock.schedule_once(self.switch_to_menu, 0.3)
 
     def update_progress(self, delta):
         self.current_progress += delta
@@ -191,30 +207,25 @@ class LoadingScreen(FloatLayout):
         self.update_pb_canvas()
 
     # === Шаги загрузки ===
-    def step_check_db(self):
-        print("Шаг 1: Проверка базы данных...")
-        self.update_progress(20)
-        Clock.schedule_once(self.run_next_step, 0.3)
-
-    def step_cleanup_cache(self):
-        print("Шаг 2: Очистка кэша...")
-        self.update_progress(20)
-        Clock.schedule_once(self.run_next_step, 0)
-
-    def step_restore_backup(self):
-        print("Шаг 3: Восстановление из бэкапа...")
-        self.update_progress(20)
-        Clock.schedule_once(self.run_next_step, 0)
-
     def step_load_assets(self):
-        print("Шаг 4: Подготовка ресурсов...")
-        time.sleep(0.5)
-        self.update_progress(20)
-        Clock.schedule_once(self.run_next_step, 0)
+        print("Шаг 1: Загрузка картинок и видео...")
+        # Картинки декодируются в фоне, текстуры создаются по кусочку за кадр
+        self.preloader = AssetPreloader(
+            *required_assets(),
+            on_progress=self.on_assets_progress,
+            on_complete=self.run_next_step
+        )
+        self.preloader.start()
+
+    def on_assets_progress(self, done, total):
+        self.update_progress(self.ASSETS_SHARE * done / total - self.current_progress)
 
     def step_complete(self):
-        print("Шаг 5: Подготовка перехода в меню...")
-        self.update_progress(20)
+        print("Шаг 2: Подготовка перехода в меню...")
+        startup_timeline.mark("картинки и видео загружены")
+        if self.preloader.failed:
+            print(f"Не загружено файлов: {len(self.preloader.failed)}")
+        self.update_progress(100 - self.current_progress)
         Clock.schedule_once(self.run_next_step, 0)
 
     def _update_bg(self, *args):
@@ -230,6 +241,8 @@ class LoadingScreen(FloatLayout):
         # --- Убираем все дочерние виджеты (прогресс-бар, подпись и т.д.) ---
         self.clear_widgets()
         self.add_widget(MenuWidget(self.conn))
+        startup_timeline.mark("главное меню")
+        startup_timeline.finish(os.path.join(storage_dir, "startup_timeline.txt"))
 
 
 RANK_TO_FILENAME = {
@@ -295,75 +308,6 @@ def load_cities_from_db(conn, selected_kingdom):
         return []
 
 
-def restore_from_backup(conn):
-    """
-    Восстанавливает данные из стандартных таблиц в рабочие.
-    :param conn: Активное соединение с базой данных.
-    """
-    cursor = conn.cursor()
-    tables_to_restore = [
-        ("city_default", "city"),
-        ("diplomacies_default", "diplomacies"),
-        ("relations_default", "relations"),
-        ("resources_default", "resources"),
-        ("cities_default", "cities"),
-        ("units_default", "units")
-    ]
-
-    try:
-        cursor.execute("BEGIN IMMEDIATE")  # Блокируем на время восстановления
-
-        for default_table, working_table in tables_to_restore:
-            cursor.execute(f"DELETE FROM {working_table}")
-            cursor.execute(f"INSERT INTO {working_table} SELECT * FROM {default_table}")
-
-        conn.commit()
-        print("Данные успешно восстановлены из бэкапа.")
-    except sqlite3.Error as e:
-        conn.rollback()
-        print(f"Ошибка восстановления данных: {e}")
-
-
-def clear_tables(conn):
-    """
-    Очищает данные из указанных таблиц базы данных.
-    :param conn: Подключение к базе данных SQLite.
-    """
-    tables_to_clear = [
-        "buildings",
-        "city",
-        "diplomacies",
-        "garrisons",
-        "resources",
-        "trade_agreements",
-        "turn",
-        "turn_save",
-        "armies",
-        "political_systems",
-        "karma",
-        "user_faction",
-        "units",
-        "queries",
-        "results",
-        "auto_build_settings",
-        "interface_coord"
-    ]
-
-    cursor = conn.cursor()
-
-    try:
-        for table in tables_to_clear:
-            # Используем TRUNCATE или DELETE для очистки таблицы
-            cursor.execute(f"DELETE FROM {table};")
-            print(f"Таблица '{table}' успешно очищена.")
-
-        # Фиксируем изменения
-        conn.commit()
-    except sqlite3.Error as e:
-        print(f"Ошибка при очистке таблиц: {e}")
-        conn.rollback()  # Откат изменений в случае ошибки
-
-
 class MapWidget(Widget):
     def __init__(self, selected_kingdom=None, player_kingdom=None, conn=None, **kwargs):
         super(MapWidget, self).__init__(**kwargs)
@@ -386,12 +330,17 @@ class MapWidget(Widget):
                 size=(self.base_map_width * self.map_scale, self.base_map_height * self.map_scale)
             )
 
+        # Каждый город — своя группа инструкций, которая меняется только вместе с городом
+        self.city_views = {}  # {fortress_name: {"group", "icon", "owner", "coords", "rect"}}
+        self.dirty_cities = set()
+        self._apply_city_changes = Clock.create_trigger(lambda dt: self.apply_city_changes())
+
         # Отрисовка всех крепостей и дорог
         self.draw_fortresses()
         self.draw_roads()
 
-        # Обновление каждую секунду
-        Clock.schedule_interval(lambda dt: self.update_cities(), 1)
+        # Перерисовка по уведомлениям о смене владельца, а не по таймеру
+        map_events.subscribe(self.on_city_changed)
 
     def calculate_scale(self):
         """Рассчитывает масштаб карты под текущий экран"""
@@ -411,153 +360,114 @@ class MapWidget(Widget):
         """Рисует дороги между ближайшими городами"""
         self.canvas.after.clear()
 
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT fortress_name, coordinates FROM city")
-            fortresses_data = cursor.fetchall()
-        except sqlite3.Error as e:
-            print(f"Ошибка при загрузке данных о городах: {e}")
-            return
-
-        cities = []
-        for fortress_name, coords_str in fortresses_data:
-            try:
-                coords = ast.literal_eval(coords_str)
-                if len(coords) == 2:
-                    cities.append((fortress_name, coords))
-            except (ValueError, SyntaxError) as e:
-                print(f"Ошибка при разборе координат города '{fortress_name}': {e}")
-                continue
+        # Пары городов ближе порога дороги считаются один раз в road_graph.py
+        edges = road_graph(self.conn).edges(ROAD)
 
         with self.canvas.after:
             Color(0.5, 0.5, 0.5, 1)  # Серый цвет для дорог
 
-            for i in range(len(cities)):
-                for j in range(i + 1, len(cities)):
-                    source_name, source_coords = cities[i]
-                    dest_name, dest_coords = cities[j]
-
-                    # Вычисляем расстояние
-                    total_diff = self.calculate_manhattan_distance(source_coords, dest_coords)
+            for source_coords, dest_coords in edges:
+                # Вычисляем координаты с учётом масштаба и позиции
+                drawn_x1 = source_coords[0] * self.map_scale + self.map_pos[0]
+                drawn_y1 = source_coords[1] * self.map_scale + self.map_pos[1]
+                drawn_x2 = dest_coords[0] * self.map_scale + self.map_pos[0]
+                drawn_y2 = dest_coords[1] * self.map_scale + self.map_pos[1]
 
-                    if total_diff < 224:  # Рисуем дорогу, если расстояние ≤ 220
-                        # Вычисляем координаты с учётом масштаба и позиции
-                        drawn_x1 = source_coords[0] * self.map_scale + self.map_pos[0]
-                        drawn_y1 = source_coords[1] * self.map_scale + self.map_pos[1]
-                        drawn_x2 = dest_coords[0] * self.map_scale + self.map_pos[0]
-                        drawn_y2 = dest_coords[1] * self.map_scale + self.map_pos[1]
+                Line(points=[drawn_x1, drawn_y1, drawn_x2, drawn_y2], width=1)
 
-                        Line(points=[drawn_x1, drawn_y1, drawn_x2, drawn_y2], width=1)
+    FACTION_IMAGES = {
+        'Хиперион': 'files/buildings/giperion.png',
+        'Аркадия': 'files/buildings/arkadia.png',
+        'Селестия': 'files/buildings/celestia.png',
+        'Этерия': 'files/buildings/eteria.png',
+        'Халидон': 'files/buildings/halidon.png'
+    }
 
-    def calculate_manhattan_distance(self, source_coords, destination_coords):
-        """Вычисляет манхэттенское расстояние между точками"""
-        return abs(source_coords[0] - destination_coords[0]) + abs(source_coords[1] - destination_coords[1])
+    def fortress_texture(self, kingdom):
+        """Текстура иконки крепости из кэша (texture_cache.py); нет файла — иконка по умолчанию."""
+        return image_texture(self.FACTION_IMAGES.get(kingdom, 'files/buildings/default.png'),
+                             fallback='files/buildings/default.png')
 
     def draw_fortresses(self):
-        """Рисует крепости на карте и обновляет координаты иконок и названий в базе данных"""
+        """Рисует все крепости на карте заново (при создании карты и после пересоздания городов)"""
+        for view in self.city_views.values():
+            self.canvas.remove(view["group"])
+        self.city_views.clear()
+        self.refresh_cities()
+
+    def refresh_cities(self, names=None):
+        """
+        Сверяет города на карте с БД и меняет только то, что изменилось:
+        новый город рисуется, у города со сменившимся владельцем меняется иконка,
+        сдвинувшийся город переносится, исчезнувший — удаляется.
+        Координаты иконок и названий пишутся в cities только для перерисованных городов.
+        :param names: Какие города проверить (None — все).
+        """
         if getattr(self, 'is_drawing', False):
             return  # Защита от повторного вызова
 
         self.is_drawing = True
 
         try:
-            self.fortress_rectangles.clear()
-            self.canvas.clear()
-
-            with self.canvas:
-                self.map_image = Rectangle(
-                    source='files/map/map.png',
-                    pos=self.map_pos,
-                    size=(self.base_map_width * self.map_scale, self.base_map_height * self.map_scale)
-                )
-
-                faction_images = {
-                    'Хиперион': 'files/buildings/giperion.png',
-                    'Аркадия': 'files/buildings/arkadia.png',
-                    'Селестия': 'files/buildings/celestia.png',
-                    'Этерия': 'files/buildings/eteria.png',
-                    'Халидон': 'files/buildings/halidon.png'
-                }
+            query = """
+                SELECT c.fortress_name, c.kingdom, c.x, c.y, ci.icon_x, ci.icon_y, ci.label_x, ci.label_y
+                FROM city c
+                LEFT JOIN cities ci ON ci.name = c.fortress_name
+            """
+            params = ()
+            if names is not None:
+                names = list(names)
+                query += f" WHERE c.fortress_name IN ({', '.join('?' * len(names))})"
+                params = names
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute(query, params)
+                fortresses_data = cursor.fetchall()
+            except sqlite3.Error as e:
+                print(f"[ERROR] Ошибка при загрузке данных о городах: {e}")
+                return
 
-                try:
-                    with self.conn:  # <-- Начало транзакции
-                        cursor = self.conn.cursor()
-                        cursor.execute("SELECT fortress_name, kingdom, coordinates FROM city")
-                        fortresses_data = cursor.fetchall()
-                except sqlite3.Error as e:
-                    print(f"[ERROR] Ошибка при загрузке данных о городах: {e}")
-                    return
-                finally:
-                    cursor.close()
-
-                if not fortresses_data:
-                    print("[DEBUG] Нет данных о крепостях в базе данных.")
-                    return
-
-                update_data = []
-
-                for row in fortresses_data:
-                    # --- Получаем значения, совместимые и с Row, и с tuple ---
-                    if isinstance(row, sqlite3.Row):
-                        fortress_name = row['fortress_name']
-                        kingdom = row['kingdom']
-                        coords_str = row['coordinates']
-                    elif isinstance(row, (list, tuple)):
-                        fortress_name = row[0]
-                        kingdom = row[1]
-                        coords_str = row[2]
-                    else:
-                        print(f"[WARNING] Неизвестный тип данных: {type(row)}")
-                        continue
-
-                    # --- Парсим координаты ---
-                    if not coords_str or not isinstance(coords_str, str):
-                        print(f"[WARNING] Координаты пустые или не являются строкой: {coords_str}")
-                        continue
-
-                    try:
-                        coords = ast.literal_eval(coords_str)
-                        if len(coords) != 2:
-                            raise ValueError(f"Координаты должны быть в формате [x, y], получено: {coords}")
-                    except Exception as e:
-                        print(f"[ERROR] Ошибка разбора координат для '{fortress_name}': {e}")
-                        continue
-
-                    fort_x, fort_y = coords
-                    drawn_x = fort_x * self.map_scale + self.map_pos[0]
-                    drawn_y = fort_y * self.map_scale + self.map_pos[1]
-
-                    # --- Получаем путь к изображению ---
-                    image_path = faction_images.get(kingdom, 'files/buildings/default.png')
-                    if not os.path.exists(image_path):
-                        image_path = 'files/buildings/default.png'
-
-                    # --- Сохраняем данные для кликов ---
-                    fort_rect = (drawn_x, drawn_y, 77, 77)
-                    self.fortress_rectangles.append(
-                        (fort_rect, {"coordinates": (fort_x, fort_y), "name": fortress_name}, kingdom))
-
-                    # --- Рисуем крепость ---
-                    Rectangle(source=image_path, pos=(drawn_x, drawn_y), size=(77, 77))
-
-                    # --- Добавляем название города ---
-                    display_name = fortress_name[:20] + "..." if len(fortress_name) > 20 else fortress_name
-                    label = CoreLabel(text=display_name, font_size=25, color=(0, 0, 0, 1))
-                    label.refresh()
-                    text_texture = label.texture
-                    text_width, text_height = text_texture.size
-                    text_x = drawn_x + (40 - text_width) / 2
-                    text_y = drawn_y - text_height - 5
-
-                    Color(1, 1, 1, 1)
-                    Rectangle(texture=text_texture, pos=(text_x, text_y), size=(text_width, text_height))
-
-                    # --- Подготавливаем данные для БД ---
-                    icon_coords = f"({drawn_x}, {drawn_y})"
-                    label_coords = f"({text_x}, {text_y})"
-                    update_data.append((icon_coords, label_coords, fortress_name))
-
-                # --- Обновляем координаты в базе данных ---
+            seen = set()
+            update_data = []
+
+            for row in fortresses_data:
+                fortress_name, kingdom, fort_x, fort_y, icon_x, icon_y, label_x, label_y = row
+                # --- Координаты уже числовые (city_coords.py) ---
+                if fort_x is None or fort_y is None:
+                    print(f"[WARNING] У города '{fortress_name}' нет корректных координат")
+                    continue
+                seen.add(fortress_name)
+
+                view = self.city_views.get(fortress_name)
+                if view is not None and view["coords"] == (fort_x, fort_y):
+                    if view["owner"] != kingdom:
+                        # Сменился только владелец — меняем иконку в той же группе
+                        view["icon"].texture = self.fortress_texture(kingdom)
+                        view["owner"] = kingdom
+                    continue
+
+                if view is not None:
+                    self.canvas.remove(view["group"])
+                view = self.build_city_view(fortress_name, kingdom, fort_x, fort_y)
+                self.city_views[fortress_name] = view
+
+                # --- Координаты для звёзд мощи (game_process.py) пишем, только если они сдвинулись ---
+                (drawn_x, drawn_y), (text_x, text_y) = view["icon"].pos, view["label_pos"]
+                if (icon_x, icon_y, label_x, label_y) != (drawn_x, drawn_y, text_x, text_y):
+                    update_data.append((f"({drawn_x}, {drawn_y})", f"({text_x}, {text_y})", fortress_name))
+
+            # --- Города, которых больше нет в БД ---
+            checked = self.city_views.keys() if names is None else names
+            for fortress_name in [name for name in checked if name not in seen and name in self.city_views]:
+                self.canvas.remove(self.city_views.pop(fortress_name)["group"])
+
+            self.fortress_rectangles = [
+                (view["rect"], {"coordinates": view["coords"], "name": fortress_name}, view["owner"])
+                for fortress_name, view in self.city_views.items()
+            ]
+
+            # --- Обновляем координаты в базе данных ---
+            if update_data:
                 try:
                     with self.conn:
                         cursor_update = self.conn.cursor()
@@ -572,6 +482,50 @@ class MapWidget(Widget):
         finally:
             self.is_drawing = False
 
+    def build_city_view(self, fortress_name, kingdom, fort_x, fort_y):
+        """Создаёт группу инструкций города: иконку крепости и название."""
+        drawn_x = fort_x * self.map_scale + self.map_pos[0]
+        drawn_y = fort_y * self.map_scale + self.map_pos[1]
+
+        group = InstructionGroup()
+        group.add(Color(1, 1, 1, 1))
+        icon = Rectangle(texture=self.fortress_texture(kingdom), pos=(drawn_x, drawn_y), size=(77, 77))
+        group.add(icon)
+
+        # --- Название города (текстура строится один раз и берётся из кэша) ---
+        display_name = fortress_name[:20] + "..." if len(fortress_name) > 20 else fortress_name
+        text_texture = label_texture(display_name, font_size=25, color=(0, 0, 0, 1))
+        text_width, text_height = text_texture.size
+        text_x = drawn_x + (40 - text_width) / 2
+        text_y = drawn_y - text_height - 5
+        group.add(Rectangle(texture=text_texture, pos=(text_x, text_y), size=(text_width, text_height)))
+
+        self.canvas.add(group)
+        return {
+            "group": group,
+            "icon": icon,
+            "owner": kingdom,
+            "coords": (fort_x, fort_y),
+            "rect": (drawn_x, drawn_y, 77, 77),  # Для кликов
+            "label_pos": (text_x, text_y),
+        }
+
+    def on_city_changed(self, city_name):
+        """Уведомление map_events: перерисовка откладывается до следующего кадра и собирается в одну."""
+        if city_name is None:
+            self.dirty_cities = None
+        elif self.dirty_cities is not None:
+            self.dirty_cities.add(city_name)
+        self._apply_city_changes()
+
+    def apply_city_changes(self):
+        """Перерисовывает города, накопленные on_city_changed."""
+        dirty, self.dirty_cities = self.dirty_cities, set()
+        if dirty is None:
+            self.refresh_cities()
+        elif dirty:
+            self.refresh_cities(dirty)
+
     def check_fortress_click(self, touch):
         """Проверяет нажатие на крепость"""
         for fort_rect, fortress_data, owner in self.fortress_rectangles:
@@ -594,9 +548,8 @@ class MapWidget(Widget):
         self.check_fortress_click(touch)
 
     def update_cities(self):
-        """Обновляет отображение городов"""
-        self.canvas.clear()
-        self.draw_fortresses()
+        """Сверяет все города с БД и перерисовывает изменившиеся"""
+        self.refresh_cities()
 
 
 class RoundedButton(Button):
@@ -714,6 +667,7 @@ class KingdomSelectionWidget(FloatLayout):
         self.selected_button = None
 
         # ======== ФОН ВИДЕО ========
+        from kivy.uix.video import Video
         self.bg_video = Video(
             source='files/menu/choice.mp4',
             state='play',
@@ -1051,6 +1005,7 @@ class KingdomSelectionWidget(FloatLayout):
         self.overlay = overlay
         self.add_widget(overlay)
 
+        from kivy.uix.video import Video
         self.start_video = Video(
             source='files/menu/start_game.mp4',
             state='play',
@@ -1089,8 +1044,7 @@ class KingdomSelectionWidget(FloatLayout):
 
         try:
             app = App.get_running_app()
-            clear_tables(self.conn)
-            restore_from_backup(self.conn)
+            SaveSlots(self.conn).new_game()
             selected_kingdom = app.selected_kingdom
             cities = load_cities_from_db(self.conn, selected_kingdom)
             if not cities:
@@ -1307,29 +1261,91 @@ class MenuWidget(FloatLayout):
     def start_game(self, instance):
         if getattr(self, 'buttons_locked', False):
             return
+        saved = SaveSlots(self.conn).get(QUICK_SLOT)
+        if saved:
+            self.show_continue_popup(saved)
+            return
+        self.open_kingdom_selection()
+
+    def open_kingdom_selection(self):
         app = App.get_running_app()
         app.root.clear_widgets()
         app.root.add_widget(KingdomSelectionWidget(self.conn))
 
+    def show_continue_popup(self, saved):
+        """Выбор между сохранённой партией и новой."""
+        content = BoxLayout(orientation='vertical', spacing=dp(10), padding=dp(15))
+        content.add_widget(Label(
+            text=f"{saved.get('faction', '')}, ход {saved.get('turn', '')}",
+            font_size='18sp',
+            color=(1, 1, 1, 1)
+        ))
+        buttons = BoxLayout(orientation='horizontal', size_hint=(1, None), height=dp(48), spacing=dp(10))
+        btn_continue = Button(text="Продолжить", background_normal='',
+                              background_color=(0.22, 0.63, 0.41, 1), font_size='16sp')
+        btn_new = Button(text="Новая игра", background_normal='',
+                         background_color=(0.2, 0.4, 0.7, 1), font_size='16sp')
+        buttons.add_widget(btn_continue)
+        buttons.add_widget(btn_new)
+        content.add_widget(buttons)
+        popup = Popup(title="Сохранённая партия", content=content, size_hint=(0.8, 0.4))
+        btn_continue.bind(on_release=lambda x: (popup.dismiss(), self.continue_game(QUICK_SLOT)))
+        btn_new.bind(on_release=lambda x: (popup.dismiss(), self.open_kingdom_selection()))
+        popup.open()
+
+    def continue_game(self, slot):
+        """Загружает партию из слота и открывает карту."""
+        saved = SaveSlots(self.conn).load(slot)
+        if not saved:
+            return
+        try:
+            app = App.get_running_app()
+            selected_kingdom = saved['faction']
+            app.selected_kingdom = selected_kingdom
+            cities = load_cities_from_db(self.conn, selected_kingdom)
+            if not cities:
+                print("Города не найдены.")
+                return
+
+            game_screen = GameScreen(selected_kingdom, cities, conn=self.conn, season_idx=saved.get('season'))
+            app.root.clear_widgets()
+            map_widget = MapWidget(selected_kingdom=selected_kingdom, player_kingdom=selected_kingdom, conn=self.conn)
+            app.root.add_widget(map_widget)
+            app.root.add_widget(game_screen)
+        except Exception as e:
+            print(f"Ошибка при загрузке партии: {e}")
+
     def exit_game(self, instance):
         app = App.get_running_app()
         app.on_stop()  # Явно вызываем on_stop(), чтобы закрыть соединения
         app.stop()     # Завершаем приложение
 
 
-class CustomTab(TabbedPanelItem):
-    def __init__(self, **kwargs):
-        super(CustomTab, self).__init__(**kwargs)
-        self.active_color = get_color_from_hex('#FF5733')  # например, оранжевый
-        self.inactive_color = get_color_from_hex('#DDDDDD')  # светло-серый
-        self.background_color = self.inactive_color
-        self.bind(state=self.update_background)
-
-    def update_background(self, *args):
-        if self.state == 'down':
-            self.background_color = self.active_color
-        else:
-            self.background_color = self.inactive_color
+_custom_tab_class = None
+
+
+def custom_tab(**kwargs):
+    """Вкладка личного дела с подсветкой активной; TabbedPanel загружается при первом вызове."""
+    global _custom_tab_class
+    if _custom_tab_class is None:
+        from kivy.uix.tabbedpanel import TabbedPanelItem
+
+        class CustomTab(TabbedPanelItem):
+            def __init__(self, **kwargs):
+                super(CustomTab, self).__init__(**kwargs)
+                self.active_color = get_color_from_hex('#FF5733')  # например, оранжевый
+                self.inactive_color = get_color_from_hex('#DDDDDD')  # светло-серый
+                self.background_color = self.inactive_color
+                self.bind(state=self.update_background)
+
+            def update_background(self, *args):
+                if self.state == 'down':
+                    self.background_color = self.active_color
+                else:
+                    self.background_color = self.inactive_color
+
+        _custom_tab_class = CustomTab
+    return _custom_tab_class(**kwargs)
 
 
 class DossierScreen(Screen):
@@ -1356,6 +1372,7 @@ class DossierScreen(Screen):
         root_layout.add_widget(title_widget)
 
         # === TabbedPanel ===
+        from kivy.uix.tabbedpanel import TabbedPanel
         # Убираем size_hint_y=None и фиксированную высоту. Вместо этого делаем size_hint=(1, 1)
         self.tabs = TabbedPanel(do_default_tab=False, size_hint=(1, 1))
         # Сразу загружаем данные — внутри load_dossier_data() каждая вкладка будет содержать ScrollView
@@ -1450,16 +1467,10 @@ class DossierScreen(Screen):
         if self.tabs.get_tab_list():
             for tab in list(self.tabs.get_tab_list()):
                 self.tabs.remove_widget(tab)
-        try:
-            conn = self.conn
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM dossier")
-            rows = cursor.fetchall()
-        except sqlite3.Error as e:
-            print(f"Ошибка базы данных: {e}")
-            rows = []
+        with reader(self.conn) as conn:
+            factions = DossierRepository(conn).entries()
 
-        if not rows:
+        if not factions:
             # Если записей нет
             info_label = Label(
                 text="Ваше личное дело не найдено в архиве",
@@ -1467,30 +1478,15 @@ class DossierScreen(Screen):
                 color=get_color_from_hex('#FFFFFF'),
                 halign='center'
             )
+            from kivy.uix.tabbedpanel import TabbedPanelItem
             tab = TabbedPanelItem(text="Информация")
             tab.add_widget(info_label)
             self.tabs.add_widget(tab)
             return
 
-        # Группируем по фракциям (предполагаем, что row[1] — это фракция)
-        factions = {}
-        for row in rows:
-            faction = row[1]
-            data = {
-                'military_rank': row[2],
-                'avg_military_rating': row[3],
-                'avg_soldiers_starving': row[4],
-                'victories': row[5],
-                'defeats': row[6],
-                'matches_won': row[7],
-                'matches_lost': row[8],
-                'last_data': row[9]
-            }
-            factions.setdefault(faction, []).append(data)
-
         # Для каждой фракции создаём новую вкладку
         for faction, data_list in factions.items():
-            tab = CustomTab(text=faction)
+            tab = custom_tab(text=faction)
             scroll = ScrollView()
             grid = GridLayout(
                 cols=2,
@@ -1682,14 +1678,8 @@ class DossierScreen(Screen):
         Полная очистка всех записей в таблице dossier.
         После успеха — полностью удаляем и пересоздаем вкладку.
         """
-        try:
-            conn = self.conn
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM dossier")
-            conn.commit()
+        if DossierRepository(self.conn).clear():
             print("✅ Все записи успешно удалены.")
-        except sqlite3.Error as e:
-            print(f"❌ Ошибка удаления: {e}")
 
 
         self._recreate_dossier_tab()
@@ -1729,6 +1719,7 @@ class HowToPlayScreen(FloatLayout):
         self.add_widget(Image(source='files/menu/how_to_play_bg.jpg', allow_stretch=True, keep_ratio=False))
 
         # Панель вкладок
+        from kivy.uix.tabbedpanel import TabbedPanel, TabbedPanelHeader
         self.tab_panel = TabbedPanel(
             do_default_tab=False,
             size_hint=(0.8, 0.6),
@@ -1983,31 +1974,23 @@ class Lerdon(App):
         self.is_mobile = (platform == 'android')
         # Можно завести другие глобальные настройки здесь
         self.selected_kingdom = None  # Атрибут для хранения выбранного королевства
+        # Необработанное исключение сохраняет трассировку и последние записи журнала
+        lerdon_log.install_crash_handler(os.path.join(storage_dir, "crash_report.txt"))
 
-        # Инициализация соединения с базой данных
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
-        self.conn.execute("PRAGMA journal_mode=WAL;")
-        self.conn.execute("PRAGMA synchronous=NORMAL;")
-        self.conn.execute("PRAGMA busy_timeout=5000;")
+        # Соединения с базой данных: писатель для хода и записей, читатели для окон (db_manager.py)
+        self.db = DBManager(db_path)
+        self.conn = self.db.writer
+        startup_timeline.mark("база данных открыта")
 
     def build(self):
         """Создает начальный интерфейс приложения."""
+        startup_timeline.watch_first_frame()
         return LoadingScreen(self.conn)  # Возвращаем виджет загрузочного экрана
 
     def restart_app(self):
-        """Перезапуск игры — очистка БД, восстановление бэкапа, пересоздание интерфейса."""
-        try:
-            # Очистка таблиц
-            clear_tables(self.conn)
-            self.conn.commit()
-            print("Таблицы успешно очищены.")
-        except sqlite3.Error as e:
-            print(f"Ошибка при очистке таблиц: {e}")
-            self.conn.rollback()
-
-        # Восстановление из бэкапа
-        restore_from_backup(self.conn)
+        """Перезапуск игры — возврат БД к началу партии, пересоздание интерфейса."""
+        # Снимок начала партии копируется в рабочую базу постранично
+        SaveSlots(self.conn).new_game()
 
         # Сброс состояния приложения
         self.selected_kingdom = None
@@ -2027,14 +2010,9 @@ class Lerdon(App):
     def on_stop(self):
         print("Завершение работы приложения...")
 
-        # 1) Делаем checkpoint и сразу закрываем — без переключения journal_mode
-        try:
-            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
-        except sqlite3.Error as e:
-            print(f"[WARNING] Не удалось сделать WAL checkpoint: {e}")
-
+        # 1) Закрываем читателей, делаем checkpoint и закрываем писателя — без переключения journal_mode
         try:
-            self.conn.close()
+            self.db.close()
             print("Соединение с БД закрыто корректно.")
         except sqlite3.Error as e:
             print(f"Ошибка при закрытии соединения с БД: {e}")
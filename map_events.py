@@ -0,0 +1,39 @@
+"""
+Уведомления об изменении городов для карты.
+
+Карта (MapWidget) раньше раз в секунду перерисовывала все города целиком.
+Теперь она подписывается здесь и перерисовывает только города, о которых
+ей сообщили код захвата (fight.py, ii.py, ui.py) и восстановление бэкапа:
+
+    map_events.city_changed("Толоев")   # сменился владелец города
+    map_events.city_changed()           # таблица городов пересоздана целиком
+
+Подписчики хранятся слабыми ссылками, поэтому закрытая карта не держится
+в памяти и отписываться не обязательно.
+"""
+import weakref
+
+_listeners = []
+
+
+def subscribe(callback):
+    """Подписывает callback(city_name) на изменения; city_name=None означает «все города»."""
+    if hasattr(callback, "__self__"):
+        ref = weakref.WeakMethod(callback)
+    else:
+        ref = weakref.ref(callback)
+    _listeners.append(ref)
+
+
+def unsubscribe(callback):
+    _listeners[:] = [ref for ref in _listeners if ref() not in (None, callback)]
+
+
+def city_changed(city_name=None):
+    """Сообщает подписчикам, что у города сменился владелец или положение."""
+    for ref in list(_listeners):
+        callback = ref()
+        if callback is None:
+            _listeners.remove(ref)
+        else:
+            callback(city_name)
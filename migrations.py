@@ -0,0 +1,368 @@
+"""
+Версионные миграции схемы game_data.db.
+
+База копируется из assets только при первом запуске, поэтому у игроков
+остаются старые копии, а изменения схемы раньше делались функциями
+ensure_*, которые вызывались при каждом открытии соединения. Теперь
+каждое изменение — шаг с номером в MIGRATIONS, а номер последнего
+применённого шага хранится в таблице schema_version:
+
+    migrate(conn)    # применяет недостающие шаги по порядку
+
+Каждый шаг выполняется в своей транзакции вместе с записью в
+schema_version: при ошибке шаг откатывается, а следующие не запускаются.
+Шаги идемпотентны (IF NOT EXISTS, проверка столбцов), поэтому базы, в
+которых изменения уже сделаны прежними ensure_*, обновляются безопасно.
+Уже выпущенные шаги не меняются — новое изменение схемы добавляется
+новым шагом в конец списка. Поэтому код и SQL каждого шага хранятся
+здесь, в виде на момент выпуска, а не импортируются из модулей игры:
+правка army_strength.py или seasons.py не должна менять то, что делает
+шаг 3 на базе игрока, которая ещё не обновлялась.
+
+Миграции запускаются при старте из db_lerdon_connect, а также в
+simulate.py и benchmark.py для их копий базы. Проверка, что горячие
+запросы хода используют индексы, а не полный перебор таблиц:
+
+    python migrations.py --check   # код выхода 1, если есть SCAN
+"""
+import argparse
+import os
+import sqlite3
+import sys
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "game_data.db")
+
+# Горячие запросы хода (ИИ, экономика, бой, карта) для проверки планов
+HOT_QUERIES = [
+    ("гарнизоны фракции", """
+        SELECT g.city_id, g.unit_name, g.unit_count, u.consumption
+        FROM units u JOIN garrisons g ON g.unit_name = u.unit_name
+        WHERE u.faction = ?
+    """),
+    ("гарнизоны с юнитом", "SELECT city_id FROM garrisons WHERE unit_name = ?"),
+    ("характеристики юнита", "SELECT attack, defense, durability, unit_class FROM units WHERE unit_name = ?"),
+    ("владелец города", "SELECT faction FROM cities WHERE name = ?"),
+    ("города фракции", "SELECT name FROM cities WHERE faction = ?"),
+    ("крепость", "SELECT kingdom FROM city WHERE fortress_name = ?"),
+    ("здания города", "SELECT building_type, count FROM buildings WHERE city_name = ?"),
+    ("здания фракции", "SELECT city_name, building_type, count FROM buildings WHERE faction = ?"),
+    ("дипломатия", "SELECT relationship FROM diplomacies WHERE faction1 = ? AND faction2 = ?"),
+    ("отношения", "SELECT relationship FROM relations WHERE faction1 = ? AND faction2 = ?"),
+]
+
+
+# ----------------------------------------------------------------------
+# Шаг 1: числовые столбцы координат городов (city_coords.py)
+# ----------------------------------------------------------------------
+# (столбец, тип, текстовый источник, номер координаты)
+_V1_CITY_COLUMNS = [
+    ("x", "INTEGER", "coordinates", 0),
+    ("y", "INTEGER", "coordinates", 1),
+]
+_V1_CITIES_COLUMNS = _V1_CITY_COLUMNS + [
+    ("icon_x", "REAL", "icon_coordinates", 0),
+    ("icon_y", "REAL", "icon_coordinates", 1),
+    ("label_x", "REAL", "label_coordinates", 0),
+    ("label_y", "REAL", "label_coordinates", 1),
+]
+_V1_COORDINATE_COLUMNS = {
+    "city": _V1_CITY_COLUMNS,
+    "city_default": _V1_CITY_COLUMNS,
+    "cities": _V1_CITIES_COLUMNS,
+    "cities_default": _V1_CITIES_COLUMNS,
+}
+# Таблицы, которые меняются в игре и держат числовые столбцы в синхроне триггерами
+_V1_SYNCED_TABLES = ("city", "cities")
+
+
+def _v1_parse_expression(source, axis, column_type):
+    """SQL-выражение, извлекающее координату из текста "[x, y]" или "(x, y)"; NULL, если запятой нет."""
+    if axis == 0:
+        part = f"trim(substr({source}, 1, instr({source}, ',') - 1), '[( ')"
+    else:
+        part = f"trim(substr({source}, instr({source}, ',') + 1), ' ])')"
+    return f"CASE WHEN instr({source}, ',') > 0 THEN CAST({part} AS {column_type}) END"
+
+
+def _v1_assignments(columns, sources=None, prefix=""):
+    return ", ".join(
+        f"{name} = {_v1_parse_expression(prefix + source, axis, column_type)}"
+        for name, column_type, source, axis in columns
+        if sources is None or source in sources
+    )
+
+
+def _v1_coordinate_columns(conn):
+    for table, columns in _V1_COORDINATE_COLUMNS.items():
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if not existing:
+            continue  # Таблицы нет в этой базе
+        missing = [column for column in columns if column[0] not in existing]
+        for name, column_type, source, axis in missing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+        if missing:
+            conn.execute(f"UPDATE {table} SET {_v1_assignments(columns)}")
+
+    for table in _V1_SYNCED_TABLES:
+        columns = _V1_COORDINATE_COLUMNS[table]
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_coordinates_insert AFTER INSERT ON {table}
+            BEGIN
+                UPDATE {table} SET {_v1_assignments(columns, prefix="NEW.")} WHERE rowid = NEW.rowid;
+            END
+        """)
+        for source in sorted({column[2] for column in columns}):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_{source}_update AFTER UPDATE OF {source} ON {table}
+                BEGIN
+                    UPDATE {table} SET {_v1_assignments(columns, {source}, prefix="NEW.")}
+                    WHERE rowid = NEW.rowid;
+                END
+            """)
+
+
+# ----------------------------------------------------------------------
+# Шаг 2: индексы горячих запросов хода
+# ----------------------------------------------------------------------
+# Индексы для поиска по имени юнита, владельцу города, зданиям и дипломатии
+_V2_HOT_INDEXES = [
+    ("idx_garrisons_unit_name", "garrisons", "unit_name"),
+    ("idx_units_unit_name", "units", "unit_name"),
+    ("idx_cities_faction", "cities", "faction"),
+    ("idx_cities_name", "cities", "name"),
+    ("idx_city_fortress_name", "city", "fortress_name"),
+    ("idx_buildings_city_name", "buildings", "city_name"),
+    ("idx_buildings_faction", "buildings", "faction"),
+    ("idx_diplomacies_factions", "diplomacies", "faction1, faction2"),
+    ("idx_relations_factions", "relations", "faction1, faction2"),
+]
+
+
+def _v2_hot_indexes(conn):
+    for name, table, columns in _V2_HOT_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+# ----------------------------------------------------------------------
+# Шаги 3 и 4: таблица силы армий и её триггеры (army_strength.py)
+# ----------------------------------------------------------------------
+# Коэффициенты классов юнитов 1–5; для неизвестного класса — 1.0
+_ARMY_COEFFICIENT_SQL = ("CASE u.unit_class WHEN '1' THEN 1.3 WHEN '2' THEN 1.7 WHEN '3' THEN 2.0"
+                         " WHEN '4' THEN 3.0 WHEN '5' THEN 4.0 ELSE 1.0 END")
+_ARMY_BUMP_VERSION = "UPDATE army_strength_version SET version = version + 1"
+
+# (имя триггера, событие, города для пересчёта)
+_V3_ARMY_TRIGGERS = [
+    ("army_strength_garrison_insert", "AFTER INSERT ON garrisons", "NEW.city_id"),
+    ("army_strength_garrison_delete", "AFTER DELETE ON garrisons", "OLD.city_id"),
+    ("army_strength_garrison_update", "AFTER UPDATE OF city_id, unit_name, unit_count ON garrisons",
+     "OLD.city_id, NEW.city_id"),
+    ("army_strength_unit_insert", "AFTER INSERT ON units",
+     "SELECT city_id FROM garrisons WHERE unit_name = NEW.unit_name"),
+    ("army_strength_unit_delete", "AFTER DELETE ON units",
+     "SELECT city_id FROM garrisons WHERE unit_name = OLD.unit_name"),
+    ("army_strength_unit_update",
+     "AFTER UPDATE OF faction, unit_name, attack, defense, durability, unit_class, consumption ON units",
+     "SELECT city_id FROM garrisons WHERE unit_name IN (OLD.unit_name, NEW.unit_name)"),
+]
+_V3_STRENGTH_SQL = f"((u.attack * {_ARMY_COEFFICIENT_SQL}) + u.defense + u.durability) * g.unit_count"
+
+# Шаг 4: атака и защита с коэффициентом сезона из season_effects
+_V4_SEASON_SQL = "CAST(ROUND(u.{} * COALESCE(e.stat, 1.0)) AS INTEGER)"
+_V4_STRENGTH_SQL = (f"(({_V4_SEASON_SQL.format('attack')} * {_ARMY_COEFFICIENT_SQL})"
+                    f" + {_V4_SEASON_SQL.format('defense')} + u.durability) * g.unit_count")
+_V4_SEASON_JOIN = "\n        LEFT JOIN season_effects e ON e.faction = u.faction"
+# Действующие коэффициенты текущего сезона по фракциям (пишет seasons.SeasonManager.update)
+_V4_SEASON_TABLE = """
+    CREATE TABLE IF NOT EXISTS season_effects (
+        faction TEXT PRIMARY KEY,
+        season INTEGER NOT NULL,
+        stat REAL NOT NULL,
+        cost REAL NOT NULL
+    )
+"""
+# Города, где стоят юниты фракции из строки season_effects
+_V4_FACTION_CITIES = ("SELECT g.city_id FROM garrisons g JOIN units u ON g.unit_name = u.unit_name"
+                      " WHERE u.faction = {}.faction")
+_V4_ARMY_TRIGGERS = _V3_ARMY_TRIGGERS + [
+    ("army_strength_season_insert", "AFTER INSERT ON season_effects", _V4_FACTION_CITIES.format("NEW")),
+    ("army_strength_season_delete", "AFTER DELETE ON season_effects", _V4_FACTION_CITIES.format("OLD")),
+    ("army_strength_season_update", "AFTER UPDATE ON season_effects",
+     _V4_FACTION_CITIES.format("OLD") + " UNION " + _V4_FACTION_CITIES.format("NEW")),
+]
+
+
+def _army_rebuild_statements(strength_sql, join="", cities=None):
+    """DELETE и INSERT, пересчитывающие строки городов из выражения cities (или все строки)."""
+    where = f"WHERE city_id IN ({cities})" if cities else ""
+    and_where = f"AND g.city_id IN ({cities})" if cities else ""
+    return [
+        f"DELETE FROM army_strength {where}",
+        f"""INSERT INTO army_strength (faction, city_id, strength, consumption)
+        SELECT u.faction, g.city_id, SUM({strength_sql}), SUM(u.consumption * g.unit_count)
+        FROM garrisons g
+        JOIN units u ON g.unit_name = u.unit_name{join}
+        WHERE u.faction IS NOT NULL AND u.faction != '' {and_where}
+        GROUP BY u.faction, g.city_id""",
+    ]
+
+
+def _army_triggers(conn, triggers, strength_sql, join=""):
+    """Пересоздаёт триггеры army_strength и пересчитывает таблицу целиком."""
+    for name, event, cities in triggers:
+        body = "; ".join(_army_rebuild_statements(strength_sql, join, cities) + [_ARMY_BUMP_VERSION])
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(f"""
+            CREATE TRIGGER {name} {event}
+            BEGIN
+                {body};
+            END
+        """)
+    # Полный пересчёт на случай, если гарнизоны менялись без триггеров (старая база)
+    for statement in _army_rebuild_statements(strength_sql, join) + [_ARMY_BUMP_VERSION]:
+        conn.execute(statement)
+
+
+def _v3_army_strength(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS army_strength (
+            faction TEXT NOT NULL,
+            city_id TEXT NOT NULL,
+            strength REAL NOT NULL,
+            consumption REAL,
+            PRIMARY KEY (faction, city_id)
+        )
+    """)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(army_strength)")}
+    if "consumption" not in columns:
+        conn.execute("ALTER TABLE army_strength ADD COLUMN consumption REAL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_army_strength_city ON army_strength (city_id)")
+    conn.execute("CREATE TABLE IF NOT EXISTS army_strength_version (version INTEGER NOT NULL)")
+    conn.execute("""
+        INSERT INTO army_strength_version (version)
+        SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM army_strength_version)
+    """)
+    _army_triggers(conn, _V3_ARMY_TRIGGERS, _V3_STRENGTH_SQL)
+
+
+def _v4_season_effects_layer(conn):
+    # Сезоны раньше переписывали units и откатывали с округлением — возвращаем базу из units_default
+    conn.execute("""
+        UPDATE units SET
+            attack = (SELECT d.attack FROM units_default d WHERE d.unit_name = units.unit_name),
+            defense = (SELECT d.defense FROM units_default d WHERE d.unit_name = units.unit_name),
+            cost_money = (SELECT d.cost_money FROM units_default d WHERE d.unit_name = units.unit_name),
+            cost_time = (SELECT d.cost_time FROM units_default d WHERE d.unit_name = units.unit_name)
+        WHERE unit_name IN (SELECT unit_name FROM units_default)
+    """)
+    conn.execute(_V4_SEASON_TABLE)
+    # Таблицу army_strength и счётчик версий создал шаг 3; триггеры — с коэффициентами сезона
+    _army_triggers(conn, _V4_ARMY_TRIGGERS, _V4_STRENGTH_SQL, _V4_SEASON_JOIN)
+
+
+# (версия, описание, шаг(conn)) — по возрастанию версии, выпущенные шаги не меняются
+MIGRATIONS = [
+    (1, "Числовые столбцы координат городов", _v1_coordinate_columns),
+    (2, "Индексы для горячих запросов хода", _v2_hot_indexes),
+    (3, "Таблица силы и потребления армий", _v3_army_strength),
+    (4, "Сезонные коэффициенты при чтении вместо перезаписи units", _v4_season_effects_layer),
+]
+
+
+def schema_version(conn):
+    """Номер последнего применённого шага (0 для базы без миграций)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn):
+    """
+    Применяет недостающие шаги MIGRATIONS.
+    :return: Номер версии схемы после миграции.
+    """
+    try:
+        current = schema_version(conn)
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Ошибка при чтении версии схемы: {e}")
+        return 0
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            # Явный BEGIN, чтобы ALTER/CREATE шага откатывались вместе с данными
+            conn.execute("BEGIN")
+            step(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description),
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"Ошибка миграции {version} ({description}): {e}")
+            break
+        current = version
+    return current
+
+
+def migrate_file(db_path):
+    """Открывает базу, применяет миграции и закрывает соединение."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
+
+
+def full_scans(conn):
+    """
+    Горячие запросы, план которых перебирает таблицу целиком.
+    :return: [(название запроса, строка плана)]; пустой список — все запросы идут по индексам.
+    """
+    problems = []
+    for name, query in HOT_QUERIES:
+        params = (None,) * query.count("?")
+        for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall():
+            detail = row[-1]
+            if detail.startswith("SCAN "):
+                problems.append((name, detail))
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Миграции схемы game_data.db")
+    parser.add_argument("--db", default=DEFAULT_DB, help="База данных")
+    parser.add_argument("--check", action="store_true",
+                        help="Проверить планы горячих запросов на копии базы в памяти, не меняя файл")
+    args = parser.parse_args(argv)
+
+    if not args.check:
+        print(f"Версия схемы {args.db}: {migrate_file(args.db)}")
+        return 0
+
+    source = sqlite3.connect(args.db)
+    conn = sqlite3.connect(":memory:")
+    try:
+        source.backup(conn)
+    finally:
+        source.close()
+    print(f"Версия схемы после миграции: {migrate(conn)}")
+    problems = full_scans(conn)
+    for name, detail in problems:
+        print(f"Полный перебор: {name}: {detail}")
+    if not problems:
+        print(f"Все {len(HOT_QUERIES)} горячих запросов используют индексы")
+    conn.close()
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
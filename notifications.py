@@ -0,0 +1,41 @@
+"""
+Точка вывода сообщений игровой логики.
+
+Модули логики (экономика, бой, ИИ) не должны зависеть от Kivy, поэтому
+всплывающие окна они показывают не напрямую, а через этот модуль.
+Интерфейс (game_process) регистрирует реальные обработчики при импорте,
+а в безголовом режиме (simulate.py) сообщения просто печатаются.
+"""
+
+_handlers = {}
+
+
+def register_handler(kind, handler):
+    """
+    Регистрирует обработчик для вида сообщения.
+    :param kind: 'message' или 'battle_report'.
+    :param handler: Функция, вызываемая вместо вывода по умолчанию (None — снять обработчик).
+    """
+    if handler is None:
+        _handlers.pop(kind, None)
+    else:
+        _handlers[kind] = handler
+
+
+def show_message(title, message):
+    """Показывает информационное сообщение игроку."""
+    handler = _handlers.get("message")
+    if handler is not None:
+        handler(title, message)
+    else:
+        print(f"[{title}] {message}")
+
+
+def show_battle_report(report_data, is_user_involved=False, user_faction=None, conn=None):
+    """Показывает отчёт о бое с участием игрока."""
+    handler = _handlers.get("battle_report")
+    if handler is not None:
+        handler(report_data, is_user_involved=is_user_involved, user_faction=user_faction, conn=conn)
+    elif report_data:
+        result = next((item["result"] for item in report_data if item.get("result")), "")
+        print(f"[Итоги боя] Город: {report_data[0]['city']} {result}")
@@ -2,9 +2,8 @@ from lerdon_libraries import *
 from db_lerdon_connect import *
 
 
+from army_strength import faction_strength, faction_strengths
 from economic import format_number
-# Глобальная блокировка для работы с БД
-db_lock = threading.Lock()
 from manage_friend import ManageFriend
 
 translation_dict = {
@@ -391,6 +390,7 @@ def show_trade_agreement_form(faction, game_area, conn):
     inner_layout.add_widget(title)
 
     # Spinner: "С какой фракцией?"
+    from kivy.uix.spinner import Spinner
     factions_spinner = Spinner(
         text="С какой фракцией?",
         values=available_factions,
@@ -713,6 +713,7 @@ def show_cultural_exchange_form(faction, game_area, class_faction, conn):
     content.add_widget(title)
 
     # Спиннер для выбора фракции
+    from kivy.uix.spinner import Spinner
     factions_spinner = Spinner(
         text="С какой фракцией?",
         values=available_factions,
@@ -875,38 +876,9 @@ def show_cultural_exchange_form(faction, game_area, class_faction, conn):
 
 def calculate_peace_army_points(conn, faction):
     """
-    Вычисляет общую силу армии фракции с учетом коэффициентов классов юнитов.
+    Вычисляет общую силу армии фракции с учетом коэффициентов классов юнитов и сезона.
     """
-    class_coefficients = {
-        "1": 1.3,
-        "2": 1.7,
-        "3": 2.0,
-        "4": 3.0,
-        "5": 4.0
-    }
-
-    total_points = 0
-    cursor = conn.cursor()
-
-    try:
-        cursor.execute("""
-            SELECT g.unit_name, g.unit_count, u.attack, u.defense, u.durability, u.unit_class 
-            FROM garrisons g
-            JOIN units u ON g.unit_name = u.unit_name
-            WHERE u.faction = ?
-        """, (faction,))
-        units_data = cursor.fetchall()
-
-        for unit_name, unit_count, attack, defense, durability, unit_class in units_data:
-            coefficient = class_coefficients.get(str(unit_class), 1.0)
-            unit_score = (attack * coefficient) + defense + durability
-            total_points += unit_score * unit_count
-
-        return total_points
-
-    except Exception as e:
-        print(f"Ошибка при вычислении очков армии: {e}")
-        return 0
+    return faction_strength(conn, faction)
 
 
 def show_peace_form(player_faction, conn):
@@ -988,6 +960,7 @@ def show_peace_form(player_faction, conn):
         content.add_widget(title)
 
         # Спиннер для выбора фракции
+        from kivy.uix.spinner import Spinner
         factions_spinner = Spinner(
             text="С какой фракцией?",
             values=available_factions,
@@ -1193,6 +1166,7 @@ def show_alliance_form(faction, game_area, class_faction, conn):
     content.add_widget(title)
 
     # Спиннер для выбора фракции
+    from kivy.uix.spinner import Spinner
     factions_spinner = Spinner(
         text="С какой фракцией?",
         values=available_factions,
@@ -1572,6 +1546,7 @@ def show_declare_war_form(faction, conn):
     content.add_widget(title)
 
     # Спиннер для выбора цели
+    from kivy.uix.spinner import Spinner
     factions_spinner = Spinner(
         text="Выберите цель",
         values=available_targets,
@@ -1696,51 +1671,7 @@ def show_popup_message(title, message):
 
 def calculate_army_strength(conn):
     """Рассчитывает силу армий для каждой фракции."""
-    class_coefficients = {
-        "1": 1.3,  # Класс 1: базовые юниты
-        "2": 1.7,  # Класс 2: улучшенные юниты
-        "3": 2.0,  # Класс 3: элитные юниты
-        "4": 3.0,
-        "5": 4.0
-    }
-
-    army_strength = {}
-
-    try:
-            cursor = conn.cursor()
-
-            # Получаем все юниты из таблицы garrisons и их характеристики из таблицы units
-            cursor.execute("""
-                SELECT g.unit_name, g.unit_count, u.faction, u.attack, u.defense, u.durability, u.unit_class 
-                FROM garrisons g
-                JOIN units u ON g.unit_name = u.unit_name
-            """)
-            garrison_data = cursor.fetchall()
-
-            # Рассчитываем силу армии для каждой фракции
-            for row in garrison_data:
-                unit_name, unit_count, faction, attack, defense, durability, unit_class = row
-
-                if not faction:
-                    continue
-
-                # Коэффициент класса
-                coefficient = class_coefficients.get(unit_class, 1.0)
-
-                # Рассчитываем силу юнита
-                unit_strength = (attack * coefficient) + defense + durability
-
-                # Умножаем на количество юнитов
-                total_strength = unit_strength * unit_count
-
-                # Добавляем к общей силе фракции
-                if faction not in army_strength:
-                    army_strength[faction] = 0
-                army_strength[faction] += total_strength
-
-    except Exception as e:
-        print(f"Ошибка при работе с базой данных: {e}")
-        return {}
+    army_strength = faction_strengths(conn)
 
     # Возвращаем два словаря: один с числовыми значениями, другой с отформатированными строками
     formatted_army_strength = {faction: format_number(strength) for faction, strength in army_strength.items()}
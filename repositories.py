@@ -0,0 +1,114 @@
+"""
+Репозитории: запросы интерфейса к базе в виде методов с понятным результатом.
+
+Окна интерфейса сами открывали курсоры и разбирали строки по номерам
+столбцов (dossier, diplomacies, relations, звёзды мощи на карте), а одни
+и те же запросы были написаны в нескольких модулях по-разному. Теперь
+текст запроса — константа репозитория (sqlite3 кэширует подготовленный
+запрос на соединении, см. db_manager.py), а результат — словарь или
+список словарей с именованными полями:
+
+    with reader(conn) as read_conn:
+        DiplomacyRepository(read_conn).diplomacies("Аркадия")   # {"Селестия": "нейтралитет", ...}
+
+Репозиторий работает с тем соединением, которое ему передали: для чтения —
+с читателем из db_manager.reader(conn), для записи — с писателем.
+Ошибки SQLite, как и раньше в окнах, печатаются, а метод возвращает
+пустой результат.
+"""
+import sqlite3
+
+import army_strength
+
+
+class DiplomacyRepository:
+    DIPLOMACIES = "SELECT faction2, relationship FROM diplomacies WHERE faction1 = ?"
+    RELATIONS = "SELECT faction2, relationship FROM relations WHERE faction1 = ?"
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def _pairs(self, query, faction):
+        try:
+            return {faction2: relationship for faction2, relationship in self.conn.execute(query, (faction,))}
+        except sqlite3.Error as e:
+            print(f"Ошибка при загрузке отношений фракции {faction}: {e}")
+            return {}
+
+    def diplomacies(self, faction):
+        """Дипломатический статус фракции с остальными: {фракция: "война" | "союз" | ...}."""
+        return self._pairs(self.DIPLOMACIES, faction)
+
+    def relations(self, faction):
+        """Уровень отношений фракции с остальными: {фракция: уровень}."""
+        return self._pairs(self.RELATIONS, faction)
+
+
+class DossierRepository:
+    ENTRIES = """
+        SELECT faction, military_rank, avg_military_rating_per_faction AS avg_military_rating,
+               avg_soldiers_starving, battle_victories AS victories, battle_defeats AS defeats,
+               matches_won, matches_lost, last_data
+        FROM dossier
+        ORDER BY id
+    """
+    CLEAR = "DELETE FROM dossier"
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def entries(self):
+        """
+        Личное дело игрока по фракциям в порядке записей.
+        :return: {фракция: [{"military_rank", "avg_military_rating", "avg_soldiers_starving",
+                             "victories", "defeats", "matches_won", "matches_lost", "last_data"}]}
+        """
+        factions = {}
+        try:
+            cursor = self.conn.execute(self.ENTRIES)
+            columns = [column[0] for column in cursor.description]
+            for row in cursor.fetchall():
+                data = dict(zip(columns, row))
+                factions.setdefault(data.pop("faction"), []).append(data)
+        except sqlite3.Error as e:
+            print(f"Ошибка базы данных: {e}")
+            return {}
+        return factions
+
+    def clear(self):
+        """Удаляет все записи личного дела (нужен писатель). :return: True при успехе."""
+        try:
+            self.conn.execute(self.CLEAR)
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"❌ Ошибка удаления: {e}")
+            return False
+
+
+class MapRepository:
+    CITY_STRENGTHS = """
+        SELECT c.name, c.faction, c.icon_x, c.icon_y, COALESCE(s.strength, 0)
+        FROM cities c
+        LEFT JOIN army_strength s ON s.city_id = c.name AND s.faction = c.faction
+        WHERE c.icon_x IS NOT NULL AND c.icon_y IS NOT NULL
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def city_strengths(self):
+        """
+        Города с координатами иконок и силой армии владельца в каждом.
+        :return: (версия army_strength, [(город, фракция, icon_x, icon_y, сила)]);
+                 при ошибке — (None, None).
+        """
+        # Версия и строки читаются с одного соединения — они согласованы
+        key = army_strength.version(self.conn)
+        try:
+            rows = [tuple(row) for row in self.conn.execute(self.CITY_STRENGTHS)]
+        except sqlite3.Error as e:
+            print(f"Ошибка при получении городов с гарнизонами: {e}")
+            return None, None
+        return key, rows
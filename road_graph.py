@@ -0,0 +1,123 @@
+"""
+Граф дорог между городами.
+
+Правило «города связаны, если манхэттенское расстояние меньше N» раньше
+пересчитывалось в трёх местах: карта (MapWidget.draw_roads) на каждой
+перерисовке перебирала все пары городов, окно крепости (ui.py) считало
+расстояние на каждое перемещение войск, а ИИ — при выборе цели.
+Здесь расстояния считаются один раз при построении графа, а пороги
+хранятся в одном месте:
+
+    ROAD      — дорога на карте (< 224);
+    ATTACK    — атака вражеского города (< 225);
+    TRANSFER  — переброска войск к союзнику и от него (< 300).
+
+Координаты городов за партию не меняются (меняются только владельцы),
+поэтому граф строится один раз на соединение и сбрасывается invalidate()
+только при пересоздании таблицы cities (новая игра, восстановление бэкапа).
+"""
+import sqlite3
+
+from city_coords import city_coordinates
+
+ROAD = "road"
+ATTACK = "attack"
+TRANSFER = "transfer"
+
+# Расстояние до соседа должно быть строго меньше порога
+DISTANCE_LIMITS = {
+    ROAD: 224,
+    ATTACK: 225,
+    TRANSFER: 300,
+}
+MAX_LIMIT = max(DISTANCE_LIMITS.values())
+
+_graphs = {}
+
+
+class RoadGraph:
+    def __init__(self, points):
+        """
+        :param points: {name: (x, y)} в порядке id городов.
+        """
+        self.points = dict(points)
+        # {name: [(distance, neighbour), ...]} по возрастанию расстояния, только < MAX_LIMIT
+        self.adjacency = {name: [] for name in self.points}
+        cells = {}
+        for name, (x, y) in self.points.items():
+            cells.setdefault((x // MAX_LIMIT, y // MAX_LIMIT), []).append(name)
+        # Соседи ближе MAX_LIMIT лежат в той же или соседней ячейке сетки
+        for (cx, cy), names in cells.items():
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for name in names:
+                        x, y = self.points[name]
+                        for other in cells.get((cx + dx, cy + dy), ()):
+                            if other == name:
+                                continue
+                            ox, oy = self.points[other]
+                            distance = abs(x - ox) + abs(y - oy)
+                            if distance < MAX_LIMIT:
+                                self.adjacency[name].append((distance, other))
+        order = {name: i for i, name in enumerate(self.points)}
+        for neighbours in self.adjacency.values():
+            neighbours.sort(key=lambda item: (item[0], order[item[1]]))
+
+    @classmethod
+    def from_db(cls, conn):
+        return cls(city_coordinates(conn).points)
+
+    def distance(self, city1, city2):
+        """Манхэттенское расстояние между городами или None, если координат нет."""
+        p1 = self.points.get(city1)
+        p2 = self.points.get(city2)
+        if p1 is None or p2 is None:
+            return None
+        return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
+
+    def within(self, city1, city2, kind):
+        """Связаны ли города правилом kind (ROAD, ATTACK или TRANSFER)."""
+        distance = self.distance(city1, city2)
+        return distance is not None and distance < DISTANCE_LIMITS[kind]
+
+    def neighbours(self, city, kind):
+        """Соседи города по правилу kind как [(distance, name)] от ближнего к дальнему."""
+        limit = DISTANCE_LIMITS[kind]
+        result = []
+        for distance, neighbour in self.adjacency.get(city, ()):
+            if distance >= limit:
+                break
+            result.append((distance, neighbour))
+        return result
+
+    def edges(self, kind):
+        """Пары связанных городов (каждая пара один раз) с их координатами."""
+        limit = DISTANCE_LIMITS[kind]
+        seen = set()
+        for name, neighbours in self.adjacency.items():
+            seen.add(name)
+            for distance, neighbour in neighbours:
+                if distance >= limit:
+                    break
+                if neighbour not in seen:
+                    yield self.points[name], self.points[neighbour]
+
+
+def road_graph(conn):
+    """Граф дорог для соединения; строится при первом обращении."""
+    graph = _graphs.get(id(conn))
+    if graph is None or graph[0] is not conn:
+        try:
+            graph = _graphs[id(conn)] = (conn, RoadGraph.from_db(conn))
+        except sqlite3.Error as e:
+            print(f"Ошибка при построении графа дорог: {e}")
+            return RoadGraph({})
+    return graph[1]
+
+
+def invalidate(conn=None):
+    """Сбрасывает граф соединения (или все графы), чтобы он перестроился по таблице cities."""
+    if conn is None:
+        _graphs.clear()
+    else:
+        _graphs.pop(id(conn), None)
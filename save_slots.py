@@ -0,0 +1,278 @@
+"""
+Слоты сохранений на основе sqlite3.Connection.backup.
+
+Раньше новая партия и перезапуск после поражения очищали 17 таблиц и
+переливали 6 таблиц из копий *_default под блокировкой BEGIN IMMEDIATE,
+а сохранить партию посреди кампании было нельзя (turn_save хранит только
+номер хода). Теперь состояние базы целиком копируется постранично:
+
+    slots = SaveSlots(conn)
+    slots.save("quick", faction="Аркадия", turn=12, season=2)   # снимок в saves/quick.db
+    slots.load("quick")                                        # метаданные слота или None
+    slots.new_game()                                           # снимок начала партии
+
+Снимок пишется во временный файл и подменяет старый через os.replace,
+поэтому оборванное сохранение не портит слот. Загрузка собирает итоговую
+базу в памяти и переносит её в рабочую одним вызовом backup — игра видит
+либо старое состояние, либо новое. Сохранения можно сжимать gzip
+(compress=True). Список слотов с метаданными (фракция, ход, сезон, время,
+размер, версия схемы) хранится в saves/slots.json.
+
+Таблицы вне партии переживают загрузку: личное дело игрока (dossier) —
+всегда, а при новой партии — все таблицы, которые clear_tables и
+restore_from_backup не трогают (события, политические строи и т. п.).
+Снимок начала партии строится из рабочей базы при первом обращении
+и пересобирается после миграций схемы.
+"""
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+
+import city_coords
+import map_events
+import road_graph
+import seasons
+from migrations import migrate, schema_version
+from turn_engine import CLEARED_TABLES, RESTORED_TABLES, clear_tables, restore_from_backup
+
+QUICK_SLOT = "quick"
+NEW_GAME_SLOT = "new_game"
+INDEX_FILE = "slots.json"
+
+# Статистика игрока по всем партиям
+PERSISTENT_TABLES = ("dossier",)
+# Таблицы, которые снимок начала партии задаёт целиком: рабочие и производные от них
+NEW_GAME_TABLES = set(CLEARED_TABLES) | {working for default, working in RESTORED_TABLES} | {
+    "army_strength", "army_strength_version", "schema_version",
+}
+
+
+def _database_dir(conn):
+    for row in conn.execute("PRAGMA database_list").fetchall():
+        if row[1] == "main" and row[2]:
+            return os.path.dirname(row[2])
+    return None
+
+
+def _tables(conn):
+    cursor = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+    return [row[0] for row in cursor.fetchall()]
+
+
+class SaveSlots:
+    def __init__(self, conn, saves_dir=None):
+        """
+        :param conn: Рабочее соединение с базой игры.
+        :param saves_dir: Папка сохранений; по умолчанию saves/ рядом с файлом базы.
+        """
+        self.conn = conn
+        if saves_dir is None:
+            saves_dir = os.path.join(_database_dir(conn) or os.getcwd(), "saves")
+        self.saves_dir = saves_dir
+        self.index_path = os.path.join(saves_dir, INDEX_FILE)
+
+    # ------------------------------------------------------------------
+    # Список слотов
+    # ------------------------------------------------------------------
+    def _read_index(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Ошибка чтения списка сохранений: {e}")
+            return {}
+
+    def _write_index(self, index):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def slots(self):
+        """Слоты игрока (без снимка начала партии), от последнего сохранения к первому."""
+        index = self._read_index()
+        slots = [meta for name, meta in index.items()
+                 if name != NEW_GAME_SLOT and os.path.exists(os.path.join(self.saves_dir, meta["file"]))]
+        return sorted(slots, key=lambda meta: meta["saved_at"], reverse=True)
+
+    def get(self, slot):
+        """Метаданные слота или None, если его нет."""
+        meta = self._read_index().get(slot)
+        if meta is None or not os.path.exists(os.path.join(self.saves_dir, meta["file"])):
+            return None
+        return meta
+
+    def delete(self, slot):
+        index = self._read_index()
+        meta = index.pop(slot, None)
+        if meta is None:
+            return
+        try:
+            os.remove(os.path.join(self.saves_dir, meta["file"]))
+        except FileNotFoundError:
+            pass
+        self._write_index(index)
+
+    # ------------------------------------------------------------------
+    # Сохранение и загрузка
+    # ------------------------------------------------------------------
+    def _write_snapshot(self, source, slot, compress):
+        """Копирует базу source в файл слота атомарно. :return: Имя файла слота."""
+        os.makedirs(self.saves_dir, exist_ok=True)
+        file_name = f"{slot}.db.gz" if compress else f"{slot}.db"
+        path = os.path.join(self.saves_dir, file_name)
+        tmp_path = os.path.join(self.saves_dir, f"{slot}.db.tmp")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        target = sqlite3.connect(tmp_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+        if compress:
+            with open(tmp_path, "rb") as src, gzip.open(path + ".tmp", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(tmp_path)
+            tmp_path = path + ".tmp"
+        os.replace(tmp_path, path)
+        return file_name
+
+    def _save_from(self, source, slot, compress=False, metadata=None):
+        """Сохраняет базу source в слот и записывает его в список. :return: Метаданные слота."""
+        file_name = self._write_snapshot(source, slot, compress)
+        meta = dict(metadata or {})
+        meta.update({
+            "slot": slot,
+            "file": file_name,
+            "compressed": compress,
+            "saved_at": datetime.now().isoformat(timespec="seconds"),
+            "size": os.path.getsize(os.path.join(self.saves_dir, file_name)),
+            "schema_version": schema_version(source),
+        })
+        index = self._read_index()
+        old = index.get(slot)
+        index[slot] = meta
+        self._write_index(index)
+        # Сжатый и несжатый файлы одного слота называются по-разному
+        if old and old["file"] != file_name:
+            try:
+                os.remove(os.path.join(self.saves_dir, old["file"]))
+            except FileNotFoundError:
+                pass
+        return meta
+
+    def save(self, slot=QUICK_SLOT, compress=False, **metadata):
+        """
+        Сохраняет текущее состояние партии в слот.
+        :param metadata: Сведения для списка слотов (faction, turn, season...).
+        :return: Метаданные слота или None при ошибке.
+        """
+        try:
+            self.conn.commit()
+            meta = self._save_from(self.conn, slot, compress, metadata)
+            print(f"Партия сохранена в слот '{slot}'.")
+            return meta
+        except (sqlite3.Error, OSError) as e:
+            print(f"Ошибка сохранения в слот '{slot}': {e}")
+            return None
+
+    def _open_snapshot(self, meta):
+        """Загружает файл слота в базу в памяти."""
+        path = os.path.join(self.saves_dir, meta["file"])
+        work = sqlite3.connect(":memory:")
+        if meta.get("compressed"):
+            tmp_path = path + ".unpacked"
+            with gzip.open(path, "rb") as src, open(tmp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            path = tmp_path
+        try:
+            source = sqlite3.connect(path)
+            try:
+                source.backup(work)
+            finally:
+                source.close()
+        finally:
+            if meta.get("compressed"):
+                os.remove(path)
+        return work
+
+    def _restore(self, meta, keep_tables):
+        """
+        Заменяет рабочую базу снимком слота, сохраняя содержимое keep_tables из рабочей базы.
+        """
+        work = self._open_snapshot(meta)
+        try:
+            # Сохранение могло быть сделано до последних миграций
+            migrate(work)
+            existing = set(_tables(work))
+            for table in keep_tables:
+                if table not in existing:
+                    continue
+                rows = self.conn.execute(f"SELECT * FROM {table}").fetchall()
+                work.execute(f"DELETE FROM {table}")
+                if rows:
+                    placeholders = ", ".join("?" * len(rows[0]))
+                    work.executemany(f"INSERT INTO {table} VALUES ({placeholders})", [tuple(row) for row in rows])
+            work.commit()
+            self.conn.commit()
+            # Одна постраничная копия: рабочая база меняется целиком
+            work.backup(self.conn)
+        finally:
+            work.close()
+        # Таблица cities заменена — кэш координат и граф дорог строятся заново
+        city_coords.invalidate(self.conn)
+        road_graph.invalidate(self.conn)
+        seasons.invalidate(self.conn)
+        map_events.city_changed()
+
+    def load(self, slot=QUICK_SLOT):
+        """
+        Загружает партию из слота; личное дело игрока остаётся текущим.
+        :return: Метаданные слота или None, если слота нет или загрузка не удалась.
+        """
+        meta = self.get(slot)
+        if meta is None:
+            print(f"Слот '{slot}' не найден.")
+            return None
+        try:
+            self._restore(meta, PERSISTENT_TABLES)
+            print(f"Партия загружена из слота '{slot}'.")
+            return meta
+        except (sqlite3.Error, OSError) as e:
+            print(f"Ошибка загрузки слота '{slot}': {e}")
+            return None
+
+    def _new_game_snapshot(self):
+        """Метаданные снимка начала партии; снимок строится заново после миграций схемы."""
+        meta = self.get(NEW_GAME_SLOT)
+        if meta is not None and meta.get("schema_version") == schema_version(self.conn):
+            return meta
+        work = sqlite3.connect(":memory:")
+        try:
+            self.conn.commit()
+            self.conn.backup(work)
+            clear_tables(work)
+            restore_from_backup(work)
+            return self._save_from(work, NEW_GAME_SLOT)
+        finally:
+            work.close()
+
+    def new_game(self):
+        """
+        Приводит рабочую базу к началу партии (вместо clear_tables + restore_from_backup).
+        :return: True, если база восстановлена.
+        """
+        try:
+            meta = self._new_game_snapshot()
+            keep_tables = [table for table in _tables(self.conn) if table not in NEW_GAME_TABLES]
+            self._restore(meta, keep_tables)
+            print("Данные новой партии восстановлены из снимка.")
+            return True
+        except (sqlite3.Error, OSError) as e:
+            print(f"Ошибка подготовки новой партии: {e}")
+            return False
@@ -1,17 +1,24 @@
 # seasons.py
 
+import math
 import sqlite3
-from db_lerdon_connect import db_path
+
+# {id(conn): (conn, сезон, {(фракция, сезон): {unit_name: характеристики}})}
+_caches = {}
+
 
 class SeasonManager:
     """
     Менеджер сезонов, теперь с учётом фракций.
 
-    При первом вызове update(new_idx) просто накладывается эффект для сезона new_idx.
-    При смене с last_idx на new_idx:
-      1. Откатываем всё, что накладывалось для last_idx (_revert_season).
-      2. Накладываем эффект для new_idx (_apply_season).
-      3. Сохраняем last_idx = new_idx.
+    Базовые характеристики в таблице units не меняются. Раньше каждый сезон
+    переписывал attack/defense/cost_money/cost_time всех юнитов и откатывал
+    их умножением на 1/f с округлением, из-за чего база «уплывала» за
+    партию. Теперь update(new_idx) записывает коэффициенты сезона new_idx в
+    таблицу season_effects (по строке на фракцию), а действующие
+    характеристики считаются при чтении — effective_stats(conn, faction)
+    с кэшем по (фракция, сезон). Сила армий (army_strength.py) учитывает
+    season_effects в SQL и пересчитывается триггерами.
 
     Если new_idx == last_idx, ничего не делаем.
     """
@@ -58,97 +65,99 @@ class SeasonManager:
     ]
 
     def __init__(self):
-        # last_idx = индекс сезона, бафф которого уже наложен.
+        # last_idx = индекс сезона, коэффициенты которого записаны в season_effects.
         # None означает, что до этого ни один сезон не применялся.
         self.last_idx = None
 
     def update(self, new_idx: int, conn):
         """
-        Вызывается при смене сезона на new_idx (0–3).
-        Если last_idx != new_idx, то:
-          1) Если last_idx не None, откатываем _revert_season(last_idx).
-          2) Накладываем _apply_season(new_idx).
-          3) Сохраняем last_idx = new_idx.
-        Если new_idx == last_idx, ничего не делаем.
+        Вызывается при смене сезона на new_idx (0–3): записывает коэффициенты
+        сезона в season_effects. Если new_idx == last_idx, ничего не делаем.
         """
-        if self.last_idx is None:
-            # Первый раз — просто накладываем
-            self._apply_season(new_idx, conn)
+        if new_idx == self.last_idx:
+            return
+        try:
+            conn.executemany("""
+                INSERT INTO season_effects (faction, season, stat, cost)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (faction) DO UPDATE
+                SET season = excluded.season, stat = excluded.stat, cost = excluded.cost
+            """, [
+                (faction_name, new_idx, coeffs['stat'], coeffs['cost'])
+                for faction_name, coeffs in self.FACTION_EFFECTS[new_idx].items()
+            ])
+            conn.commit()
             self.last_idx = new_idx
-        elif new_idx != self.last_idx:
-            # Сначала откатить предыдущий сезон
-            self._revert_season(self.last_idx, conn)
-            # Потом применить новый
-            self._apply_season(new_idx, conn)
-            self.last_idx = new_idx
-        # Если new_idx == last_idx, остаёмся как есть
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"Ошибка при смене сезона: {e}")
+        invalidate(conn)
 
-    def _apply_season(self, idx: int, conn):
-        """
-        Накладывает все эффекты сезона idx на таблицу units,
-        по каждой фракции берутся соответствующие коэффициенты.
-        """
-        faction_effects = self.FACTION_EFFECTS[idx]
-        cur = conn.cursor()
-
-        for faction_name, coeffs in faction_effects.items():
-            stat_f = coeffs['stat']
-            cost_f = coeffs['cost']
-
-            # Применяем stat-коэффициент (attack, defense) только если stat_f != 1.0
-            if stat_f != 1.0:
-                cur.execute(f"""
-                    UPDATE units
-                    SET
-                        attack  = CAST(ROUND(attack  * :stat_f) AS INTEGER),
-                        defense = CAST(ROUND(defense * :stat_f) AS INTEGER)
-                    WHERE faction = :faction
-                """, {'stat_f': stat_f, 'faction': faction_name})
-
-            # Применяем cost-коэффициент (cost_money, cost_time) только если cost_f != 1.0
-            if cost_f != 1.0:
-                cur.execute(f"""
-                    UPDATE units
-                    SET
-                        cost_money = CAST(ROUND(cost_money * :cost_f) AS INTEGER),
-                        cost_time  = CAST(ROUND(cost_time  * :cost_f) AS INTEGER)
-                    WHERE faction = :faction
-                """, {'cost_f': cost_f, 'faction': faction_name})
-
-        conn.commit()
-
-    def _revert_season(self, idx: int, conn):
-        """
-        Откатывает эффекты сезона idx, возвращая к «базовым» значениям.
-        Для каждой фракции берём обратные коэффициенты: 1 / applied_factor.
-        """
-        faction_effects = self.FACTION_EFFECTS[idx]
-        cur = conn.cursor()
-
-        for faction_name, coeffs in faction_effects.items():
-            stat_f = coeffs['stat']
-            cost_f = coeffs['cost']
-
-            # Откатим stat, если он не равен 1.0
-            if stat_f != 1.0:
-                stat_revert = 1.0 / stat_f
-                cur.execute(f"""
-                    UPDATE units
-                    SET
-                        attack  = CAST(ROUND(attack  * :stat_rev) AS INTEGER),
-                        defense = CAST(ROUND(defense * :stat_rev) AS INTEGER)
-                    WHERE faction = :faction
-                """, {'stat_rev': stat_revert, 'faction': faction_name})
-
-            # Откатим cost, если он не равен 1.0
-            if cost_f != 1.0:
-                cost_revert = 1.0 / cost_f
-                cur.execute(f"""
-                    UPDATE units
-                    SET
-                        cost_money = CAST(ROUND(cost_money * :cost_rev) AS INTEGER),
-                        cost_time  = CAST(ROUND(cost_time  * :cost_rev) AS INTEGER)
-                    WHERE faction = :faction
-                """, {'cost_rev': cost_revert, 'faction': faction_name})
-
-        conn.commit()
+
+def _scale(value, factor):
+    """value × factor с округлением как у ROUND в SQLite (половина — от нуля)."""
+    if factor == 1.0 or value is None:
+        return value
+    scaled = value * factor
+    return int(math.floor(abs(scaled) + 0.5)) * (1 if scaled >= 0 else -1)
+
+
+def _cache(conn):
+    cache = _caches.get(id(conn))
+    if cache is None or cache[0] is not conn:
+        try:
+            row = conn.execute("SELECT MAX(season) FROM season_effects").fetchone()
+            season = row[0] if row else None
+        except sqlite3.Error as e:
+            print(f"Ошибка при чтении текущего сезона: {e}")
+            season = None
+        cache = _caches[id(conn)] = (conn, season, {})
+    return cache
+
+
+def current_season(conn):
+    """Индекс текущего сезона (0–3) или None, если сезон ещё не наступал."""
+    return _cache(conn)[1]
+
+
+def effective_stats(conn, faction, season=None):
+    """
+    Действующие характеристики юнитов фракции: базовые из units с коэффициентами сезона.
+    :param season: Индекс сезона; по умолчанию текущий.
+    :return: {unit_name: {"attack", "defense", "cost_money", "cost_time"}}.
+    """
+    _, current, stats = _cache(conn)
+    if season is None:
+        season = current
+    key = (faction, season)
+    if key not in stats:
+        coeffs = {'stat': 1.0, 'cost': 1.0}
+        if season is not None:
+            coeffs = SeasonManager.FACTION_EFFECTS[season].get(faction, coeffs)
+        try:
+            cursor = conn.execute("""
+                SELECT unit_name, attack, defense, cost_money, cost_time
+                FROM units WHERE faction = ?
+            """, (faction,))
+            rows = cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Ошибка при загрузке характеристик юнитов фракции {faction}: {e}")
+            return {}
+        stats[key] = {
+            unit_name: {
+                "attack": _scale(attack, coeffs['stat']),
+                "defense": _scale(defense, coeffs['stat']),
+                "cost_money": _scale(cost_money, coeffs['cost']),
+                "cost_time": _scale(cost_time, coeffs['cost']),
+            }
+            for unit_name, attack, defense, cost_money, cost_time in rows
+        }
+    return stats[key]
+
+
+def invalidate(conn=None):
+    """Сбрасывает кэш сезона и характеристик соединения (или всех соединений)."""
+    if conn is None:
+        _caches.clear()
+    else:
+        _caches.pop(id(conn), None)
@@ -0,0 +1,235 @@
+"""
+Безголовый прогон партии без Kivy.
+
+    python simulate.py --turns 50 --seed 42
+
+База копируется во временный файл, поэтому рабочая game_data.db не меняется.
+Новая партия начинается так же, как после выбора фракции в меню, а ходы
+прогоняются через TurnEngine. Окна заменяются печатью, а в активных событиях
+вариант выбирается тем же генератором random, что и во всей игре. Поэтому
+прогон с одинаковым --seed воспроизводим.
+"""
+import argparse
+import contextlib
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+from event_manager import EventManager
+from faction import Faction
+from migrations import migrate
+from sql_trace import worst_suspects
+from turn_engine import FACTIONS, TurnEngine, clear_tables, restore_from_backup
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "game_data.db")
+
+
+class HeadlessEventManager(EventManager):
+    """EventManager без окон: вариант в активных событиях выбирается случайно."""
+
+    def show_event_active_popup(self, description, option_1, option_2, effects):
+        option = random.choice((1, 2))
+        print(f"[Событие] {description} -> {option_1 if option == 1 else option_2}")
+        self.choose_option(effects, option)
+
+    def show_temporary_build(self, description, event_type):
+        print(f"[Событие {event_type}] {description}")
+
+
+def open_connection(db_path):
+    """Открывает соединение с теми же настройками, что и в Lerdon.__init__."""
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA busy_timeout=5000;")
+    migrate(conn)
+    return conn
+
+
+def clone_to_memory(db_path):
+    """Загружает копию базы в память через sqlite3.Connection.backup."""
+    source = sqlite3.connect(db_path)
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    try:
+        source.backup(conn)
+    finally:
+        source.close()
+    conn.row_factory = sqlite3.Row
+    migrate(conn)
+    return conn
+
+
+def new_game(conn, player_faction, tax_rate=30, auto_build_ratio=(1, 1)):
+    """
+    Начинает новую партию за player_faction и возвращает готовый TurnEngine.
+    Игрок управляется автопилотом: без налогов и автостройки его фракция
+    вымирает за несколько ходов, и прогон ничего не показывает.
+    :param tax_rate: Ставка налога в процентах (None — не устанавливать).
+    :param auto_build_ratio: Соотношение больниц и фабрик для автостройки (None — выключена).
+    """
+    clear_tables(conn)
+    restore_from_backup(conn)
+
+    faction = Faction(player_faction, conn)
+    engine = TurnEngine(player_faction, faction, conn)
+    engine.start_game()
+    engine.event_manager = HeadlessEventManager(player_faction, None, faction, conn)
+
+    if tax_rate is not None:
+        faction.current_tax_rate = f"{tax_rate}%"
+        faction.set_taxes(tax_rate)
+        faction.apply_tax_effect(tax_rate)
+    if auto_build_ratio:
+        faction.auto_build_ratio = auto_build_ratio
+        faction.auto_build_enabled = True
+        faction.save_auto_build_settings()
+    return engine
+
+
+def count_cities(conn):
+    """Количество городов у каждой фракции."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT kingdom, COUNT(*) FROM city GROUP BY kingdom")
+    cities = {faction: 0 for faction in FACTIONS}
+    cities.update({row[0]: row[1] for row in cursor.fetchall()})
+    return cities
+
+
+def load_results(conn):
+    """Строки таблицы results по фракциям (без служебного id)."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM results")
+    results = {}
+    for row in cursor.fetchall():
+        row = dict(row)
+        row.pop("id", None)
+        results[row.pop("faction")] = row
+    return results
+
+
+def run_simulation(turns, seed=None, db=DEFAULT_DB, faction=None, tax_rate=30,
+                   auto_build_ratio=(1, 1), verbose=False, in_memory=False, metrics=None,
+                   sql_trace=None):
+    """
+    Прогоняет одну партию и возвращает её итог в виде словаря.
+    :param turns: Максимальное количество ходов.
+    :param seed: Зерно генератора random (None — выбирается случайно и попадает в итог).
+    :param db: База, с которой снимается копия для прогона.
+    :param faction: Фракция игрока (None — случайная).
+    :param verbose: Не глушить отладочную печать игры.
+    :param in_memory: Играть на копии базы в памяти вместо временного файла.
+    :param metrics: Путь к файлу JSONL для замеров фаз хода (None — без замеров).
+    :param sql_trace: Порог поиска запросов в циклах (None — без трассировки SQL).
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    random.seed(seed)
+    player_faction = faction or random.choice(FACTIONS)
+
+    with tempfile.TemporaryDirectory(prefix="lerdon_sim_") as tmp_dir:
+        if in_memory:
+            conn = clone_to_memory(db)
+        else:
+            db_copy = os.path.join(tmp_dir, "game_data.db")
+            shutil.copyfile(db, db_copy)
+            conn = open_connection(db_copy)
+        try:
+            with open(os.devnull, "w") as devnull:
+                output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(devnull)
+                with output:
+                    engine = new_game(conn, player_faction, tax_rate, auto_build_ratio)
+                    if metrics:
+                        engine.metrics.enable(metrics)
+                    if sql_trace:
+                        engine.sql_trace.threshold = sql_trace
+                        engine.sql_trace.enable()
+                    game_continues, reason, status = True, None, None
+                    turns_played = 0
+                    while turns_played < turns:
+                        game_continues, reason, status = engine.play_turn()
+                        turns_played += 1
+                        if not game_continues:
+                            break
+            sql_reports = list(engine.sql_trace.history)
+            cities = count_cities(conn)
+            results = load_results(conn)
+        finally:
+            conn.close()
+
+    return {
+        "seed": seed,
+        "faction": player_faction,
+        "turns_played": turns_played,
+        "finished": not game_continues,
+        "status": status,
+        "reason": reason,
+        "cities": cities,
+        "leader": max(cities, key=cities.get),
+        "results": results,
+        "sql_suspects": worst_suspects(sql_reports),
+    }
+
+
+def print_summary(summary):
+    print(f"Фракция игрока: {summary['faction']} (seed {summary['seed']})")
+    print(f"Сыграно ходов: {summary['turns_played']}")
+    if summary["finished"]:
+        print(f"Игра завершена ({summary['status']}): {summary['reason']}")
+    else:
+        print("Игра не завершена")
+    print("Города:")
+    for faction, count in sorted(summary["cities"].items(), key=lambda item: -item[1]):
+        print(f"  {faction}: {count}")
+    print(f"Лидер: {summary['leader']}")
+    if summary["sql_suspects"]:
+        print("Запросы в циклах (максимум выполнений за ход):")
+        for suspect in summary["sql_suspects"][:15]:
+            print(f"{suspect['count']:>6} × {suspect['site']}: {suspect['sql'][:120]}")
+
+
+def parse_ratio(value):
+    """Разбирает соотношение автостройки вида '1:1'."""
+    try:
+        hospitals, factories = (int(part) for part in value.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидается соотношение вида 1:1, получено '{value}'")
+    return hospitals, factories
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Безголовый прогон партии Lerdon")
+    parser.add_argument("--turns", type=int, default=50, help="максимальное количество ходов")
+    parser.add_argument("--seed", type=int, default=None, help="зерно генератора случайных чисел")
+    parser.add_argument("--db", default=DEFAULT_DB, help="исходная база (копируется перед прогоном)")
+    parser.add_argument("--faction", choices=FACTIONS, default=None, help="фракция игрока")
+    parser.add_argument("--tax", type=int, default=30, help="ставка налога игрока в процентах")
+    parser.add_argument("--auto-build", type=parse_ratio, default=(1, 1),
+                        help="соотношение больниц и фабрик для автостройки игрока, например 1:1")
+    parser.add_argument("--verbose", action="store_true", help="показывать отладочную печать игры")
+    parser.add_argument("--in-memory", action="store_true", help="играть на копии базы в памяти")
+    parser.add_argument("--metrics", default=None, help="записывать замеры фаз хода в файл JSONL")
+    parser.add_argument("--sql-trace", type=int, default=None, metavar="THRESHOLD",
+                        help="искать SELECT, выполненные с одного места за ход не меньше THRESHOLD раз")
+    parser.add_argument("--max-sql-repeats", type=int, default=None,
+                        help="завершиться с кодом 1, если какой-то SELECT за ход повторился больше этого числа раз")
+    args = parser.parse_args(argv)
+
+    summary = run_simulation(args.turns, seed=args.seed, db=args.db, faction=args.faction,
+                             tax_rate=args.tax, auto_build_ratio=args.auto_build, verbose=args.verbose,
+                             in_memory=args.in_memory, metrics=args.metrics,
+                             sql_trace=args.sql_trace)
+    print_summary(summary)
+    if args.max_sql_repeats is not None:
+        over = [suspect for suspect in summary["sql_suspects"] if suspect["count"] > args.max_sql_repeats]
+        if over:
+            print(f"Превышен порог --max-sql-repeats {args.max_sql_repeats}: запросов {len(over)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,7 @@
 from lerdon_libraries import *
 from db_lerdon_connect import *
+from db_manager import reader
+from repositories import DiplomacyRepository
 
 
 def calculate_font_size():
@@ -416,22 +418,8 @@ class AdvisorView(FloatLayout):
         Загружает текущие отношения из таблицы relations в базе данных.
         Возвращает словарь, где ключи — названия фракций, а значения — уровни отношений.
         """
-        try:
-            # Выполняем запрос к таблице relations
-            self.cursor.execute('''
-                SELECT faction2, relationship
-                FROM relations
-                WHERE faction1 = ?
-            ''', (self.faction,))
-            rows = self.cursor.fetchall()
-
-            # Преобразуем результат в словарь
-            relations = {faction2: relationship for faction2, relationship in rows}
-            return relations
-
-        except sqlite3.Error as e:
-            print(f"Ошибка при загрузке отношений из таблицы relations: {e}")
-            return {}
+        with reader(self.db_connection) as conn:
+            return DiplomacyRepository(conn).relations(self.faction)
 
     def calculate_coefficient(self, relation_level):
         """Рассчитывает коэффициент на основе уровня отношений"""
@@ -570,25 +558,10 @@ class AdvisorView(FloatLayout):
         Загружает дипломатические соглашения из базы данных для текущей фракции (self.faction).
         Возвращает словарь, где ключи — названия фракций, а значения — статусы отношений.
         """
-        diplomacies_data = {}
-        try:
-            cursor = self.db_connection.cursor()
-            # Добавляем условие WHERE faction1 = ?
-            query = "SELECT faction2, relationship FROM diplomacies WHERE faction1 = ?"
-            cursor.execute(query, (self.faction,))
-            rows = cursor.fetchall()
-
-            print("Загруженные данные из таблицы diplomacies:", rows)  # Отладочный вывод
-
-            # Преобразуем результат в словарь
-            for faction2, relationship in rows:
-                diplomacies_data[faction2] = relationship
-
-        except sqlite3.Error as e:
-            print(f"Ошибка при работе с базой данных: {e}")
-        finally:
-            print("Результат загрузки diplomacies_data:", diplomacies_data)  # Отладочный вывод
-            return diplomacies_data
+        with reader(self.db_connection) as conn:
+            diplomacies_data = DiplomacyRepository(conn).diplomacies(self.faction)
+        print("Результат загрузки diplomacies_data:", diplomacies_data)  # Отладочный вывод
+        return diplomacies_data
 
     def manage_relations(self):
         """
@@ -632,17 +605,8 @@ class AdvisorView(FloatLayout):
         Загружает отношения для указанной целевой фракции.
         Возвращает словарь, где ключи — названия фракций, а значения — уровни отношений.
         """
-        try:
-            self.cursor.execute('''
-                SELECT faction2, relationship
-                FROM relations
-                WHERE faction1 = ?
-            ''', (target_faction,))
-            rows = self.cursor.fetchall()
-            return {faction2: relationship for faction2, relationship in rows}
-        except sqlite3.Error as e:
-            print(f"Ошибка при загрузке отношений для фракции {target_faction}: {e}")
-            return {}
+        with reader(self.db_connection) as conn:
+            return DiplomacyRepository(conn).relations(target_faction)
 
     def update_relations_in_db(self, target_faction, new_value):
         """
@@ -0,0 +1,177 @@
+"""
+Трассировка SQL и поиск запросов в циклах (N+1).
+
+У соединения SQLite может быть только одна функция трассировки
+(Connection.set_trace_callback), поэтому её занимает общий диспетчер,
+а замеры фаз (turn_metrics.py) и SqlTracer подписываются на него через
+add_listener/remove_listener.
+
+SqlTracer приводит каждый запрос к виду без значений
+("... WHERE unit_name = ?"), считает выполнения по паре
+(запрос, место вызова) за ход и помечает SELECT, которые за один ход
+выполнились с одного места не меньше threshold раз, — типичный запрос
+в цикле. Отчёт доступен из движка хода (TurnEngine.sql_trace), в игре —
+как наложение на экране, а для безголовой партии:
+
+    python simulate.py --turns 10 --seed 1 --in-memory --sql-trace 20 --max-sql-repeats 200
+
+Включается переменной окружения LERDON_SQL_TRACE (порог или 1).
+"""
+import os
+import re
+import sys
+from collections import Counter, deque
+
+ENV_VARIABLE = "LERDON_SQL_TRACE"
+DEFAULT_THRESHOLD = 20
+
+# Файлы, которые сами выполняют чужие запросы: место вызова ищется выше них
+_PASS_THROUGH = ("sql_trace.py", "unit_of_work.py", "turn_metrics.py", "contextlib.py")
+
+_hubs = {}
+
+
+class _TraceHub:
+    """Единственная функция трассировки соединения, раздающая запросы подписчикам."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.listeners = []
+
+    def __call__(self, statement):
+        for listener in self.listeners:
+            listener(statement)
+
+
+def add_listener(conn, listener):
+    hub = _hubs.get(id(conn))
+    if hub is None or hub.conn is not conn:
+        hub = _hubs[id(conn)] = _TraceHub(conn)
+        conn.set_trace_callback(hub)
+    if listener not in hub.listeners:
+        hub.listeners.append(listener)
+
+
+def remove_listener(conn, listener):
+    hub = _hubs.get(id(conn))
+    if hub is None or hub.conn is not conn:
+        return
+    if listener in hub.listeners:
+        hub.listeners.remove(listener)
+    if not hub.listeners:
+        conn.set_trace_callback(None)
+        del _hubs[id(conn)]
+
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(statement):
+    """Приводит запрос к виду без значений: строки и числа заменяются на ?, пробелы схлопываются."""
+    shape = _STRING.sub("?", statement)
+    shape = _NUMBER.sub("?", shape)
+    shape = _VALUE_LIST.sub("(?, ...)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+def call_site():
+    """Файл, строка и функция кода игры, выполнившего запрос."""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_filename.endswith(_PASS_THROUGH):
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+class SqlTracer:
+    def __init__(self, conn, threshold=DEFAULT_THRESHOLD, keep_turns=20):
+        """
+        :param threshold: Сколько одинаковых SELECT с одного места за ход считать запросом в цикле.
+        :param keep_turns: Сколько последних ходов хранить в истории.
+        """
+        self.conn = conn
+        self.threshold = threshold
+        self.enabled = False
+        self.turn = None
+        self.counts = Counter()  # {(shape, site): count} за текущий ход
+        self.history = deque(maxlen=keep_turns)
+
+    @classmethod
+    def from_env(cls, conn):
+        """Создаёт трассировщик и включает его, если задана переменная LERDON_SQL_TRACE."""
+        value = os.environ.get(ENV_VARIABLE)
+        tracer = cls(conn)
+        if value:
+            if value.isdigit() and int(value) > 1:
+                tracer.threshold = int(value)
+            tracer.enable()
+        return tracer
+
+    def enable(self):
+        self.enabled = True
+        add_listener(self.conn, self._on_statement)
+        print(f"Трассировка SQL включена, порог повторов: {self.threshold}")
+
+    def disable(self):
+        self.enabled = False
+        remove_listener(self.conn, self._on_statement)
+
+    def _on_statement(self, statement):
+        self.counts[(normalize(statement), call_site())] += 1
+
+    def start_turn(self, turn):
+        """Начинает счёт нового хода (запросы между ходами отбрасываются)."""
+        self.turn = turn
+        self.counts = Counter()
+
+    def end_turn(self):
+        """Закрывает ход, сохраняет его отчёт в истории и возвращает его."""
+        if not self.enabled:
+            return None
+        report = self.report()
+        self.history.append(report)
+        self.counts = Counter()
+        return report
+
+    def report(self, counts=None):
+        """
+        Отчёт по текущему ходу: всего запросов, разных запросов и подозрительные
+        SELECT в порядке убывания числа выполнений.
+        """
+        counts = self.counts if counts is None else counts
+        suspects = [
+            {"sql": shape, "site": site, "count": count}
+            for (shape, site), count in counts.most_common()
+            if count >= self.threshold and shape.lstrip().upper().startswith("SELECT")
+        ]
+        return {
+            "turn": self.turn,
+            "statements": sum(counts.values()),
+            "distinct": len({shape for shape, site in counts}),
+            "suspects": suspects,
+        }
+
+    def format_report(self, report=None, limit=10):
+        """Отчёт в виде текста для консоли и наложения в игре."""
+        report = report or (self.history[-1] if self.history else self.report())
+        lines = [f"SQL за ход {report['turn']}: {report['statements']} запросов, "
+                 f"{report['distinct']} разных"]
+        if not report["suspects"]:
+            lines.append(f"Повторов от {self.threshold} раз с одного места нет")
+        for suspect in report["suspects"][:limit]:
+            lines.append(f"{suspect['count']:>6} × {suspect['site']}: {suspect['sql'][:120]}")
+        return "\n".join(lines)
+
+
+def worst_suspects(reports):
+    """Сводит отчёты нескольких ходов: для каждого подозрительного запроса — максимум выполнений за ход."""
+    worst = Counter()
+    for report in reports:
+        for suspect in report["suspects"]:
+            key = (suspect["sql"], suspect["site"])
+            worst[key] = max(worst[key], suspect["count"])
+    return [{"sql": shape, "site": site, "count": count} for (shape, site), count in worst.most_common()]
@@ -0,0 +1,142 @@
+"""
+Хронология холодного старта: время импорта каждого модуля и этапы до меню.
+
+Холодный старт на телефонах в основном уходит на импорты (раньше
+lerdon_libraries тянул около 50 модулей Kivy, включая видео и вкладки) и
+на искусственные паузы экрана загрузки. Чтобы видеть, куда уходит время:
+
+    import startup_timeline
+    startup_timeline.install()               # первой строкой main.py
+    ...
+    startup_timeline.mark("база открыта")    # этап запуска
+    startup_timeline.watch_first_frame()     # в App.build: отметка первого кадра
+    startup_timeline.finish(path)            # отчёт в журнал и файл, хук снимается
+
+Хук подменяет builtins.__import__ и замеряет только первую загрузку модуля
+в главном потоке; повторный import из sys.modules проходит сразу. Для
+каждого модуля хранится собственное время (без вложенных импортов) и
+общее. Модули, загруженные без builtins.__import__ (importlib.import_module,
+подмодули из списка from), входят в собственное время загрузившего их
+модуля. Отметки времени — от вызова install().
+"""
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+
+REPORT_TOP = 15
+
+_start = None
+_original_import = None
+_main_thread = None
+_stack = []     # общее время вложенных импортов для каждого импорта в процессе загрузки
+_imports = []   # (модуль, общее время, собственное время) в секундах
+_marks = []     # (этап, секунды от install())
+
+
+def _module_key(name, globals, level):
+    if not level:
+        return name
+    package = (globals or {}).get("__package__")
+    if not package:
+        return None
+    try:
+        return importlib.util.resolve_name("." * level + name, package)
+    except (ImportError, ValueError):
+        return None
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    key = _module_key(name, globals, level)
+    if key is None or key in sys.modules or threading.get_ident() != _main_thread:
+        return _original_import(name, globals, locals, fromlist, level)
+    _stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        total = time.perf_counter() - start
+        nested = _stack.pop()
+        if _stack:
+            _stack[-1] += total
+        _imports.append((key, total, total - nested))
+
+
+def install():
+    """Начинает отсчёт и замер импортов. Повторный вызов ничего не делает."""
+    global _start, _original_import, _main_thread
+    if _original_import is not None:
+        return
+    _start = time.perf_counter()
+    _main_thread = threading.get_ident()
+    _original_import = builtins.__import__
+    builtins.__import__ = _timed_import
+
+
+def uninstall():
+    """Возвращает стандартный импорт; собранные данные остаются."""
+    global _original_import
+    if _original_import is None:
+        return
+    if builtins.__import__ is _timed_import:
+        builtins.__import__ = _original_import
+    _original_import = None
+
+
+def elapsed():
+    """Секунды от install() (0, если замер не запущен)."""
+    return time.perf_counter() - _start if _start is not None else 0.0
+
+
+def mark(label):
+    """Отмечает этап запуска."""
+    if _start is not None:
+        _marks.append((label, elapsed()))
+
+
+def watch_first_frame():
+    """Отмечает первый показанный кадр (Window.on_flip). Вызывается из App.build."""
+    from kivy.core.window import Window
+
+    def on_flip(window):
+        Window.unbind(on_flip=on_flip)
+        mark("первый кадр")
+
+    Window.bind(on_flip=on_flip)
+
+
+def report(top=REPORT_TOP):
+    """
+    Текст отчёта: этапы и самые долгие импорты по собственному времени.
+    :param top: Сколько модулей показать.
+    """
+    lines = []
+    for label, seconds in _marks:
+        lines.append(f"{seconds * 1000:8.0f} мс  {label}")
+    total = sum(own for module, full, own in _imports)
+    lines.append(f"Импорты: {total * 1000:.0f} мс, модулей: {len(_imports)}")
+    slowest = sorted(_imports, key=lambda item: item[2], reverse=True)[:top]
+    for module, full, own in slowest:
+        lines.append(f"{own * 1000:8.1f} мс  {module} (с вложенными {full * 1000:.1f} мс)")
+    return "\n".join(lines)
+
+
+def finish(path=None):
+    """
+    Завершает замер: снимает хук, пишет отчёт в журнал (попадает и в отчёт о падении)
+    и, если задан path, в файл. Повторный вызов ничего не делает.
+    """
+    if _original_import is None:
+        return
+    uninstall()
+    text = report()
+    from lerdon_log import get_logger
+    log = get_logger("startup")
+    log.info("Холодный старт:\n%s", text)
+    if path:
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        except OSError as e:
+            print(f"Не удалось записать хронологию запуска в {path}: {e}")
@@ -0,0 +1,141 @@
+"""
+Кэш текстур для карты: подписи городов, иконки крепостей и звёзды мощи.
+
+Растеризация текста (CoreLabel.refresh) — одна из самых дорогих операций
+в Kivy, а карта раньше заново рисовала название каждого города при каждой
+перерисовке. Здесь текстуры подписей строятся один раз на ключ
+(текст, размер шрифта, цвет), а картинки загружаются один раз на путь;
+оба кэша ограничены по размеру и вытесняют давно не использованные записи.
+
+Иконки крепостей и звезда берутся из общего атласа ATLAS, если он собран:
+
+    python texture_cache.py          # нужен Pillow; build_apk.sh делает это перед сборкой
+
+Без атласа (например, при разработке) текстуры грузятся из отдельных файлов.
+"""
+import os
+import sys
+from collections import OrderedDict
+
+ATLAS = "files/atlas/map"  # files/atlas/map.atlas + map-0.png
+ATLAS_SIZE = 512
+DEFAULT_IMAGE = "files/buildings/default.png"
+# Картинки, которые собираются в атлас
+ATLAS_IMAGES = [
+    "files/buildings/arkadia.png",
+    "files/buildings/celestia.png",
+    "files/buildings/eteria.png",
+    "files/buildings/giperion.png",
+    "files/buildings/halidon.png",
+    DEFAULT_IMAGE,
+    "files/status/army_in_city/star.png",
+]
+
+
+class LRUCache:
+    """Словарь ограниченного размера: при переполнении удаляется давно не использованная запись."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, factory):
+        if key in self.items:
+            self.items.move_to_end(key)
+            self.hits += 1
+            return self.items[key]
+        self.misses += 1
+        value = factory()
+        self.items[key] = value
+        if len(self.items) > self.capacity:
+            self.items.popitem(last=False)
+        return value
+
+    def clear(self):
+        self.items.clear()
+
+
+_labels = LRUCache(1024)
+_images = LRUCache(64)
+_atlas = None
+
+
+def label_texture(text, font_size=25, color=(0, 0, 0, 1)):
+    """Текстура подписи; одинаковые подписи растеризуются один раз."""
+    from kivy.core.text import Label as CoreLabel
+
+    def render():
+        label = CoreLabel(text=text, font_size=font_size, color=color)
+        label.refresh()
+        return label.texture
+
+    return _labels.get((text, font_size, tuple(color)), render)
+
+
+def _load_atlas():
+    global _atlas
+    if _atlas is None:
+        _atlas = False
+        if os.path.exists(ATLAS + ".atlas"):
+            from kivy.atlas import Atlas
+            try:
+                _atlas = Atlas(ATLAS + ".atlas")
+            except Exception as e:
+                print(f"Не удалось загрузить атлас {ATLAS}.atlas: {e}")
+    return _atlas
+
+
+def _atlas_key(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def image_texture(path, fallback=None):
+    """
+    Текстура картинки: из атласа, если она в него входит, иначе из файла.
+    Файл проверяется один раз на путь; если его нет — текстура fallback или None.
+    """
+    from kivy.core.image import Image as CoreImage
+
+    def load():
+        atlas = _load_atlas()
+        if atlas and path in ATLAS_IMAGES and _atlas_key(path) in atlas.textures:
+            return atlas[_atlas_key(path)]
+        if not os.path.exists(path):
+            print(f"Файл не найден: {path}")
+            return None
+        return CoreImage(path).texture
+
+    texture = _images.get(path, load)
+    if texture is None and fallback is not None and fallback != path:
+        return image_texture(fallback)
+    return texture
+
+
+def clear():
+    """Сбрасывает кэши (например, после смены масштаба шрифтов)."""
+    global _atlas
+    _labels.clear()
+    _images.clear()
+    _atlas = None
+
+
+def build_atlas():
+    """Собирает атлас ATLAS из ATLAS_IMAGES средствами kivy.atlas (нужен Pillow)."""
+    from kivy.atlas import Atlas
+
+    # Ключи атласа — имена файлов без расширения, они не должны совпадать
+    keys = [_atlas_key(path) for path in ATLAS_IMAGES]
+    if len(set(keys)) != len(keys):
+        raise ValueError(f"Повторяющиеся имена картинок в атласе: {keys}")
+    os.makedirs(os.path.dirname(ATLAS), exist_ok=True)
+    if not Atlas.create(ATLAS, ATLAS_IMAGES, ATLAS_SIZE):
+        print(f"Не удалось собрать атлас {ATLAS}.atlas")
+        return 1
+    print(f"Атлас собран: {ATLAS}.atlas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(build_atlas())
@@ -0,0 +1,408 @@
+"""
+Движок хода без привязки к интерфейсу.
+
+Здесь собран весь конвейер хода: экономика игрока, ходы ИИ, сброс флагов,
+смена сезонов и случайные события. GameScreen вызывает фазы по очереди,
+перемежая их обновлением интерфейса, а simulate.py прогоняет их целиком
+через play_turn() без Kivy.
+"""
+import random
+import sqlite3
+
+import city_coords
+import map_events
+import road_graph
+import seasons
+from db_manager import claim_writer
+from ii import AIController
+from sql_trace import SqlTracer
+from turn_metrics import TurnMetrics
+from world_state import WorldState
+
+
+# Список всех фракций
+FACTIONS = ["Аркадия", "Селестия", "Хиперион", "Халидон", "Этерия"]
+
+# Рабочие таблицы, которые восстанавливаются из стандартных копий в начале партии
+RESTORED_TABLES = [
+    ("city_default", "city"),
+    ("diplomacies_default", "diplomacies"),
+    ("relations_default", "relations"),
+    ("resources_default", "resources"),
+    ("cities_default", "cities"),
+    ("units_default", "units")
+]
+
+# Таблицы, которые очищаются в начале партии
+CLEARED_TABLES = [
+    "buildings",
+    "city",
+    "diplomacies",
+    "garrisons",
+    "resources",
+    "trade_agreements",
+    "turn",
+    "turn_save",
+    "armies",
+    "political_systems",
+    "karma",
+    "user_faction",
+    "units",
+    "queries",
+    "results",
+    "auto_build_settings",
+    "interface_coord",
+    "season_effects"
+]
+
+
+def restore_from_backup(conn):
+    """
+    Восстанавливает данные из стандартных таблиц в рабочие.
+    :param conn: Активное соединение с базой данных.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")  # Блокируем на время восстановления
+
+        for default_table, working_table in RESTORED_TABLES:
+            cursor.execute(f"DELETE FROM {working_table}")
+            cursor.execute(f"INSERT INTO {working_table} SELECT * FROM {default_table}")
+
+        conn.commit()
+        # Таблица cities пересоздана — кэш координат и граф дорог строятся заново
+        city_coords.invalidate(conn)
+        road_graph.invalidate(conn)
+        seasons.invalidate(conn)
+        map_events.city_changed()
+        print("Данные успешно восстановлены из бэкапа.")
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Ошибка восстановления данных: {e}")
+
+
+def clear_tables(conn):
+    """
+    Очищает данные из указанных таблиц базы данных.
+    :param conn: Подключение к базе данных SQLite.
+    """
+    cursor = conn.cursor()
+
+    try:
+        for table in CLEARED_TABLES:
+            # Используем TRUNCATE или DELETE для очистки таблицы
+            cursor.execute(f"DELETE FROM {table};")
+            print(f"Таблица '{table}' успешно очищена.")
+
+        # Фиксируем изменения
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Ошибка при очистке таблиц: {e}")
+        conn.rollback()  # Откат изменений в случае ошибки
+
+
+class TurnEngine:
+    SEASON_NAMES = ['Зима', 'Весна', 'Лето', 'Осень']
+    SEASON_ICONS = ['snowflake', 'green_leaf', 'sun', 'yellow_leaf']
+
+    def __init__(self, selected_faction, faction, conn, turn_counter=1):
+        """
+        :param selected_faction: Название фракции игрока.
+        :param faction: Экономическая модель игрока (faction.Faction).
+        :param conn: Активное соединение с БД.
+        :param turn_counter: Номер хода, с которого продолжается игра.
+        """
+        self.selected_faction = selected_faction
+        self.faction = faction
+        self.conn = conn
+        self.turn_counter = turn_counter
+        self.ai_controllers = {}
+        self.world = None  # Общий снимок мира для всех контроллеров ИИ
+        # Замеры фаз хода: включаются через metrics.enable() или LERDON_TURN_METRICS
+        self.metrics = TurnMetrics.from_env(conn)
+        # Поиск запросов в циклах: sql_trace.enable() или LERDON_SQL_TRACE
+        self.sql_trace = SqlTracer.from_env(conn)
+        self.event_manager = None  # Назначается снаружи: у интерфейса и симулятора он свой
+        self.season_manager = seasons.SeasonManager()
+        self.current_idx = 0
+        self.event_now = None
+
+    # ------------------------------------------------------------------
+    # Начало партии
+    # ------------------------------------------------------------------
+    def start_game(self, season_idx=None):
+        """
+        Подготавливает новую партию: фракцию игрока, политические строи,
+        стартовый сезон и контроллеры ИИ.
+        :param season_idx: Сезон загруженного сохранения (None — случайный для новой партии).
+        """
+        self.save_selected_faction_to_db()
+        self.initialize_political_data()
+        self.current_idx = random.randint(0, 3) if season_idx is None else season_idx
+        self.init_ai_controllers()
+        self.season_manager.update(self.current_idx, self.conn)
+
+    def save_selected_faction_to_db(self):
+        cursor = self.conn.cursor()
+        cursor.execute("INSERT INTO user_faction (faction_name) VALUES (?)", (self.selected_faction,))
+        self.conn.commit()
+
+    def initialize_political_data(self):
+        """
+        Инициализирует таблицу political_systems значениями по умолчанию,
+        если она пуста. Политическая система для каждой фракции выбирается случайным образом.
+        Условие: не может быть меньше 2 и больше 3 стран с одним политическим строем.
+        """
+        cursor = self.conn.cursor()
+        try:
+            # Проверяем, есть ли записи в таблице
+            cursor.execute("SELECT COUNT(*) FROM political_systems")
+            count = cursor.fetchone()[0]
+            if count == 0:
+                # Список всех фракций
+                factions = ["Аркадия", "Селестия", "Хиперион", "Этерия", "Халидон"]
+
+                # Список возможных политических систем
+                systems = ["Капитализм", "Коммунизм"]
+
+                # Функция для проверки распределения
+                def is_valid_distribution(distribution):
+                    counts = {system: distribution.count(system) for system in systems}
+                    return all(2 <= count <= 3 for count in counts.values())
+
+                # Генерация случайного распределения
+                while True:
+                    default_systems = [(faction, random.choice(systems)) for faction in factions]
+                    distribution = [system for _, system in default_systems]
+
+                    if is_valid_distribution(distribution):
+                        break
+
+                # Вставляем данные в таблицу
+                cursor.executemany(
+                    "INSERT INTO political_systems (faction, system) VALUES (?, ?)",
+                    default_systems
+                )
+                self.conn.commit()
+                print("Таблица political_systems инициализирована случайными значениями.")
+        except sqlite3.Error as e:
+            print(f"Ошибка при инициализации таблицы political_systems: {e}")
+
+    def init_ai_controllers(self):
+        """Создание контроллеров ИИ для каждой фракции кроме выбранной"""
+        self.world = WorldState(self.conn)
+        for faction in FACTIONS:
+            if faction != self.selected_faction:
+                self.ai_controllers[faction] = AIController(faction, self.conn, world=self.world,
+                                                            metrics=self.metrics)
+
+    # ------------------------------------------------------------------
+    # Фазы хода
+    # ------------------------------------------------------------------
+    def begin_turn(self):
+        """Увеличивает счётчик ходов и сохраняет его вместе с историей."""
+        # Ход пишет через писателя в этом потоке (db_manager.py)
+        claim_writer(self.conn)
+        self.turn_counter += 1
+        self.metrics.turn = self.turn_counter
+        self.sql_trace.start_turn(self.turn_counter)
+        # Сохраняем текущее значение хода в таблицу turn
+        self.save_turn(self.selected_faction, self.turn_counter)
+        # Сохраняем историю ходов в таблицу turn_save
+        self.save_turn_history(self.selected_faction, self.turn_counter)
+        return self.turn_counter
+
+    def check_game_over(self):
+        """
+        Проверяет условия завершения игры.
+        :return: (game_continues, reason, status), где status — 'win', 'lose' или None.
+        """
+        game_continues, reason = self.faction.end_game()
+        if game_continues:
+            return True, reason, None
+
+        # Определяем статус завершения (win или lose)
+        if "Мир во всем мире" in reason or "Все фракции были уничтожены" in reason:
+            status = "win"  # Условия победы
+        else:
+            status = "lose"  # Условия поражения
+        return False, reason, status
+
+    def run_ai_turns(self):
+        """Выполнение хода для всех ИИ."""
+        # Игрок и события могли изменить БД с прошлого хода — один раз перечитываем снимок
+        if self.world is not None:
+            self.world.reload()
+        for ai_controller in self.ai_controllers.values():
+            ai_controller.make_turn()
+
+    def finish_turn(self):
+        """
+        Служебная часть конца хода: уничтоженные фракции, флаги атаки/перемещения и сезон.
+        :return: Текущий сезон в виде {'name': ..., 'icon': ...}.
+        """
+        self.update_destroyed_factions()
+        self.reset_check_attack_flags()
+        self.initialize_turn_check_move()
+        new_season = self.update_season(self.turn_counter)
+        self.season_manager.update(self.current_idx, self.conn)
+        return new_season
+
+    def roll_event(self):
+        """Бросок на случайное событие хода."""
+        self.event_now = random.randint(1, 100)
+        # Проверяем, нужно ли запустить событие
+        if self.turn_counter % self.event_now == 0 and self.event_manager is not None:
+            print("Генерация события...")
+            self.event_manager.generate_event(self.turn_counter)
+
+    def play_turn(self):
+        """
+        Полный ход без интерфейса в том же порядке, что и GameScreen.process_turn.
+        :return: (game_continues, reason, status) — см. check_game_over.
+        """
+        phase = self.metrics.phase
+        try:
+            with phase("begin_turn"):
+                self.begin_turn()
+            with phase("player_economy", self.selected_faction):
+                self.faction.update_resources()
+            with phase("check_game_over"):
+                game_continues, reason, status = self.check_game_over()
+            if not game_continues:
+                return game_continues, reason, status
+
+            with phase("ai_turns"):
+                self.run_ai_turns()
+            with phase("finish_turn"):
+                self.finish_turn()
+            print(f"Ход {self.turn_counter} завершён")
+            with phase("roll_event"):
+                self.roll_event()
+            return True, None, None
+        finally:
+            self.sql_trace.end_turn()
+            # Замеры пишутся между ходами, вне транзакций ИИ
+            self.metrics.flush()
+
+    # ------------------------------------------------------------------
+    # Состояние между ходами
+    # ------------------------------------------------------------------
+    def update_season(self, turn_count: int) -> dict:
+        """
+        Вызываем каждый ход, передавая turn_count.
+        Если turn_count кратно 4, переключаем current_idx на следующий сезон.
+        Возвращаем {'name': <название>, 'icon': <иконка>}.
+        """
+        if turn_count > 1 and (turn_count - 1) % 4 == 0:
+            # Переходим к следующему сезону
+            self.current_idx = (self.current_idx + 1) % 4
+
+        return self.current_season()
+
+    def current_season(self) -> dict:
+        return {
+            'name': self.SEASON_NAMES[self.current_idx],
+            'icon': self.SEASON_ICONS[self.current_idx]
+        }
+
+    def update_destroyed_factions(self):
+        """
+        Обновляет статус фракций в таблице diplomacies.
+        Если у фракции нет ни одного города в таблице city,
+        все записи для этой фракции в таблице diplomacies помечаются как "уничтожена".
+        """
+        cursor = self.conn.cursor()
+        try:
+            # Шаг 1: Получаем список всех фракций, у которых есть города
+            cursor.execute("""
+                SELECT DISTINCT kingdom
+                FROM city
+            """)
+            factions_with_cities = {row[0] for row in cursor.fetchall()}
+
+            # Шаг 2: Получаем все уникальные фракции из таблицы diplomacies
+            cursor.execute("""
+                SELECT DISTINCT faction1
+                FROM diplomacies
+            """)
+            all_factions = {row[0] for row in cursor.fetchall()}
+
+            # Шаг 3: Определяем фракции, у которых нет ни одного города
+            destroyed_factions = all_factions - factions_with_cities
+
+            if destroyed_factions:
+                print(f"Фракции без городов (уничтожены): {', '.join(destroyed_factions)}")
+
+                # Шаг 4: Обновляем записи в таблице diplomacies для уничтоженных фракций
+                for faction in destroyed_factions:
+                    cursor.execute("""
+                        UPDATE diplomacies
+                        SET relationship = ?
+                        WHERE faction1 = ? OR faction2 = ?
+                    """, ("уничтожена", faction, faction))
+                    print(f"Статус фракции '{faction}' обновлен на 'уничтожена'.")
+
+                # Фиксируем изменения в базе данных
+                self.conn.commit()
+            else:
+                print("Все фракции имеют хотя бы один город. Нет уничтоженных фракций.")
+
+        except sqlite3.Error as e:
+            print(f"Ошибка при обновлении статуса уничтоженных фракций: {e}")
+
+    def reset_check_attack_flags(self):
+        """
+        Обновляет значения check_attack на False для всех записей в таблице turn_check_attack_faction.
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("""
+                UPDATE turn_check_attack_faction
+                SET check_attack = ?
+            """, (False,))
+            self.conn.commit()
+            print("Флаги check_attack успешно сброшены на False.")
+        except sqlite3.Error as e:
+            print(f"Ошибка при сбросе флагов check_attack: {e}")
+
+    def initialize_turn_check_move(self):
+        """
+        Инициализирует запись о возможности перемещения для текущей фракции.
+        Устанавливает значение 'can_move' = True по умолчанию.
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("""
+                UPDATE turn_check_move
+                SET can_move = ?
+            """, (True,))
+            self.conn.commit()
+            print("Флаги can_move успешно сброшены на True.")
+        except sqlite3.Error as e:
+            print(f"Ошибка при сбросе флагов can_move: {e}")
+
+    def load_turn(self, faction):
+        """Загрузка текущего значения хода для фракции."""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT turn_count FROM turn WHERE faction = ?', (faction,))
+        result = cursor.fetchone()
+        return result[0] if result else 0
+
+    def save_turn(self, faction, turn_count):
+        """Сохранение текущего значения хода для фракции."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO turn (faction, turn_count)
+            VALUES (?, ?)
+        ''', (faction, turn_count))
+        self.conn.commit()
+
+    def save_turn_history(self, faction, turn_count):
+        """Сохранение истории ходов в таблицу turn_save."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT INTO turn_save (faction, turn_count)
+            VALUES (?, ?)
+        ''', (faction, turn_count))
+        self.conn.commit()
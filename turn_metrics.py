@@ -0,0 +1,149 @@
+"""
+Замеры фаз хода: время, число SQL-запросов и изменённых строк.
+
+    metrics = TurnMetrics(conn)
+    metrics.enable("db")                  # или путь к файлу .jsonl
+    with metrics.phase("update_resources", faction="Аркадия"):
+        ...
+    metrics.flush()                       # в конце хода
+
+Пока замеры выключены, phase() возвращает пустой контекст и почти ничего
+не стоит. Включить их можно в любой момент: через enable()/disable(),
+флаг --metrics у simulate.py или переменную окружения LERDON_TURN_METRICS
+("db" или путь к .jsonl), которую читает движок хода.
+
+Записи копятся в памяти и сбрасываются flush() между ходами, чтобы
+не вмешиваться в транзакцию хода ИИ (см. unit_of_work.py).
+"""
+import json
+import os
+import sqlite3
+import time
+
+from sql_trace import add_listener, remove_listener
+
+ENV_VARIABLE = "LERDON_TURN_METRICS"
+
+
+class _NoPhase:
+    """Контекст для выключенных замеров."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_PHASE = _NoPhase()
+
+
+class _Phase:
+    def __init__(self, metrics, name, faction):
+        self.metrics = metrics
+        self.name = name
+        self.faction = faction
+
+    def __enter__(self):
+        self.statements = self.metrics.statements
+        self.changes = self.metrics.conn.total_changes
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.pending.append({
+            "turn": self.metrics.turn,
+            "faction": self.faction,
+            "phase": self.name,
+            "seconds": round(time.perf_counter() - self.start, 6),
+            "statements": self.metrics.statements - self.statements,
+            "rows_changed": self.metrics.conn.total_changes - self.changes,
+            "failed": exc_type is not None,
+        })
+        return False
+
+
+class TurnMetrics:
+    def __init__(self, conn):
+        self.conn = conn
+        self.enabled = False
+        self.sink = None  # "db" или путь к .jsonl
+        self.turn = 0
+        self.statements = 0
+        self.pending = []
+
+    @classmethod
+    def from_env(cls, conn):
+        """Создаёт объект замеров и включает его, если задана переменная LERDON_TURN_METRICS."""
+        metrics = cls(conn)
+        sink = os.environ.get(ENV_VARIABLE)
+        if sink:
+            metrics.enable(sink)
+        return metrics
+
+    def enable(self, sink="db"):
+        """
+        Включает замеры.
+        :param sink: "db" — таблица turn_metrics в той же базе, иначе путь к файлу JSONL.
+        """
+        self.sink = sink
+        self.enabled = True
+        add_listener(self.conn, self._on_statement)
+        print(f"Замеры фаз хода включены, вывод: {sink}")
+
+    def disable(self):
+        """Выключает замеры и сбрасывает накопленные записи."""
+        self.flush()
+        self.enabled = False
+        remove_listener(self.conn, self._on_statement)
+
+    def _on_statement(self, statement):
+        self.statements += 1
+
+    def phase(self, name, faction=None):
+        """Контекст замера одной фазы хода."""
+        if not self.enabled:
+            return _NO_PHASE
+        return _Phase(self, name, faction)
+
+    def flush(self):
+        """Записывает накопленные замеры в таблицу turn_metrics или файл JSONL."""
+        if not self.pending:
+            return
+        records, self.pending = self.pending, []
+        if self.sink == "db":
+            self._write_db(records)
+        else:
+            self._write_jsonl(records)
+
+    def _write_db(self, records):
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS turn_metrics (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    turn INTEGER,
+                    faction TEXT,
+                    phase TEXT NOT NULL,
+                    seconds REAL,
+                    statements INTEGER,
+                    rows_changed INTEGER,
+                    failed INTEGER DEFAULT 0,
+                    recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cursor.executemany("""
+                INSERT INTO turn_metrics (turn, faction, phase, seconds, statements, rows_changed, failed)
+                VALUES (:turn, :faction, :phase, :seconds, :statements, :rows_changed, :failed)
+            """, records)
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"Ошибка при сохранении замеров хода: {e}")
+
+    def _write_jsonl(self, records):
+        try:
+            with open(self.sink, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"Ошибка при записи замеров хода в {self.sink}: {e}")
@@ -2,7 +2,12 @@ from lerdon_libraries import *
 from db_lerdon_connect import *
 
 from fight import fight
+from battle_forecast import army_from_db, forecast
 from economic import format_number
+import map_events
+from city_coords import city_coordinates
+from road_graph import ATTACK, TRANSFER, road_graph
+from seasons import effective_stats
 
 
 class FortressInfoPopup(Popup):
@@ -24,18 +29,9 @@ class FortressInfoPopup(Popup):
         self.city_coords = city_coords  # Это кортеж (x, y)
         self.current_popup = None  # Ссылка на текущее всплывающее окно
 
-        # Преобразуем координаты в строку для сравнения с БД
-        coords_str = f"[{self.city_coords[0]}, {self.city_coords[1]}]"
-        # Получаем информацию о городе из таблицы cities
-        self.cursor.execute("""
-            SELECT name FROM cities 
-            WHERE coordinates = ?
-        """, (coords_str,))
-
-        city_data = self.cursor.fetchone()
-        if city_data:
-            self.city_name = city_data[0]
-        else:
+        # Находим город по координатам в кэше координат городов
+        self.city_name = city_coordinates(self.conn).city_at(*self.city_coords)
+        if self.city_name is None:
             print(f"Город с координатами {self.city_coords} не найден в базе данных")
             return
 
@@ -378,6 +374,10 @@ class FortressInfoPopup(Popup):
                     continue
 
                 attack, defense, durability, unit_faction = unit_stats
+                # Атака и защита — с коэффициентами текущего сезона
+                season = effective_stats(self.conn, unit_faction).get(unit_name)
+                if season:
+                    attack, defense = season["attack"], season["defense"]
 
                 # Проверяем принадлежность юнита к фракции игрока
                 if unit_faction != self.player_fraction:
@@ -508,6 +508,18 @@ class FortressInfoPopup(Popup):
         scroll_view.add_widget(table_layout)
         main_layout.add_widget(scroll_view)
 
+        # Прогноз боя, если группа пойдёт на чужой город
+        self.forecast_label = None
+        if self.get_city_owner(self.city_name) != self.player_fraction:
+            self.forecast_label = Label(
+                text="Добавьте юниты, чтобы увидеть прогноз боя",
+                font_size='17sp',
+                size_hint_y=None,
+                height=50,
+                color=(1, 1, 1, 1)
+            )
+            main_layout.add_widget(self.forecast_label)
+
         # Кнопка "Отправить группу в город"
         send_group_button = Button(
             text="Отправить группу в город",
@@ -611,6 +623,7 @@ class FortressInfoPopup(Popup):
                     # Активируем кнопку отправки группы
                     if self.selected_group and hasattr(self, "send_group_button") and self.send_group_button:
                         self.send_group_button.disabled = False
+                    self.update_battle_forecast()
 
                     # Удаляем юнит из таблицы
                     unique_id = f"{city_id}_{unit_name}"
@@ -647,6 +660,30 @@ class FortressInfoPopup(Popup):
         popup.content = layout
         popup.open()
 
+    def update_battle_forecast(self):
+        """Показывает прогноз боя выбранной группы против гарнизона города (battle_forecast.py)."""
+        label = getattr(self, "forecast_label", None)
+        if label is None or not self.selected_group:
+            return
+        try:
+            self.cursor.execute("SELECT unit_name, unit_count FROM garrisons WHERE city_id = ?", (self.city_name,))
+            garrison = self.cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Ошибка при загрузке гарнизона для прогноза: {e}")
+            return
+
+        attacking_army = army_from_db(self.conn, [(u["unit_name"], u["unit_count"]) for u in self.selected_group])
+        defending_army = army_from_db(self.conn, [(row[0], row[1]) for row in garrison])
+        result = forecast(attacking_army, defending_army)
+        if result["winner"] == "attacking":
+            survivors = sum(result["attacking_survivors"].values())
+            label.text = f"Прогноз: победа, уцелеет {format_number(survivors)} юнитов"
+            label.color = (0.4, 1, 0.4, 1)
+        else:
+            survivors = sum(result["defending_survivors"].values())
+            label.text = f"Прогноз: поражение, у противника останется {format_number(survivors)} юнитов"
+            label.color = (1, 0.4, 0.4, 1)
+
     def move_selected_group_to_city(self, instance=None):
         """
         Перемещает выбранную группу юнитов в город.
@@ -1210,12 +1247,8 @@ class FortressInfoPopup(Popup):
 
             current_player_kingdom = self.player_fraction
 
-            # Получаем координаты городов и считаем манхэттенское расстояние
-            source_coords = self.get_city_coordinates(source_fortress_name)
-            destination_coords = self.get_city_coordinates(destination_fortress_name)
-            x_diff = abs(source_coords[0] - destination_coords[0])
-            y_diff = abs(source_coords[1] - destination_coords[1])
-            total_diff = x_diff + y_diff
+            # Пороги логистики и расстояния между городами — из общего графа дорог
+            roads = road_graph(self.conn)
 
             # ── 1) Сценарий: войска в своём городе ──────────────────────────────────────────
             if source_owner == current_player_kingdom:
@@ -1228,9 +1261,9 @@ class FortressInfoPopup(Popup):
                                          taken_count)
                     return True
 
-                # — если цель союзник, проверяем total_diff < 300;
+                # — если цель союзник, проверяем логистику переброски (< 300);
                 elif self.is_ally(current_player_kingdom, destination_owner):
-                    if total_diff < 300:
+                    if roads.within(source_fortress_name, destination_fortress_name, TRANSFER):
                         if not dry_run:
                             self.move_troops(source_fortress_name,
                                              destination_fortress_name,
@@ -1242,9 +1275,9 @@ class FortressInfoPopup(Popup):
                                            "Слишком далеко. Найдите ближайший населенный пункт")
                         return False
 
-                # — если цель враг, проверяем total_diff < 225 и флаги атаки;
+                # — если цель враг, проверяем дальность атаки (< 225) и флаги атаки;
                 elif self.is_enemy(current_player_kingdom, destination_owner):
-                    if total_diff < 225:
+                    if roads.within(source_fortress_name, destination_fortress_name, ATTACK):
                         cursor.execute(
                             "SELECT check_attack FROM turn_check_attack_faction WHERE faction = ?",
                             (destination_owner,)
@@ -1295,7 +1328,7 @@ class FortressInfoPopup(Popup):
                 # Проверяем, является ли назначение своим городом или городом другого союзника
                 if (destination_owner == current_player_kingdom or
                         self.is_ally(current_player_kingdom, destination_owner)):
-                    if total_diff < 300:
+                    if roads.within(source_fortress_name, destination_fortress_name, TRANSFER):
                         if not dry_run:
                             self.move_troops(source_fortress_name,
                                              destination_fortress_name,
@@ -1378,7 +1411,7 @@ class FortressInfoPopup(Popup):
                 # достаём статы
                 placeholders = ','.join('?' * len(unit_names))
                 query = f"""
-                    SELECT unit_name, attack, durability, defense, unit_class, image_path 
+                    SELECT unit_name, attack, durability, defense, unit_class, image_path, faction
                     FROM units 
                     WHERE unit_name IN ({placeholders})
                 """
@@ -1387,7 +1420,7 @@ class FortressInfoPopup(Popup):
 
                 cols = [d[0] for d in cursor.description]
                 idx = {k: cols.index(k) for k in
-                       ('unit_name', 'attack', 'durability', 'defense', 'unit_class', 'image_path')}
+                       ('unit_name', 'attack', 'durability', 'defense', 'unit_class', 'image_path', 'faction')}
 
                 unit_stats = {
                     row[idx['unit_name']].strip(): {
@@ -1400,6 +1433,12 @@ class FortressInfoPopup(Popup):
                     }
                     for row in results
                 }
+                # Атака и защита — с коэффициентами текущего сезона
+                for row in results:
+                    season = effective_stats(self.conn, row[idx['faction']]).get(row[idx['unit_name']])
+                    if season:
+                        stats = unit_stats[row[idx['unit_name']].strip()]
+                        stats['attack'], stats['defense'] = season['attack'], season['defense']
 
                 # Формируем армии
                 attacking_army = []
@@ -1478,6 +1517,7 @@ class FortressInfoPopup(Popup):
                     SET faction = ? 
                     WHERE name = ?
                 """, (new_owner, fortress_name))
+                map_events.city_changed(fortress_name)
 
                 # 2. Переносим только атакующие юниты
                 for unit in attacking_units:
@@ -1517,22 +1557,6 @@ class FortressInfoPopup(Popup):
         except sqlite3.Error as e:
             show_popup_message("Ошибка", f"Ошибка при захвате города: {e}")
 
-    def get_city_coordinates(self, city_name):
-        """
-        Возвращает координаты указанного города.
-        :param city_name: Название города.
-        :return: Кортеж (x, y) с координатами города.
-        """
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT coordinates FROM cities WHERE name = ?", (city_name,))
-        result = cursor.fetchone()
-        if result:
-            # Преобразуем строку "[x, y]" в кортеж (x, y)
-            coords_str = result[0].strip('[]')
-            x, y = map(int, coords_str.split(','))
-            return x, y
-        raise ValueError(f"Город '{city_name}' не найден в базе данных.")
-
     def move_troops(self, source_fortress_name, destination_fortress_name, unit_name, taken_count):
         """
         Перемещает войска между городами.
@@ -0,0 +1,133 @@
+"""
+Единица работы (unit of work) для записей хода.
+
+Раньше почти каждый вспомогательный метод ИИ и экономики делал свой commit(),
+и за один ход набирались десятки-сотни фиксаций, каждая из которых — запись
+на флеш-память. UnitOfWork копит записи хода и фиксирует их один раз:
+
+    with self.uow:
+        ...                         # методы вызывают self.uow.queue(...) и self.uow.commit()
+
+Внутри блока commit() ничего не фиксирует, а записи из queue() выполняются
+пачками через executemany при flush() или в конце блока. Если в блоке
+произошла ошибка, весь ход откатывается. rollback() внутри блока не
+откатывает транзакцию сразу (это сняло бы и открытые savepoint()), а
+прерывает ход исключением TurnAborted: транзакция откатывается при выходе
+из блока, а вызывающий код узнаёт, что хода не было. Если TurnAborted
+перехватил чей-то except Exception, выход из блока поднимет его снова.
+Вне блока queue() + commit() работают как обычные execute() + commit().
+
+Записи, которые в том же ходе читаются обратно из БД (например, гарнизоны
+перед боем), нужно либо выполнять сразу через execute(), либо вызывать flush()
+перед чтением.
+"""
+import sqlite3
+from contextlib import contextmanager
+
+
+class TurnAborted(Exception):
+    """Ход прерван rollback() внутри блока UnitOfWork; записи хода откатываются."""
+
+
+class UnitOfWork:
+    def __init__(self, conn):
+        self.conn = conn
+        self.pending = []  # [(sql, [params, ...])] в порядке постановки
+        self.depth = 0
+        self.failed = False
+        self.savepoints = 0
+
+    @property
+    def active(self):
+        return self.depth > 0
+
+    def __enter__(self):
+        if self.depth == 0:
+            self.failed = False
+        self.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.depth -= 1
+        if self.depth > 0:
+            return False
+        if exc_type is not None:
+            self._rollback()
+            return False
+        if self.failed:
+            self._rollback()
+            raise TurnAborted("ход откатывается после rollback()")
+        try:
+            self.flush()
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"Ошибка при сохранении хода, изменения отменены: {e}")
+            self._rollback()
+        return False
+
+    def queue(self, sql, params=()):
+        """
+        Ставит запись в очередь. Подряд идущие записи с одинаковым SQL
+        выполняются одним executemany.
+        """
+        if self.pending and self.pending[-1][0] == sql:
+            self.pending[-1][1].append(params)
+        else:
+            self.pending.append((sql, [params]))
+
+    def execute(self, sql, params=()):
+        """Выполняет запись сразу (после уже накопленных), чтобы её можно было прочитать в этом же ходе."""
+        self.flush()
+        return self.conn.execute(sql, params)
+
+    def flush(self):
+        """Выполняет накопленные записи без фиксации транзакции."""
+        pending, self.pending = self.pending, []
+        cursor = self.conn.cursor()
+        for sql, rows in pending:
+            cursor.executemany(sql, rows)
+
+    def commit(self):
+        """Внутри блока откладывает фиксацию до конца хода, вне блока — фиксирует сразу."""
+        if self.active:
+            return
+        self.flush()
+        self.conn.commit()
+
+    def rollback(self):
+        """
+        Вне блока отменяет накопленные записи и транзакцию. Внутри блока отмечает
+        ход как неудавшийся и поднимает TurnAborted; откат — при выходе из блока.
+        """
+        if self.active:
+            self.failed = True
+            self.pending = []
+            raise TurnAborted("ход откатывается после rollback()")
+        self._rollback()
+
+    def _rollback(self):
+        self.pending = []
+        self.conn.rollback()
+
+    @contextmanager
+    def savepoint(self):
+        """
+        Атомарный фрагмент внутри хода: при ошибке откатывается только он,
+        а не вся транзакция (в отличие от `with conn:`).
+        """
+        self.flush()
+        self.savepoints += 1
+        name = f"uow_{self.savepoints}"
+        self.conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield self
+        except BaseException:
+            self.pending = []
+            self.conn.execute(f"ROLLBACK TO {name}")
+            self.conn.execute(f"RELEASE {name}")
+            raise
+        else:
+            self.flush()
+            self.conn.execute(f"RELEASE {name}")
+            if not self.active:
+                self.conn.commit()
@@ -0,0 +1,231 @@
+"""
+Снимок мира для ходов ИИ.
+
+Все контроллеры ИИ на каждом ходу заново запрашивали из БД одни и те же
+факты: отношения, города, гарнизоны, характеристики юнитов, дипломатию.
+WorldState загружает их несколькими общими запросами в начале фазы ИИ
+и раздаёт всем контроллерам. Контроллеры по-прежнему пишут изменения в БД,
+но дублируют их в снимок через методы move_units, set_diplomacy и т.д.,
+поэтому следующая фракция видит уже обновлённый мир без повторного чтения.
+"""
+from city_index import CityIndex
+from seasons import effective_stats
+
+
+class WorldState:
+    def __init__(self, conn):
+        self.conn = conn
+        self.cities = {}            # {name: {"id", "name", "faction", "x", "y"}} в порядке id
+        self.city_order = {}        # {name: номер города в порядке id} — для равных расстояний
+        self.units = {}             # {unit_name: {"faction", "attack", ...}} в порядке id
+        self.garrisons = {}         # {city_id: {unit_name: {"unit_count", "unit_image"}}}
+        self.relations = {}         # {faction1: {faction2: relationship}}
+        self.diplomacies = {}       # {(faction1, faction2): relationship}
+        self.resources = {}         # {faction: {resource_type: amount}}
+        self.political_systems = {}  # {faction: system}
+        self._city_index = None     # Строится по требованию, сбрасывается в reload_cities
+        self.reload()
+
+    # ------------------------------------------------------------------
+    # Загрузка
+    # ------------------------------------------------------------------
+    def reload(self):
+        """Перечитывает весь снимок из БД."""
+        self.reload_cities()
+        self.reload_units()
+        self.reload_garrisons()
+        self.reload_relations()
+        self.reload_resources()
+
+    def reload_cities(self):
+        cursor = self.conn.cursor()
+        # x, y — числовые столбцы координат (city_coords.py); None, если текст не разобрался
+        cursor.execute("SELECT id, name, x, y, faction FROM cities")
+        self.cities = {}
+        self._city_index = None
+        for city_id, name, x, y, faction in cursor.fetchall():
+            if x is None or y is None:
+                x = y = None
+            self.cities[name] = {"id": city_id, "name": name, "faction": faction, "x": x, "y": y}
+        self.city_order = {name: order for order, name in enumerate(self.cities)}
+
+    def reload_units(self):
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT unit_name, faction, attack, defense, durability, unit_class,
+                   consumption, image_path, cost_money, cost_time
+            FROM units
+            ORDER BY id
+        """)
+        self.units = {}
+        for row in cursor.fetchall():
+            unit_name, faction, attack, defense, durability, unit_class, consumption, image_path, \
+                cost_money, cost_time = row
+            # Атака, защита и стоимость — с коэффициентами текущего сезона
+            season = effective_stats(self.conn, faction).get(unit_name)
+            if season:
+                attack, defense = season["attack"], season["defense"]
+                cost_money, cost_time = season["cost_money"], season["cost_time"]
+            self.units.setdefault(unit_name, {
+                "faction": faction,
+                "attack": attack,
+                "defense": defense,
+                "durability": durability,
+                "unit_class": unit_class,
+                "consumption": consumption,
+                "image_path": image_path,
+                "cost_money": cost_money,
+                "cost_time": cost_time,
+            })
+
+    def reload_garrisons(self):
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT city_id, unit_name, unit_count, unit_image
+            FROM garrisons
+            ORDER BY city_id, unit_name
+        """)
+        self.garrisons = {}
+        for city_id, unit_name, unit_count, unit_image in cursor.fetchall():
+            self.garrisons.setdefault(city_id, {})[unit_name] = {
+                "unit_count": unit_count,
+                "unit_image": unit_image,
+            }
+
+    def reload_relations(self):
+        """Отношения, дипломатические статусы и политические строи."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT faction1, faction2, relationship FROM relations")
+        self.relations = {}
+        for faction1, faction2, relationship in cursor.fetchall():
+            self.relations.setdefault(faction1, {})[faction2] = relationship
+
+        cursor.execute("SELECT faction1, faction2, relationship FROM diplomacies")
+        self.diplomacies = {}
+        for faction1, faction2, relationship in cursor.fetchall():
+            self.diplomacies.setdefault((faction1, faction2), relationship)
+
+        cursor.execute("SELECT faction, system FROM political_systems")
+        self.political_systems = {faction: system for faction, system in cursor.fetchall()}
+
+    def reload_resources(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT faction, resource_type, amount FROM resources")
+        self.resources = {}
+        for faction, resource_type, amount in cursor.fetchall():
+            self.resources.setdefault(faction, {})[resource_type] = amount
+
+    # ------------------------------------------------------------------
+    # Чтение
+    # ------------------------------------------------------------------
+    def cities_of(self, faction):
+        """Города фракции в виде {id: name}."""
+        return {city["id"]: name for name, city in self.cities.items() if city["faction"] == faction}
+
+    def city_owner(self, city_name):
+        city = self.cities.get(city_name)
+        return city["faction"] if city else None
+
+    def city_points(self, faction):
+        """Список (name, x, y) городов фракции с корректными координатами."""
+        return [(name, city["x"], city["y"]) for name, city in self.cities.items()
+                if city["faction"] == faction and city["x"] is not None]
+
+    @property
+    def city_index(self):
+        """Пространственный индекс городов (city_index.py); перестраивается после смены владельцев."""
+        if self._city_index is None:
+            self._city_index = CityIndex(self.cities)
+        return self._city_index
+
+    def relations_of(self, faction):
+        return dict(self.relations.get(faction, {}))
+
+    def diplomacy(self, faction1, faction2):
+        """Дипломатический статус faction1 → faction2 или None, если записи нет."""
+        return self.diplomacies.get((faction1, faction2))
+
+    def political_system(self, faction, default="Капитализм"):
+        return self.political_systems.get(faction, default)
+
+    def faction_resources(self, faction):
+        return dict(self.resources.get(faction, {}))
+
+    def garrison_units(self, city_id):
+        """
+        Юниты гарнизона города вместе с характеристиками (в порядке юнитов в units).
+        Юниты, которых нет в таблице units, пропускаются, как и в JOIN.
+        """
+        garrison = self.garrisons.get(city_id, {})
+        return [(unit_name, garrison[unit_name], unit) for unit_name, unit in self.units.items()
+                if unit_name in garrison]
+
+    def faction_garrisons(self, faction, predicate=None):
+        """
+        Все отряды фракции по городам: список (city_id, unit_name, unit_count, unit_image, unit).
+        :param predicate: Необязательный фильтр по характеристикам юнита.
+        """
+        rows = []
+        for unit_name, unit in self.units.items():
+            if unit["faction"] != faction or (predicate and not predicate(unit)):
+                continue
+            for city_id in sorted(self.garrisons):
+                entry = self.garrisons[city_id].get(unit_name)
+                if entry is not None:
+                    rows.append((city_id, unit_name, entry["unit_count"], entry["unit_image"], unit))
+        return rows
+
+    def iter_garrison_units(self):
+        """Все отряды всех фракций: (city_id, unit_name, unit_count, unit) для известных юнитов."""
+        for city_id in sorted(self.garrisons):
+            for unit_name in sorted(self.garrisons[city_id]):
+                unit = self.units.get(unit_name)
+                if unit is not None:
+                    yield city_id, unit_name, self.garrisons[city_id][unit_name]["unit_count"], unit
+
+    # ------------------------------------------------------------------
+    # Изменения (дублируют записи, уже сделанные в БД)
+    # ------------------------------------------------------------------
+    def move_units(self, from_city, to_city, unit_name, unit_count, unit_image):
+        source = self.garrisons.get(from_city, {})
+        entry = source.get(unit_name)
+        if entry is not None:
+            entry["unit_count"] -= unit_count
+            if entry["unit_count"] <= 0:
+                del source[unit_name]
+        target = self.garrisons.setdefault(to_city, {})
+        if unit_name in target:
+            target[unit_name]["unit_count"] += unit_count
+            target[unit_name]["unit_image"] = unit_image
+        else:
+            target[unit_name] = {"unit_count": unit_count, "unit_image": unit_image}
+
+    def add_units(self, city_id, unit_name, unit_count, unit_image):
+        target = self.garrisons.setdefault(city_id, {})
+        if unit_name in target:
+            target[unit_name]["unit_count"] += unit_count
+        else:
+            target[unit_name] = {"unit_count": unit_count, "unit_image": unit_image}
+
+    def set_diplomacy(self, faction1, faction2, status):
+        """Статус дипломатии в обе стороны (только для существующих записей)."""
+        for pair in ((faction1, faction2), (faction2, faction1)):
+            if pair in self.diplomacies:
+                self.diplomacies[pair] = status
+
+    def set_relation(self, faction1, faction2, value):
+        relations = self.relations.get(faction1)
+        if relations is not None and faction2 in relations:
+            relations[faction2] = value
+
+    def set_resources(self, faction, resources):
+        """Обновляет только уже существующие ресурсы фракции, как UPDATE в save_resources_to_db."""
+        current = self.resources.get(faction, {})
+        for resource_type, amount in resources.items():
+            if resource_type in current:
+                current[resource_type] = amount
+
+    def adjust_resource(self, faction, resource_type, delta):
+        current = self.resources.get(faction, {})
+        if resource_type in current:
+            current[resource_type] += delta